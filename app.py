@@ -13,23 +13,29 @@ from dateutil.relativedelta import relativedelta #abreviar_nome
 import traceback
 import streamlit.components.v1 as components  
 import json
-import random
 import time
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from background_refresh import BackgroundRefresher, DegradedLoadError, VersionedCache
+from dataset_store import IndexedDataset
+from baixar_virtual_select import (
+    VIRTUAL_SELECT_VERSAO, URL_BASE as VIRTUAL_SELECT_CDN, DESTINO_PADRAO as DIRETORIO_VIRTUAL_SELECT,
+)
+# Sem fallback: uma contagem simplificada (sem feriados, sem incluir o último dia, sem sinal)
+# mudaria todos os valores de VT/VD sem aviso, então uma falha aqui deve interromper o app
+from calculate_business_days import calculate_business_days, calculate_business_days_batch, BUSINESS_CALENDAR
 try:
     from dropdown_component import simple_multiselect_dropdown
     from popup import show_welcome_screen
-    from calculate_business_days import calculate_business_days
 except ImportError:
-    st.warning("Componentes 'dropdown_component', 'popup' ou 'calculate_business_days' não encontrados. Alguns recursos podem não funcionar como esperado.")
+    st.warning("Componentes 'dropdown_component' ou 'popup' não encontrados. Alguns recursos podem não funcionar como esperado.")
     # Definir valores padrão ou mocks se necessário
     def simple_multiselect_dropdown(label, options, key, default_selected):
         return st.multiselect(label, options, default=default_selected, key=key)
     def show_welcome_screen():
         return False
-    def calculate_business_days(start, end):
-        if pd.isna(start) or pd.isna(end):
-            return None
-        return np.busday_count(pd.to_datetime(start).date(), pd.to_datetime(end).date())
 
 # --- Bloco de Importação de Dados ---
 try:
@@ -50,6 +56,20 @@ import pytz
 TTL_HOURS = 3
 TTL_SECONDS = TTL_HOURS * 60 * 60  # 10800 segundos
 
+# Colunas dos filtros da sidebar, indexadas uma vez por carga (na ordem de filter_dataframe)
+COLUNAS_FILTRO = ["UGB", "Empreendimento", "GRUPO", "SETOR"]
+
+# Visões da área principal (a primeira é a padrão); só a selecionada é montada a cada rerun
+VISOES_PRINCIPAIS = ["Gráfico de Gantt", "Tabelão Horizontal"]
+
+# Esquema do dataset (ver aplicar_esquema_tipado): datas em datetime64 e textos repetidos como categorias
+COLUNAS_DATA = ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]
+COLUNAS_CATEGORICAS = ["UGB", "Empreendimento", "Etapa", "GRUPO", "SETOR"]
+
+# Com NEO_VALIDAR_ESQUEMA=1 as funções de renderização conferem o esquema do DataFrame recebido
+# (modo de depuração para pegar conversões de tipo perdidas no caminho)
+VALIDAR_ESQUEMA = os.getenv("NEO_VALIDAR_ESQUEMA", "").strip().lower() in ("1", "true", "sim")
+
 # Logging para monitoramento de refresh
 logging.basicConfig(
     format='%(asctime)s [AUTO-REFRESH] %(message)s',
@@ -69,19 +89,6 @@ def padronizar_etapa(etapa):
     # Adicione aqui a lógica de padronização real se souber
     return etapa
 
-def converter_porcentagem(valor):
-    """
-    Função auxiliar para converter valores de porcentagem.
-    """
-    if isinstance(valor, (int, float)):
-        return valor
-    try:
-        # Tenta converter string como '50%' para 50.0
-        if isinstance(valor, str) and '%' in valor:
-            return float(valor.replace('%', '').replace(',', '.'))
-        return float(valor)
-    except:
-        return 0.0
 	# --- ORDEM DAS ETAPAS (DEFINIDA PELO USUÁRIO) ---
 ORDEM_ETAPAS_GLOBAL = [
     "PL-ER-E-IP", "APROV-ER-(NEO)", "APROV-IP-(NEO)", "PIQ", "SOLIC-CONEXÃO", "CONEXÃO", "PROJ-EXEC", "ORÇ", "SUP",
@@ -180,6 +187,7 @@ class StyleConfig:
 # REMOVIDO: Função ajustar_datas_com_pulmao conforme solicitado.
 
 def calcular_periodo_datas(df, meses_padding_inicio=1, meses_padding_fim=36):
+    conferir_esquema(df, "calcular_periodo_datas")
     if df.empty:
         hoje = datetime.now()
         data_min_default = (hoje - relativedelta(months=2)).replace(day=1)
@@ -191,7 +199,7 @@ def calcular_periodo_datas(df, meses_padding_inicio=1, meses_padding_fim=36):
     colunas_data = ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]
     for col in colunas_data:
         if col in df.columns:
-            datas_validas = pd.to_datetime(df[col], errors='coerce').dropna()
+            datas_validas = df[col].dropna()
             datas.extend(datas_validas.tolist())
 
     if not datas:
@@ -218,160 +226,140 @@ def calcular_dias_uteis_novo(data_inicio, data_fim):
         data_inicio, data_fim = data_fim, data_inicio
         sinal = -1
 
-    return np.busday_count(data_inicio.date(), data_fim.date()) * sinal
-
-def obter_data_meta_assinatura_novo(df_empreendimento):
-    df_meta = df_empreendimento[df_empreendimento["Etapa"] == "ENTREGA"]
-    if df_meta.empty:
-        return None
-    for col in ["Inicio_Prevista", "Inicio_Real", "Termino_Prevista", "Termino_Real"]:
-        if col in df_meta.columns and pd.notna(df_meta[col].iloc[0]):
-            return pd.to_datetime(df_meta[col].iloc[0])
-    return None
+    return np.busday_count(data_inicio.date(), data_fim.date(), busdaycal=BUSINESS_CALENDAR) * sinal
 
 # --- CÓDIGO MODIFICADO ---
-def converter_dados_para_gantt(df):
-    # Conversão explícita de colunas de data para datetime
-    for col in ['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real']:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+def _datas_para_texto(datas, formato, vazio=None):
+    """Formata uma coluna datetime inteira de uma vez; datas ausentes viram `vazio`."""
+    return [texto if isinstance(texto, str) else vazio for texto in datas.dt.strftime(formato).tolist()]
 
-    if df.empty:
-        return []
-
-    gantt_data = []
+def _meses_para_texto(meses):
+    return [f"{valor:.1f}".replace('.', ',') if pd.notna(valor) else "-" for valor in meses.tolist()]
 
-    for empreendimento in df["Empreendimento"].unique():
-        df_emp = df[df["Empreendimento"] == empreendimento].copy()
+def _dias_para_texto(dias):
+    return [f"{int(valor):+d}d" if pd.notna(valor) else "-" for valor in dias.tolist()]
 
-        # DEBUG: Verificar etapas disponíveis
-        etapas_disponiveis = df_emp["Etapa"].unique()
-        print(f"=== ETAPAS PARA {empreendimento} ===")
-        print(f"Etapas disponíveis: {etapas_disponiveis}")
-        
-        tasks = []
-        
-        # CORREÇÃO: Ordenar STRITAMENTE pela ORDEM_ETAPAS_GLOBAL
-        # Criar uma coluna de ordenação baseada na ordem global
-        ordem_etapas_dict = {etapa: i for i, etapa in enumerate(ORDEM_ETAPAS_GLOBAL)}
-        
-        # Adicionar coluna de ordem
-        df_emp['ordem_etapa'] = df_emp['Etapa'].map(ordem_etapas_dict)
-        
-        # Para etapas não mapeadas, colocar no final
-        max_ordem = len(ORDEM_ETAPAS_GLOBAL)
-        df_emp['ordem_etapa'] = df_emp['ordem_etapa'].fillna(max_ordem)
-        
-        # CORREÇÃO: Ordenar APENAS pela ordem da etapa global, ignorando agrupamentos
-        df_emp_sorted = df_emp.sort_values('ordem_etapa').reset_index(drop=True)
-
-        print(f"Etapas ordenadas: {df_emp_sorted['Etapa'].tolist()}")
-
-        for i, (idx, row) in enumerate(df_emp_sorted.iterrows()):
-            start_date = row.get("Inicio_Prevista")
-            end_date = row.get("Termino_Prevista")
-            start_real = row.get("Inicio_Real")
-            end_real_original = row.get("Termino_Real")
-
-            # Garantir que as datas são objetos datetime
-            if pd.notna(start_date): start_date = pd.to_datetime(start_date)
-            if pd.notna(end_date): end_date = pd.to_datetime(end_date)
-            if pd.notna(start_real): start_real = pd.to_datetime(start_real)
-            if pd.notna(end_real_original): end_real_original = pd.to_datetime(end_real_original)
-            
-            progress = row.get("% concluído", 0)
-
-            etapa_sigla = row.get("Etapa", "UNKNOWN")
-            etapa_nome_completo = sigla_para_nome_completo.get(etapa_sigla, etapa_sigla)
-
-            # Lógica para tratar datas vazias
-            if pd.isna(start_date) or start_date is None: 
-                start_date = start_real if pd.notna(start_real) else datetime.now()
-            if pd.isna(end_date) or end_date is None: 
-                end_date = end_real_original if pd.notna(end_real_original) else (start_date + timedelta(days=30))
-            
-            # Garante que start_date e end_date são datetime se não forem None
-            if pd.notna(start_date): start_date = pd.to_datetime(start_date)
-            if pd.notna(end_date): end_date = pd.to_datetime(end_date)
-
-            end_real_visual = end_real_original
-            if pd.notna(start_real) and progress < 100 and pd.isna(end_real_original):
-                end_real_visual = datetime.now()
-
-            # Mapeamento de Grupo
-            grupo = "Não especificado"
-            if etapa_sigla in GRUPO_POR_ETAPA:
-                grupo = GRUPO_POR_ETAPA[etapa_sigla]
-
-            print(f"Processando: {etapa_sigla} -> {etapa_nome_completo} -> Grupo: {grupo}")
-
-            # Cálculos de duração
-            dur_prev_meses = None
-            if pd.notna(start_date) and pd.notna(end_date):
-                duracao_prevista_uteis = calculate_business_days(start_date, end_date)
-                dur_prev_meses = duracao_prevista_uteis / 21.75
-
-            dur_real_meses = None
-            if pd.notna(start_real) and pd.notna(end_real_original):
-                duracao_real_uteis = calculate_business_days(start_real, end_real_original)
-                dur_real_meses = duracao_real_uteis / 21.75
-
-            # Variações
-            vt = calculate_business_days(end_date, end_real_original)
-            duracao_prevista_uteis = calculate_business_days(start_date, end_date)
-            duracao_real_uteis = calculate_business_days(start_real, end_real_original)
-            
-            vd = None
-            if pd.notna(duracao_real_uteis) and pd.notna(duracao_prevista_uteis):
-                vd = duracao_real_uteis - duracao_prevista_uteis
-
-            # Lógica de Cor do Status
-            status_color_class = 'status-default'
-            hoje = pd.Timestamp.now().normalize()
+def converter_dados_para_gantt(df):
+    # As datas já chegam em datetime64 (esquema aplicado na carga)
+    conferir_esquema(df, "converter_dados_para_gantt")
+    if df.empty:
+        return []
 
-            if progress == 100:
-                if pd.notna(end_real_original) and pd.notna(end_date):
-                    if end_real_original <= end_date:
-                        status_color_class = 'status-green'
-                    else:
-                        status_color_class = 'status-red'
-            elif progress < 100 and pd.notna(start_real) and pd.notna(end_real_original) and (end_real_original < hoje):
-                status_color_class = 'status-yellow'
+    dados = df.copy()
+    for col in ['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real']:
+        if col not in dados.columns:
+            dados[col] = pd.NaT
+
+    # Empreendimentos na ordem em que aparecem; dentro de cada um, etapas STRITAMENTE pela ORDEM_ETAPAS_GLOBAL
+    # (a categoria ordenada de "Etapa" já traz essa ordem, com as etapas não mapeadas no final)
+    dados['ordem_empreendimento'] = pd.factorize(dados['Empreendimento'])[0]
+    dados = dados[dados['ordem_empreendimento'] >= 0]
+    dados = dados.sort_values(['ordem_empreendimento', 'Etapa'], kind='mergesort').reset_index(drop=True)
+
+    agora = pd.Timestamp.now()
+    hoje = agora.normalize()
+
+    inicio_real = dados['Inicio_Real']
+    termino_real = dados['Termino_Real']
+    progresso = dados['% concluído'].fillna(0) if '% concluído' in dados.columns else pd.Series(0, index=dados.index)
+
+    # Lógica para tratar datas vazias
+    inicio_prev = dados['Inicio_Prevista'].fillna(inicio_real).fillna(agora)
+    termino_prev = dados['Termino_Prevista'].fillna(termino_real).fillna(inicio_prev + pd.Timedelta(days=30))
+
+    # Etapas em andamento sem término real são desenhadas até hoje
+    termino_real_visual = termino_real.mask(inicio_real.notna() & (progresso < 100) & termino_real.isna(), agora)
+
+    # Cálculos de duração e variações (uma única passada de dias úteis por coluna)
+    duracao_prevista_uteis = calculate_business_days_batch(inicio_prev, termino_prev)
+    duracao_real_uteis = calculate_business_days_batch(inicio_real, termino_real)
+    vt = calculate_business_days_batch(termino_prev, termino_real)
+    vd = duracao_real_uteis - duracao_prevista_uteis
+
+    # Lógica de Cor do Status
+    concluida = progresso == 100
+    terminos_validos = termino_real.notna() & termino_prev.notna()
+    status_color_class = np.select(
+        [
+            concluida & terminos_validos & (termino_real <= termino_prev),
+            concluida & terminos_validos,
+            (progresso < 100) & inicio_real.notna() & termino_real.notna() & (termino_real < hoje),
+        ],
+        ['status-green', 'status-red', 'status-yellow'],
+        default='status-default'
+    )
 
-            task = {
-                "id": f"t{i}", 
-                "name": etapa_nome_completo,  # Usar nome completo para exibição
-                "name_sigla": etapa_sigla,    # Manter a sigla para referência
-                "numero_etapa": i + 1,
-                "start_previsto": start_date.strftime("%Y-%m-%d") if pd.notna(start_date) and start_date is not None else None,
-                "end_previsto": end_date.strftime("%Y-%m-%d") if pd.notna(end_date) and end_date is not None else None,
-                "start_real": pd.to_datetime(start_real).strftime("%Y-%m-%d") if pd.notna(start_real) else None,
-                "end_real": pd.to_datetime(end_real_visual).strftime("%Y-%m-%d") if pd.notna(end_real_visual) else None,
-                "end_real_original_raw": pd.to_datetime(end_real_original).strftime("%Y-%m-%d") if pd.notna(end_real_original) else None,
-                "setor": row.get("SETOR", "Não especificado"),
-                "grupo": grupo,
-                "progress": int(progress),
-                "inicio_previsto": start_date.strftime("%d/%m/%y") if pd.notna(start_date) and start_date is not None else "N/D",
-                "termino_previsto": end_date.strftime("%d/%m/%y") if pd.notna(end_date) and end_date is not None else "N/D",
-                "inicio_real": pd.to_datetime(start_real).strftime("%d/%m/%y") if pd.notna(start_real) else "N/D",
-                "termino_real": pd.to_datetime(end_real_original).strftime("%d/%m/%y") if pd.notna(end_real_original) else "N/D",
-                "duracao_prev_meses": f"{dur_prev_meses:.1f}".replace('.', ',') if dur_prev_meses is not None else "-",
-                "duracao_real_meses": f"{dur_real_meses:.1f}".replace('.', ',') if dur_real_meses is not None else "-",
-                "vt_text": f"{int(vt):+d}d" if pd.notna(vt) else "-",
-                "vd_text": f"{int(vd):+d}d" if pd.notna(vd) else "-",
-                "status_color_class": status_color_class
-            }
-            tasks.append(task)
+    etapas_sigla = dados['Etapa']
+    etapas_nome_completo = etapas_sigla.map(sigla_para_nome_completo).fillna(etapas_sigla)
+    grupos = etapas_sigla.map(GRUPO_POR_ETAPA).fillna("Não especificado")
+    setores = dados['SETOR'] if 'SETOR' in dados.columns else pd.Series("Não especificado", index=dados.index)
+
+    colunas_tarefa = zip(
+        dados['Empreendimento'].tolist(),
+        dados.groupby('ordem_empreendimento').cumcount().tolist(),
+        etapas_nome_completo.tolist(),
+        etapas_sigla.tolist(),
+        _datas_para_texto(inicio_prev, "%Y-%m-%d"),
+        _datas_para_texto(termino_prev, "%Y-%m-%d"),
+        _datas_para_texto(inicio_real, "%Y-%m-%d"),
+        _datas_para_texto(termino_real_visual, "%Y-%m-%d"),
+        _datas_para_texto(termino_real, "%Y-%m-%d"),
+        setores.tolist(),
+        grupos.tolist(),
+        progresso.astype(int).tolist(),
+        _datas_para_texto(inicio_prev, "%d/%m/%y", "N/D"),
+        _datas_para_texto(termino_prev, "%d/%m/%y", "N/D"),
+        _datas_para_texto(inicio_real, "%d/%m/%y", "N/D"),
+        _datas_para_texto(termino_real, "%d/%m/%y", "N/D"),
+        _meses_para_texto(duracao_prevista_uteis / 21.75),
+        _meses_para_texto(duracao_real_uteis / 21.75),
+        _dias_para_texto(vt),
+        _dias_para_texto(vd),
+        status_color_class.tolist(),
+    )
 
-        data_meta = obter_data_meta_assinatura_novo(df_emp)
+    tasks_por_empreendimento = {}
+    for (empreendimento, i, nome, sigla, start_previsto, end_previsto, start_real, end_real, end_real_original_raw,
+         setor, grupo, progress, inicio_previsto, termino_previsto, inicio_real_txt, termino_real_txt,
+         duracao_prev_meses, duracao_real_meses, vt_text, vd_text, status) in colunas_tarefa:
+        tasks_por_empreendimento.setdefault(empreendimento, []).append({
+            "id": f"t{i}",
+            "name": nome,  # Usar nome completo para exibição
+            "name_sigla": sigla,    # Manter a sigla para referência
+            "numero_etapa": i + 1,
+            "start_previsto": start_previsto,
+            "end_previsto": end_previsto,
+            "start_real": start_real,
+            "end_real": end_real,
+            "end_real_original_raw": end_real_original_raw,
+            "setor": setor,
+            "grupo": grupo,
+            "progress": progress,
+            "inicio_previsto": inicio_previsto,
+            "termino_previsto": termino_previsto,
+            "inicio_real": inicio_real_txt,
+            "termino_real": termino_real_txt,
+            "duracao_prev_meses": duracao_prev_meses,
+            "duracao_real_meses": duracao_real_meses,
+            "vt_text": vt_text,
+            "vd_text": vd_text,
+            "status_color_class": status
+        })
+
+    # Data meta: primeira data disponível da etapa ENTREGA de cada empreendimento
+    entregas = df[df["Etapa"] == "ENTREGA"].drop_duplicates("Empreendimento")
+    colunas_meta = [col for col in ["Inicio_Prevista", "Inicio_Real", "Termino_Prevista", "Termino_Real"] if col in entregas.columns]
+    datas_meta = entregas.set_index("Empreendimento")[colunas_meta].bfill(axis=1).iloc[:, 0] if colunas_meta else pd.Series(dtype="datetime64[ns]")
+    datas_meta = datas_meta.dropna().dt.strftime("%Y-%m-%d").to_dict()
 
-        project = {
-            "id": f"p{len(gantt_data)}", 
+    gantt_data = []
+    for empreendimento, tasks in tasks_por_empreendimento.items():
+        gantt_data.append({
+            "id": f"p{len(gantt_data)}",
             "name": empreendimento,
             "tasks": tasks,
-            "meta_assinatura_date": data_meta.strftime("%Y-%m-%d") if data_meta else None
-        }
-        gantt_data.append(project)
+            "meta_assinatura_date": datas_meta.get(empreendimento)
+        })
 
     return gantt_data
 # --- Funções Utilitárias ---
@@ -410,6 +398,21 @@ def converter_porcentagem(valor):
     except (ValueError, TypeError):
         return 0.0
 
+def normalizar_porcentagem(serie):
+    """
+    Versão vetorizada de converter_porcentagem para a coluna inteira: textos como "50%" ou "0,5"
+    mantêm só dígitos, ponto e vírgula; valores vazios ou inválidos viram 0; valores <= 1 são
+    frações e são multiplicados por 100. Retorna float na escala 0-100.
+    """
+    eh_texto = serie.map(lambda valor: isinstance(valor, str)).astype(bool)
+    numeros = pd.to_numeric(serie.where(~eh_texto), errors='coerce').astype(float)
+    if eh_texto.any():
+        limpos = serie[eh_texto].str.replace(r"[^\d.,]", "", regex=True).str.replace(",", ".", regex=False).str.strip()
+        numeros[eh_texto] = pd.to_numeric(limpos, errors='coerce')
+    numeros = numeros.fillna(0.0)
+    # Arredonda o ruído de ponto flutuante da escala (ex.: 0.58 * 100 = 57.99999999999999)
+    return numeros.where(numeros > 1, numeros * 100).round(6)
+
 def formatar_data(data):
     return data.strftime("%d/%m/%y") if pd.notna(data) else "N/D"
 
@@ -417,7 +420,7 @@ def calcular_dias_uteis(inicio, fim):
     if pd.notna(inicio) and pd.notna(fim):
         data_inicio = np.datetime64(inicio.date())
         data_fim = np.datetime64(fim.date())
-        return np.busday_count(data_inicio, data_fim) + 1
+        return np.busday_count(data_inicio, data_fim, busdaycal=BUSINESS_CALENDAR) + 1
     return 0
 
 def calcular_variacao_termino(termino_real, termino_previsto):
@@ -432,88 +435,117 @@ def calcular_variacao_termino(termino_real, termino_previsto):
 
 def calcular_porcentagem_correta(grupo):
     if "% concluído" not in grupo.columns: return 0.0
-    porcentagens = grupo["% concluído"].astype(str).apply(converter_porcentagem)
+    # A coluna já vem normalizada (0-100) desde a carga
+    porcentagens = grupo["% concluído"]
     porcentagens = porcentagens[(porcentagens >= 0) & (porcentagens <= 100)]
     if porcentagens.empty: return 0.0
     porcentagens_validas = porcentagens.dropna()
     if porcentagens_validas.empty: return 0.0
     return porcentagens_validas.mean()
 
-def padronizar_etapa(etapa_str):
-    """
-    Função robusta para padronizar o nome da etapa.
-    """
+# Mapeamento direto dos valores que vêm do Smartsheet para as siglas da ORDEM_ETAPAS_GLOBAL
+MAPEAMENTO_ETAPAS_SMARTSHEET = {
+    "PL ER E IP": "PL-ER-E-IP",
+    "APROVAÇÃO E.R. (NEOENERGIA)": "APROV-ER-(NEO)",
+    "APROVAÇÃO IP (NEOENERGIA)": "APROV-IP-(NEO)", 
+    "EXECUÇÃO PIQUETE PDE": "PIQ",
+    "SOLICITAÇÃO DE CONEXÃO": "SOLIC-CONEXÃO",
+    "CONEXÃO": "CONEXÃO",
+    "PROJETO EXECUTIVO": "PROJ-EXEC",
+    "ORÇAMENTO": "ORÇ",
+    "SUPRIMENTOS": "SUP",
+    "EXECUÇÃO TER": "EXECUÇÃO-TER",
+    "EXECUÇÃO ER": "EXECUÇÃO-ER",
+    "EXECUÇÃO IP": "EXECUÇÃO-IP",
+    "INCORPORAÇÃO": "INCORPORAÇÃO",
+    "PINTURA DOS BARRAMENTOS": "PINT-BAR",
+    "COMISSIONAMENTO": "COMISSIONAMENTO",
+    "LIGAÇÃO DA IP": "LIG-IP",
+    "CARTA DE ENTREGA ER": "CARTA",
+    "NECESSIDADE DE ENTREGA": "ENTREGA",
+    
+    # Adicionar mapeamentos alternativos se necessário
+    "PL-ER-E-IP": "PL-ER-E-IP",
+    "APROV-ER-(NEO)": "APROV-ER-(NEO)",
+    "APROV-IP-(NEO)": "APROV-IP-(NEO)",
+    "SOLIC-CONEXÃO": "SOLIC-CONEXÃO",
+    "PROJ-EXEC": "PROJ-EXEC",
+    "EXECUÇÃO-TER": "EXECUÇÃO-TER",
+    "EXECUÇÃO-ER": "EXECUÇÃO-ER",
+    "EXECUÇÃO-IP": "EXECUÇÃO-IP",
+    "PINT-BAR": "PINT-BAR",
+    "LIG-IP": "LIG-IP"
+}
+
+# Valor bruto -> (sigla, mapeada?), mantido entre cargas: os valores distintos de FASE quase não mudam
+_cache_padronizacao_etapas = {}
+
+def _resolver_etapa(etapa_str):
+    """Retorna (sigla, mapeada) para um valor bruto de etapa, sem efeitos colaterais."""
     if pd.isna(etapa_str) or etapa_str == "" or etapa_str == "Não especificado":
-        return "Não especificado"
+        return "Não especificado", True
     
     # Converter para string e limpar
     etapa_limpa = str(etapa_str).strip().upper()
     
-    # Mapeamento direto dos valores que vêm do Smartsheet para as siglas da ORDEM_ETAPAS_GLOBAL
-    mapeamento_direto = {
-        "PL ER E IP": "PL-ER-E-IP",
-        "APROVAÇÃO E.R. (NEOENERGIA)": "APROV-ER-(NEO)",
-        "APROVAÇÃO IP (NEOENERGIA)": "APROV-IP-(NEO)", 
-        "EXECUÇÃO PIQUETE PDE": "PIQ",
-        "SOLICITAÇÃO DE CONEXÃO": "SOLIC-CONEXÃO",
-        "CONEXÃO": "CONEXÃO",
-        "PROJETO EXECUTIVO": "PROJ-EXEC",
-        "ORÇAMENTO": "ORÇ",
-        "SUPRIMENTOS": "SUP",
-        "EXECUÇÃO TER": "EXECUÇÃO-TER",
-        "EXECUÇÃO ER": "EXECUÇÃO-ER",
-        "EXECUÇÃO IP": "EXECUÇÃO-IP",
-        "INCORPORAÇÃO": "INCORPORAÇÃO",
-        "PINTURA DOS BARRAMENTOS": "PINT-BAR",
-        "COMISSIONAMENTO": "COMISSIONAMENTO",
-        "LIGAÇÃO DA IP": "LIG-IP",
-        "CARTA DE ENTREGA ER": "CARTA",
-        "NECESSIDADE DE ENTREGA": "ENTREGA",
-        
-        # Adicionar mapeamentos alternativos se necessário
-        "PL-ER-E-IP": "PL-ER-E-IP",
-        "APROV-ER-(NEO)": "APROV-ER-(NEO)",
-        "APROV-IP-(NEO)": "APROV-IP-(NEO)",
-        "SOLIC-CONEXÃO": "SOLIC-CONEXÃO",
-        "PROJ-EXEC": "PROJ-EXEC",
-        "EXECUÇÃO-TER": "EXECUÇÃO-TER",
-        "EXECUÇÃO-ER": "EXECUÇÃO-ER",
-        "EXECUÇÃO-IP": "EXECUÇÃO-IP",
-        "PINT-BAR": "PINT-BAR",
-        "LIG-IP": "LIG-IP"
-    }
-    
     # Tentar mapeamento direto primeiro
-    if etapa_limpa in mapeamento_direto:
-        return mapeamento_direto[etapa_limpa]
+    if etapa_limpa in MAPEAMENTO_ETAPAS_SMARTSHEET:
+        return MAPEAMENTO_ETAPAS_SMARTSHEET[etapa_limpa], True
     
     # Verificar se já é uma sigla válida da ordem global
     if etapa_limpa in ORDEM_ETAPAS_GLOBAL:
-        return etapa_limpa
+        return etapa_limpa, True
     
     # Tentar encontrar correspondência parcial
     for sigla in ORDEM_ETAPAS_GLOBAL:
         if sigla in etapa_limpa or etapa_limpa in sigla:
-            return sigla
+            return sigla, True
     
     # Se não encontrar, retornar original (será colocado no final)
-    print(f"⚠️ Etapa não mapeada: '{etapa_str}' -> '{etapa_limpa}'")
-    return etapa_limpa
+    return etapa_limpa, False
+
+def padronizar_etapa(etapa_str):
+    """
+    Função robusta para padronizar o nome da etapa (valor único).
+    Para colunas inteiras, use padronizar_coluna_etapas.
+    """
+    sigla, mapeada = _resolver_etapa(etapa_str)
+    if not mapeada:
+        print(f"⚠️ Etapa não mapeada: '{etapa_str}' -> '{sigla}'")
+    return sigla
+
+def padronizar_coluna_etapas(serie):
+    """
+    Padroniza uma coluna de etapas resolvendo cada valor DISTINTO uma única vez
+    (factorize -> mapeamento -> broadcast pelos códigos), com cache entre cargas.
+
+    Retorna (serie_padronizada, nao_mapeadas), onde nao_mapeadas é a lista ordenada
+    dos valores originais sem correspondência na ORDEM_ETAPAS_GLOBAL.
+    """
+    codigos, valores_unicos = pd.factorize(serie)
+    siglas = []
+    nao_mapeadas = []
+    for valor in valores_unicos:
+        if valor not in _cache_padronizacao_etapas:
+            _cache_padronizacao_etapas[valor] = _resolver_etapa(valor)
+        sigla, mapeada = _cache_padronizacao_etapas[valor]
+        siglas.append(sigla)
+        if not mapeada:
+            nao_mapeadas.append(str(valor))
+    # O código -1 (valor ausente) pega o último item: "Não especificado"
+    siglas.append("Não especificado")
+    padronizada = pd.Series(np.array(siglas, dtype=object)[codigos], index=serie.index, name=serie.name)
+    return padronizada, sorted(nao_mapeadas)
 
 
 # --- Funções de Filtragem e Ordenação ---
 def filtrar_etapas_nao_concluidas_func(df):
     if df.empty or "% concluído" not in df.columns: return df
-    df_copy = df.copy()
-    df_copy["% concluído"] = df_copy["% concluído"].apply(converter_porcentagem)
-    return df_copy[df_copy["% concluído"] < 100]
+    # A coluna já vem normalizada (0-100) desde a carga
+    return df[df["% concluído"] < 100]
 
-def obter_data_meta_assinatura(df_original, empreendimento):
-    df_meta = df_original[(df_original["Empreendimento"] == empreendimento) & (df_original["Etapa"] == "DEM.MIN")]
-    if df_meta.empty: return pd.Timestamp.max
-    for col in ["Termino_Prevista", "Inicio_Prevista", "Termino_Real", "Inicio_Real"]:
-        if col in df_meta.columns and pd.notna(df_meta[col].iloc[0]): return df_meta[col].iloc[0]
-    return pd.Timestamp.max
+# Datas consultadas, em ordem de prioridade, para a meta de assinatura de cada empreendimento
+COLUNAS_DATA_META_ASSINATURA = ["Termino_Prevista", "Inicio_Prevista", "Termino_Real", "Inicio_Real"]
 
 def converter_nome_empreendimento(nome):
     """
@@ -525,20 +557,50 @@ def converter_nome_empreendimento(nome):
     nome_str = str(nome).strip()
     return sigla_para_nome_completo_emp.get(nome_str, nome_str)
 
+def converter_coluna_empreendimentos(serie):
+    """
+    Converte uma coluna inteira de empreendimentos para nomes completos resolvendo
+    cada valor DISTINTO uma única vez (factorize -> mapeamento -> broadcast pelos códigos).
+    """
+    codigos, valores_unicos = pd.factorize(serie)
+    nomes = [converter_nome_empreendimento(valor) for valor in valores_unicos]
+    # O código -1 (valor ausente) pega o último item: "Não especificado"
+    nomes.append("Não especificado")
+    return pd.Series(np.array(nomes, dtype=object)[codigos], index=serie.index, name=serie.name)
+
 def criar_ordenacao_empreendimentos(df_original):
     """
     Cria uma lista ordenada dos nomes COMPLETOS dos empreendimentos
     com base na data da meta de assinatura (DEMANDA MÍNIMA).
+
+    A data meta vem da primeira linha DEM.MIN de cada empreendimento (primeira data preenchida
+    em COLUNAS_DATA_META_ASSINATURA); sem ela, o empreendimento vai para o final, mantendo a
+    ordem de aparição nos empates. Tudo sai de um único groupby sobre as linhas DEM.MIN.
     """
-    # Aplica conversão aos nomes antes de criar a ordenação
-    df_convertido = df_original.copy()
-    df_convertido["Empreendimento"] = df_convertido["Empreendimento"].apply(converter_nome_empreendimento)
-    
-    empreendimentos_meta = {emp: obter_data_meta_assinatura(df_convertido, emp)
-                           for emp in df_convertido["Empreendimento"].unique()}
-    
-    # Retorna a lista de nomes COMPLETOS ordenados pela data meta
-    return sorted(empreendimentos_meta.keys(), key=empreendimentos_meta.get)
+    # Os nomes já chegam convertidos desde a carga (converter_coluna_empreendimentos)
+    colunas_data = [col for col in COLUNAS_DATA_META_ASSINATURA if col in df_original.columns]
+    df_meta = df_original.loc[df_original["Etapa"] == "DEM.MIN", ["Empreendimento"] + colunas_data]
+    primeira_meta = df_meta.groupby("Empreendimento", observed=True, sort=False).head(1)
+    if colunas_data:
+        # Primeira data preenchida da linha, na ordem de prioridade das colunas
+        datas_meta = primeira_meta[colunas_data].bfill(axis=1).iloc[:, 0].fillna(pd.Timestamp.max)
+    else:
+        datas_meta = pd.Series(pd.Timestamp.max, index=primeira_meta.index)
+    empreendimentos_meta = dict(zip(primeira_meta["Empreendimento"], datas_meta))
+
+    # Retorna a lista de nomes COMPLETOS ordenados pela data meta (sorted é estável)
+    return sorted(df_original["Empreendimento"].unique(),
+                  key=lambda emp: empreendimentos_meta.get(emp, pd.Timestamp.max))
+
+def obter_ordenacao_empreendimentos(versao_dados, conjunto_dados):
+    """
+    Ordenação dos empreendimentos pela meta de assinatura, calculada uma vez por versão dos dados
+    sobre o dataset completo. A lista é compartilhada entre sessões e não deve ser alterada.
+    """
+    return obter_cache_derivados().get_or_compute(
+        versao_dados, ("ordenacao_empreendimentos",),
+        lambda: criar_ordenacao_empreendimentos(conjunto_dados.frame),
+    )
 
 
 def aplicar_ordenacao_final(df, empreendimentos_ordenados):
@@ -546,7 +608,7 @@ def aplicar_ordenacao_final(df, empreendimentos_ordenados):
         return df
         
     # Garantir que as etapas estão no formato correto (siglas)
-    df['Etapa'] = df['Etapa'].apply(padronizar_etapa)
+    df['Etapa'], _ = padronizar_coluna_etapas(df['Etapa'])
     
     # Ordenação por empreendimento
     ordem_empreendimentos = {emp: idx for idx, emp in enumerate(empreendimentos_ordenados)}
@@ -650,6 +712,115 @@ def gerar_relatorio_txt(gantt_data):
             
     return "\n".join(relatorio)
 
+# --- Templates HTML do Gantt ---
+# O HTML/CSS/JS dos gráficos fica em templates/; só os marcadores @@NOME@@ mudam entre renderizações
+DIRETORIO_TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+MARCADOR_TEMPLATE = re.compile(r"@@([A-Z_]+)@@")
+
+@st.cache_resource(show_spinner=False)
+def compilar_template_gantt(nome_arquivo):
+    """Lê o template uma única vez por processo e o separa em (texto, marcador, texto, marcador, ..., texto)."""
+    with open(os.path.join(DIRETORIO_TEMPLATES, nome_arquivo), encoding="utf-8") as arquivo:
+        return tuple(MARCADOR_TEMPLATE.split(arquivo.read()))
+
+def renderizar_template_gantt(nome_arquivo, **valores):
+    """Monta o HTML final substituindo cada marcador pelo valor correspondente (todos são obrigatórios)."""
+    partes = list(compilar_template_gantt(nome_arquivo))
+    valores = {**carregar_assets_virtual_select(), **valores}
+    partes[1::2] = [str(valores[marcador]) for marcador in partes[1::2]]
+    return "".join(partes)
+
+# --- Assets do virtual-select (filtros dentro do Gantt) ---
+# VIRTUAL_SELECT_VERSAO, VIRTUAL_SELECT_CDN e DIRETORIO_VIRTUAL_SELECT vêm de baixar_virtual_select
+# (importados no topo), para o CDN e a cópia local nunca divergirem
+# "auto" (padrão): usa os arquivos versionados em vendor/ e, se faltarem, o CDN; "local" exige
+# os arquivos de vendor/ (erro se faltarem); "cdn" força o CDN
+VIRTUAL_SELECT_ORIGEM_ENV = "NEO_VIRTUAL_SELECT_ORIGEM"
+
+@st.cache_resource(show_spinner=False)
+def ler_assets_virtual_select_locais(caminho_css, caminho_js, mtime_css, mtime_js):
+    """
+    Lê os arquivos locais uma vez por versão em disco (as datas de modificação entram na chave
+    do cache, então arquivos adicionados ou trocados são lidos de novo sem reiniciar o processo).
+    """
+    with open(caminho_css, encoding="utf-8") as arquivo:
+        css = arquivo.read()
+    with open(caminho_js, encoding="utf-8") as arquivo:
+        # Evita que uma string "</script" do bundle feche a tag antes da hora
+        js = arquivo.read().replace("</script", "<\\/script")
+    return {
+        "VIRTUAL_SELECT_CSS": f"<style>{css}</style>",
+        "VIRTUAL_SELECT_JS": f"<script>{js}</script>",
+    }
+
+def carregar_assets_virtual_select():
+    """
+    Retorna as tags de CSS e JS do virtual-select para os marcadores dos templates do Gantt.
+
+    Na origem local o conteúdo é embutido no HTML: a pasta static do Streamlit serve .js/.css
+    como text/plain com nosniff, então o navegador não os executaria por URL. Os arquivos só são
+    lidos do disco (ver baixar_virtual_select.py); o app nunca os baixa.
+    """
+    origem = os.getenv(VIRTUAL_SELECT_ORIGEM_ENV, "auto").strip().lower()
+    caminho_css = os.path.join(DIRETORIO_VIRTUAL_SELECT, "virtual-select.min.css")
+    caminho_js = os.path.join(DIRETORIO_VIRTUAL_SELECT, "virtual-select.min.js")
+
+    if origem != "cdn":
+        if os.path.exists(caminho_css) and os.path.exists(caminho_js):
+            return ler_assets_virtual_select_locais(
+                caminho_css, caminho_js, os.path.getmtime(caminho_css), os.path.getmtime(caminho_js)
+            )
+        if origem == "local":
+            raise FileNotFoundError(
+                f"virtual-select {VIRTUAL_SELECT_VERSAO} não encontrado em {DIRETORIO_VIRTUAL_SELECT} "
+                f"({VIRTUAL_SELECT_ORIGEM_ENV}=local). Execute baixar_virtual_select.py e versione os arquivos."
+            )
+        return assets_virtual_select_cdn(
+            f"virtual-select {VIRTUAL_SELECT_VERSAO} não encontrado em {DIRETORIO_VIRTUAL_SELECT}; "
+            "usando o CDN. Execute baixar_virtual_select.py e versione os arquivos."
+        )
+    return assets_virtual_select_cdn()
+
+@st.cache_resource(show_spinner=False)
+def assets_virtual_select_cdn(aviso=None):
+    """Tags apontando para o CDN; o aviso (se houver) vai para o log uma vez por processo."""
+    if aviso:
+        logging.warning(aviso)
+    return {
+        "VIRTUAL_SELECT_CSS": f'<link rel="stylesheet" href="{VIRTUAL_SELECT_CDN}/virtual-select.min.css">',
+        "VIRTUAL_SELECT_JS": f'<script src="{VIRTUAL_SELECT_CDN}/virtual-select.min.js"></script>',
+    }
+
+# --- Cache do payload do Gantt por projeto ---
+def chave_conteudo_dataframe(df):
+    """Impressão digital do conteúdo de um DataFrame (colunas + valores), usada como chave de cache."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    digest.update("|".join(map(str, df.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def montar_payload_gantt_projeto(chave_dados, dia_referencia, _df_gantt_agg):
+    """
+    Converte o DataFrame agregado em lista de projetos e já serializa os JSONs usados no HTML.
+
+    O DataFrame não entra no hash do Streamlit (prefixo `_`): a chave é o conteúdo dos dados
+    filtrados (`chave_dados`, que já reflete a seleção de UGB/filtros) mais o dia de referência,
+    já que o status e a barra real das tarefas em andamento dependem da data atual.
+    Assim, reruns disparados por widgets que não mexem nos dados reaproveitam o resultado.
+    """
+    gantt_data = converter_dados_para_gantt(_df_gantt_agg)
+    if not gantt_data:
+        return {"gantt_data": gantt_data}
+
+    # Sempre usamos o primeiro projeto da lista
+    project = gantt_data[0]
+    return {
+        "gantt_data": gantt_data,
+        "all_projects_json": json.dumps(gantt_data),
+        "project_json": json.dumps([project]),
+        "tasks_json": json.dumps(project['tasks']),
+    }
+
 # --- *** FUNÇÃO gerar_gantt_por_projeto MODIFICADA *** ---
 def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, pulmao_status, pulmao_meses):
         """
@@ -659,18 +830,15 @@ def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, p
         # --- Processar DF SEM PULMÃO ---
         df_sem_pulmao = df.copy()
         df_gantt_sem_pulmao = df_sem_pulmao.copy()
+        conferir_esquema(df_gantt_sem_pulmao, "gerar_gantt_por_projeto")
 
-        # **CORREÇÃO: Garantir que as colunas de datas sejam datetime ANTES da agregação**
-        for col in ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]:
-            if col in df_gantt_sem_pulmao.columns:
-                df_gantt_sem_pulmao[col] = pd.to_datetime(df_gantt_sem_pulmao[col], errors="coerce")
-
+        # "% concluído" já vem normalizado (0-100) desde a carga
         if "% concluído" not in df_gantt_sem_pulmao.columns:
-            df_gantt_sem_pulmao["% concluído"] = 0
-        df_gantt_sem_pulmao["% concluído"] = df_gantt_sem_pulmao["% concluído"].fillna(0).apply(converter_porcentagem)
+            df_gantt_sem_pulmao["% concluído"] = 0.0
+        df_gantt_sem_pulmao["% concluído"] = df_gantt_sem_pulmao["% concluído"].fillna(0)
 
         # Agrega os dados (usando nomes completos)
-        df_gantt_agg_sem_pulmao = df_gantt_sem_pulmao.groupby(['Empreendimento', 'Etapa']).agg(
+        df_gantt_agg_sem_pulmao = df_gantt_sem_pulmao.groupby(['Empreendimento', 'Etapa'], observed=True).agg(
             Inicio_Prevista=('Inicio_Prevista', 'min'),
             Termino_Prevista=('Termino_Prevista', 'max'),
             Inicio_Real=('Inicio_Real', 'min'),
@@ -679,14 +847,22 @@ def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, p
             SETOR=('SETOR', 'first')
         ).reset_index()
 
-        df_gantt_agg_sem_pulmao["Etapa"] = df_gantt_agg_sem_pulmao["Etapa"].map(sigla_para_nome_completo).fillna(df_gantt_agg_sem_pulmao["Etapa"])
+        # Renomeia as categorias (sigla -> nome completo) mantendo a ordem das etapas
+        df_gantt_agg_sem_pulmao["Etapa"] = df_gantt_agg_sem_pulmao["Etapa"].cat.rename_categories(
+            lambda sigla: sigla_para_nome_completo.get(sigla, sigla)
+        )
         
         # Mapear o SETOR e GRUPO
-        df_gantt_agg_sem_pulmao["SETOR"] = df_gantt_agg_sem_pulmao["Etapa"].map(SETOR_POR_ETAPA).fillna(df_gantt_agg_sem_pulmao["SETOR"])
-        df_gantt_agg_sem_pulmao["GRUPO"] = df_gantt_agg_sem_pulmao["Etapa"].map(GRUPO_POR_ETAPA).fillna("Não especificado")
-
-        # Converte o DataFrame FILTRADO agregado em lista de projetos
-        gantt_data_base = converter_dados_para_gantt(df_gantt_agg_sem_pulmao)
+        df_gantt_agg_sem_pulmao["SETOR"] = df_gantt_agg_sem_pulmao["Etapa"].map(SETOR_POR_ETAPA).fillna(df_gantt_agg_sem_pulmao["SETOR"]).astype("category")
+        df_gantt_agg_sem_pulmao["GRUPO"] = df_gantt_agg_sem_pulmao["Etapa"].map(GRUPO_POR_ETAPA).fillna("Não especificado").astype("category")
+
+        # Converte o DataFrame FILTRADO agregado em lista de projetos (memoizado pelo conteúdo)
+        payload_gantt = montar_payload_gantt_projeto(
+            chave_conteudo_dataframe(df_gantt_agg_sem_pulmao),
+            pd.Timestamp.now().date(),
+            df_gantt_agg_sem_pulmao
+        )
+        gantt_data_base = payload_gantt["gantt_data"]
 
         # --- SE NÃO HÁ DADOS FILTRADOS, NÃO FAZ NADA ---
         if not gantt_data_base:
@@ -718,8 +894,6 @@ def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, p
         total_meses_proj = ((data_max_proj.year - data_min_proj.year) * 12) + (data_max_proj.month - data_min_proj.month) + 1
 
         num_tasks = len(project["tasks"]) if project else 0
-            # Converte o DataFrame FILTRADO agregado em lista de projetos
-        gantt_data_base = converter_dados_para_gantt(df_gantt_agg_sem_pulmao)
         
         # DEBUG SIMPLES da ordem
         debug_ordem_etapas(gantt_data_base)
@@ -732,1913 +906,24 @@ def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, p
         altura_gantt = max(400, min(800, (num_tasks * 25) + 200))  # Limita a altura máxima
 
         # --- Geração do HTML ---
-        gantt_html = f"""
-        <!DOCTYPE html>
-            <html lang="pt-BR">
-            <head>
-                <meta charset="utf-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                
-                <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/virtual-select-plugin@1.0.39/dist/virtual-select.min.css">
-                
-                <style>
-                    * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-                    html, body {{ width: 100%; height: 100%; font-family: 'Segoe UI', sans-serif; background-color: #f5f5f5; color: #333; overflow: hidden; }}
-                    .gantt-container {{ width: 100%; height: 100%; background-color: white; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); overflow: hidden; position: relative; display: flex; flex-direction: column; }}
-                    .gantt-main {{ display: flex; flex: 1; overflow: hidden; }}
-                    .gantt-sidebar-wrapper {{ width: 680px; display: flex; flex-direction: column; flex-shrink: 0; transition: width 0.3s ease-in-out; border-right: 2px solid #e2e8f0; overflow: hidden; }}
-                    .gantt-sidebar-header {{ background: linear-gradient(135deg, #4a5568, #2d3748); display: flex; flex-direction: column; height: 60px; flex-shrink: 0; }}
-                    .project-title-row {{ display: flex; justify-content: space-between; align-items: center; padding: 0 15px; height: 30px; color: white; font-weight: 600; font-size: 14px; }}
-                    .toggle-sidebar-btn {{ background: rgba(255,255,255,0.2); border: none; color: white; width: 24px; height: 24px; border-radius: 5px; cursor: pointer; font-size: 14px; display: flex; align-items: center; justify-content: center; transition: background-color 0.2s, transform 0.3s ease-in-out; }}
-                    .toggle-sidebar-btn:hover {{ background: rgba(255,255,255,0.4); }}
-                    .sidebar-grid-header-wrapper {{ display: grid; grid-template-columns: 30px 1fr; color: #d1d5db; font-size: 9px; font-weight: 600; text-transform: uppercase; height: 30px; align-items: center; }}
-                    .sidebar-grid-header {{ display: grid; grid-template-columns: 2.5fr 0.9fr 0.9fr 0.6fr 0.9fr 0.9fr 0.6fr 0.5fr 0.6fr 0.6fr; padding: 0 10px; align-items: center; }}
-                    .sidebar-row {{ display: grid; grid-template-columns: 2.5fr 0.9fr 0.9fr 0.6fr 0.9fr 0.9fr 0.6fr 0.5fr 0.6fr 0.6fr; border-bottom: 1px solid #eff2f5; height: 30px; padding: 0 10px; background-color: white; transition: all 0.2s ease-in-out; }}
-                    .sidebar-cell {{ display: flex; align-items: center; justify-content: center; font-size: 11px; color: #4a5568; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; padding: 0 8px; border: none; }}
-                    .header-cell {{ text-align: center; }}
-                    .header-cell.task-name-cell {{ text-align: left; }}
-                    .gantt-sidebar-content {{ background-color: #f8f9fa; flex: 1; overflow-y: auto; overflow-x: hidden; }}
-                    
-                    /* Estilos para agrupamento */
-                    .main-task-row {{ font-weight: 600; }}
-                    .main-task-row.has-subtasks {{ cursor: pointer; }}
-                    .expand-collapse-btn {{
-                        background: none;
-                        border: none;
-                        cursor: pointer;
-                        width: 20px;
-                        height: 20px;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        font-size: 12px;
-                        color: #4a5568;
-                        margin-right: 5px;
-                    }}
-                    .subtask-row {{ 
-                        display: none;
-                        background-color: #f8fafc;
-                        padding-left: 40px;
-                    }}
-                    .subtask-row.visible {{ display: grid; }}
-                    .gantt-subtask-row {{ 
-                        display: none;
-                        background-color: #f8fafc;
-                    }}
-                    .gantt-subtask-row.visible {{ 
-                        display: block !important;
-                    }}
-                    
-                    /* Estilo para barras de etapas pai quando subetapas estão expandidas */
-                    .gantt-bar.parent-task-real.expanded {{
-                        background-color: transparent !important;
-                        border: 2px solid;
-                        box-shadow: none;
-                    }}
-                    .gantt-bar.parent-task-real.expanded .bar-label {{
-                        color: #000000 !important;
-                        text-shadow: 0 1px 2px rgba(255,255,255,0.8);
-                    }}
-                    
-                    .sidebar-group-wrapper {{
-                        display: flex;
-                        border-bottom: 1px solid #e2e8f0;
-                    }}
-                    .gantt-sidebar-content > .sidebar-group-wrapper:last-child {{ border-bottom: none; }}
-                    .sidebar-group-title-vertical {{
-                        width: 30px; background-color: #f8fafc; color: #4a5568;
-                        font-size: 8px; 
-                        font-weight: 700; text-transform: uppercase;
-                        display: flex; align-items: center; justify-content: center;
-                        writing-mode: vertical-rl; transform: rotate(180deg);
-                        flex-shrink: 0; border-right: 1px solid #e2e8f0;
-                        text-align: center; white-space: nowrap; overflow: hidden;
-                        text-overflow: ellipsis; padding: 5px 0; letter-spacing: -0.5px;
-                        align-self: flex-start;
-                    }}
-                    .sidebar-group-spacer {{ display: none; }}
-                    .sidebar-rows-container {{ flex-grow: 1; }}
-                    .sidebar-row.odd-row {{ background-color: #fdfdfd; }}
-                    .sidebar-rows-container .sidebar-row:last-child {{ border-bottom: none; }}
-                    .sidebar-row:hover {{ background-color: #f5f8ff; }}
-                    .sidebar-cell.task-name-cell {{ justify-content: flex-start; font-weight: 600; color: #2d3748; }}
-                    .sidebar-cell.status-green {{ color: #1E8449; font-weight: 700; }}
-                    .sidebar-cell.status-red    {{ color: #C0392B; font-weight: 700; }}
-                    .sidebar-cell.status-yellow{{ color: #B9770E; font-weight: 700; }}
-                    .sidebar-cell.status-default{{ color: #566573; font-weight: 700; }}
-                    .sidebar-row .sidebar-cell:nth-child(2),
-                    .sidebar-row .sidebar-cell:nth-child(3),
-                    .sidebar-row .sidebar-cell:nth-child(4),
-                    .sidebar-row .sidebar-cell:nth-child(5),
-                    .sidebar-row .sidebar-cell:nth-child(6),
-                    .sidebar-row .sidebar-cell:nth-child(7),
-                    .sidebar-row .sidebar-cell:nth-child(8),
-                    .sidebar-row .sidebar-cell:nth-child(9),
-                    .sidebar-row .sidebar-cell:nth-child(10) {{ font-size: 8px; }}
-                    .gantt-row-spacer, .sidebar-row-spacer {{
-                        height: 15px;
-                        border: none;
-                        border-bottom: 1px solid #e2e8f0; 
-                        box-sizing: border-box; 
-                    }}
-                    .gantt-row-spacer {{ background-color: #ffffff; position: relative; z-index: 5; }}
-                    .sidebar-row-spacer {{ background-color: #f8f9fa; }}
-                    .gantt-sidebar-wrapper.collapsed {{ width: 250px; }}
-                    .gantt-sidebar-wrapper.collapsed .sidebar-grid-header, .gantt-sidebar-wrapper.collapsed .sidebar-row {{ grid-template-columns: 1fr; padding: 0 15px 0 10px; }}
-                    .gantt-sidebar-wrapper.collapsed .header-cell:not(.task-name-cell), .gantt-sidebar-wrapper.collapsed .sidebar-cell:not(.task-name-cell) {{ display: none; }}
-                    .gantt-sidebar-wrapper.collapsed .toggle-sidebar-btn {{ transform: rotate(180deg); }}
-                    .gantt-chart-content {{ flex: 1; overflow: auto; position: relative; background-color: white; user-select: none; cursor: grab; }}
-                    .gantt-chart-content.active {{ cursor: grabbing; }}
-                    .chart-container {{ position: relative; min-width: {total_meses_proj * 30}px; }}
-                    .chart-header {{ background: linear-gradient(135deg, #4a5568, #2d3748); color: white; height: 60px; position: sticky; top: 0; z-index: 9; display: flex; flex-direction: column; }}
-                    .year-header {{ height: 30px; display: flex; align-items: center; border-bottom: 1px solid rgba(255,255,255,0.2); }}
-                    .year-section {{ text-align: center; font-weight: 600; font-size: 12px; display: flex; align-items: center; justify-content: center; background: rgba(255,255,255,0.1); height: 100%; }}
-                    .month-header {{ height: 30px; display: flex; align-items: center; }}
-                    .month-cell {{ width: 30px; height: 30px; border-right: 1px solid rgba(255,255,255,0.2); display: flex; align-items: center; justify-content: center; font-size: 10px; font-weight: 500; }}
-                    .chart-body {{ position: relative; }}
-                    .gantt-row {{ position: relative; height: 30px; border-bottom: 1px solid #eff2f5; background-color: white; }}
-                    .gantt-bar {{ position: absolute; height: 14px; top: 8px; border-radius: 3px; cursor: pointer; transition: all 0.2s ease; display: flex; align-items: center; padding: 0 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-                    .gantt-bar-overlap {{ position: absolute; height: 14px; top: 8px; background-image: linear-gradient(45deg, rgba(0, 0, 0, 0.25) 25%, transparent 25%, transparent 50%, rgba(0, 0, 0, 0.25) 50%, rgba(0, 0, 0, 0.25) 75%, transparent 75%, transparent); background-size: 8px 8px; z-index: 9; pointer-events: none; border-radius: 3px; }}
-                    .gantt-bar:hover {{ transform: translateY(-1px) scale(1.01); box-shadow: 0 4px 8px rgba(0,0,0,0.2); z-index: 10 !important; }}
-                    .gantt-bar.previsto {{ z-index: 7; }}
-                    .gantt-bar.real {{ z-index: 8; }}
-                    .bar-label {{ font-size: 8px; font-weight: 600; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; text-shadow: 0 1px 2px rgba(0,0,0,0.4); }}
-                    .gantt-bar.real .bar-label {{ color: white; }}
-                    .gantt-bar.previsto .bar-label {{ color: #6C6C6C; }}
-                    .tooltip {{ position: fixed; background-color: #2d3748; color: white; padding: 6px 10px; border-radius: 4px; font-size: 11px; z-index: 1000; box-shadow: 0 2px 8px rgba(0,0,0,0.3); pointer-events: none; opacity: 0; transition: opacity 0.2s ease; max-width: 220px; }}
-                    .tooltip.show {{ opacity: 1; }}
-                    .today-line {{ position: absolute; top: 60px; bottom: 0; width: 1px; background-color: #fdf1f1; z-index: 5; box-shadow: 0 0 1px rgba(229, 62, 62, 0.6); }}
-                    .month-divider {{ position: absolute; top: 60px; bottom: 0; width: 1px; background-color: #fcf6f6; z-index: 4; pointer-events: none; }}
-                    .month-divider.first {{ background-color: #eeeeee; width: 1px; }}
-                    .meta-line {{ position: absolute; top: 60px; bottom: 0; width: 2px; border-left: 2px dashed #6B6B6B; z-index: 5; box-shadow: 0 0 1px rgba(142, 68, 173, 0.6); }}
-                    .meta-line-label {{ position: absolute; top: 65px; background-color: #3a3a3a; color: white; padding: 2px 5px; border-radius: 4px; font-size: 9px; font-weight: 600; white-space: nowrap; z-index: 8; transform: translateX(-50%); }}
-                    .gantt-chart-content, .gantt-sidebar-content {{
-                        scrollbar-width: thin;
-                        scrollbar-color: transparent transparent;
-                    }}
-                    .gantt-chart-content:hover, .gantt-sidebar-content:hover {{
-                        scrollbar-color: #d1d5db transparent;
-                    }}
-                    .gantt-chart-content::-webkit-scrollbar,
-                    .gantt-sidebar-content::-webkit-scrollbar {{
-                        height: 8px;
-                        width: 8px;
-                    }}
-                    .gantt-chart-content::-webkit-scrollbar-track,
-                    .gantt-sidebar-content::-webkit-scrollbar-track {{
-                        background: transparent;
-                    }}
-                    .gantt-chart-content::-webkit-scrollbar-thumb,
-                    .gantt-sidebar-content::-webkit-scrollbar-thumb {{
-                        background-color: transparent;
-                        border-radius: 4px;
-                    }}
-                    .gantt-chart-content:hover::-webkit-scrollbar-thumb,
-                    .gantt-sidebar-content:hover::-webkit-scrollbar-thumb {{
-                        background-color: #d1d5db;
-                    }}
-                    .gantt-chart-content:hover::-webkit-scrollbar-thumb:hover,
-                    .gantt-sidebar-content:hover::-webkit-scrollbar-thumb:hover {{
-                        background-color: #a8b2c1;
-                    }}
-                    .gantt-toolbar {{
-                        position: absolute; top: 10px; right: 10px;
-                        z-index: 100;
-                        display: flex;
-                        flex-direction: column;
-                        gap: 5px;
-                        background: rgba(45, 55, 72, 0.9); /* Cor de fundo escura para minimalismo */
-                        border-radius: 6px;
-                        padding: 5px;
-                        box-shadow: 0 4px 12px rgba(0,0,0,0.3);
-                    }}
-                    .toolbar-btn {{
-                        background: none;
-                        border: none;
-                        width: 36px;
-                        height: 36px;
-                        border-radius: 4px;
-                        cursor: pointer;
-                        font-size: 20px;
-                        color: white;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        transition: background-color 0.2s, box-shadow 0.2s;
-                        padding: 0;
-                    }}
-                    .toolbar-btn:hover {{
-                        background-color: rgba(255, 255, 255, 0.1);
-                        box-shadow: 0 0 0 2px rgba(255, 255, 255, 0.2);
-                    }}
-                    .toolbar-btn.is-fullscreen {{
-                        background-color: #3b82f6; /* Cor de destaque para o botão ativo */
-                        box-shadow: 0 0 0 2px #3b82f6;
-                    }}
-                    .toolbar-btn.is-fullscreen:hover {{
-                        background-color: #2563eb;
-                    }}
-                    /* Tira o background do container quando colapsado e esconde botões */
-                    .gantt-toolbar.collapsed {{
-                        background: transparent;
-                        box-shadow: none;
-                        padding: 0;
-                        pointer-events: none;
-                        top: 3px; /* Alinha com o botão de toggle da sidebar */
-                    }}
-                    .gantt-toolbar.collapsed .toolbar-btn {{
-                        display: none;
-                    }}
-                    /* O botão de toggle sempre aparece, mas muda de estilo quando colapsado */
-                    .gantt-toolbar.collapsed .toolbar-toggle-btn {{
-                        display: flex;
-                        pointer-events: auto;
-                        background: rgba(255, 255, 255, 0.3);
-                        color: #4a5568;
-                        width: 24px;
-                        height: 24px;
-                        border-radius: 4px;
-                        backdrop-filter: blur(2px);
-                    }}
-                    .gantt-toolbar.collapsed .toolbar-toggle-btn:hover {{
-                        background: rgba(255, 255, 255, 0.8);
-                        opacity: 1;
-                        transform: scale(1.1);
-                    }}
-                    .toolbar-toggle-btn {{
-                         /* Botão normal dentro da toolbar */
-                         margin-bottom: 2px;
-                    }}
-                    .toolbar-toggle-btn svg {{
-                        transition: transform 0.3s ease;
-                    }}
-                    .gantt-toolbar.collapsed .toolbar-toggle-btn svg {{
-                        transform: rotate(180deg);
-                    }}
-                    .floating-filter-menu {{
-                        display: none;
-                        position: absolute;
-                        top: 10px; right: 50px; /* Ajuste a posição para abrir ao lado da barra de ferramentas */
-                        width: 280px;
-                        background: white;
-                        border-radius: 8px;
-                        box-shadow: 0 5px 15px rgba(0,0,0,0.3);
-                        z-index: 99;
-                        padding: 15px;
-                        border: 1px solid #e2e8f0;
-                    }}
-                    .floating-filter-menu.is-open {{
-                        display: block;
-                    }}
-                    .filter-group {{ margin-bottom: 12px; }}
-                    .filter-group label {{
-                        display: block;
-                        font-size: 11px; font-weight: 600;
-                        color: #4a5568; margin-bottom: 4px;
-                        text-transform: uppercase;
-                    }}
-                    .filter-group select, .filter-group input[type=number] {{
-                        width: 100%;
-                        padding: 6px 8px;
-                        border: 1px solid #cbd5e0;
-                        border-radius: 4px;
-                        font-size: 13px;
-                    }}
-                    .filter-group-radio, .filter-group-checkbox {{
-                        display: flex; align-items: center;
-                        padding: 5px 0;
-                    }}
-                    .filter-group-radio input, .filter-group-checkbox input {{
-                        width: auto; margin-right: 8px;
-                    }}
-                    .filter-group-radio label, .filter-group-checkbox label {{
-                        font-size: 13px; font-weight: 500;
-                        color: #2d3748; margin-bottom: 0; text-transform: none;
-                    }}
-                    .filter-apply-btn {{
-                        width: 100%; padding: 8px; font-size: 14px; font-weight: 600;
-                        color: white; background-color: #2d3748;
-                        border: none; border-radius: 4px; cursor: pointer;
-                        margin-top: 5px;
-                    }}
-
-                    .floating-filter-menu .vscomp-toggle-button {{
-                        border: 1px solid #cbd5e0;
-                        border-radius: 4px;
-                        padding: 6px 8px;
-                        font-size: 13px;
-                        min-height: 30px;
-                    }}
-                    .floating-filter-menu .vscomp-options {{
-                        font-size: 13px;
-                    }}
-                    .floating-filter-menu .vscomp-option {{
-                        min-height: 30px;
-                    }}
-                    .floating-filter-menu .vscomp-search-input {{
-                        height: 30px;
-                        font-size: 13px;
-                    }}
-
-                    /* ==== RADIAL CONTEXT MENU ==== */
-                    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&display=swap');
-                    
-                    #radial-menu {{
-                        position: fixed;
-                        z-index: 2147483647;
-                        display: none;
-                        font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    }}
-
-                    .radial-menu-wrapper {{
-                        position: relative;
-                        width: 170px;
-                        height: 170px;
-                    }}
-
-                    .radial-center {{
-                        position: absolute;
-                        top: 50%;
-                        left: 50%;
-                        transform: translate(-50%, -50%);
-                        width: 28px;
-                        height: 28px;
-                        border: 2px solid #007AFF;
-                        border-radius: 50%;
-                        background: transparent;
-                        cursor: pointer;
-                        transition: all 0.2s ease;
-                        z-index: 10;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                    }}
-
-                    .radial-center:hover {{
-                        transform: translate(-50%, -50%) scale(1.1);
-                        border-width: 3px;
-                    }}
-
-                    .radial-background-circle {{
-                        position: absolute;
-                        top: 50%;
-                        left: 50%;
-                        transform: translate(-50%, -50%);
-                        width: 90px;
-                        height: 90px;
-                        border: 2px solid #f0f0f0;
-                        border-radius: 50%;
-                        background: transparent;
-                        z-index: 1;
-                    }}
-
-                    .radial-item {{
-                        position: absolute;
-                        width: 22px;
-                        height: 22px;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        cursor: pointer;
-                        transition: all 0.2s ease;
-                        z-index: 5;
-                        background: white;
-                        border: 1.5px solid #f0f0f0;
-                        border-radius: 5px;
-                        box-shadow: 0 1px 4px rgba(0, 0, 0, 0.1);
-                    }}
-
-                    .radial-item:hover {{
-                        background: #f5f5f5;
-                        transform: scale(1.1);
-                        box-shadow: 0 2px 6px rgba(0, 0, 0, 0.15);
-                        border-color: #007AFF;
-                    }}
-
-                    .radial-item svg {{
-                        width: 14px;
-                        height: 14px;
-                        transition: all 0.2s ease;
-                        fill: #333333;
-                        stroke: #333333;
-                    }}
-
-                    .radial-item:hover svg {{
-                        fill: #007AFF;
-                        stroke: #007AFF;
-                    }}
-
-                    /* Modo de Foco - Escurecer barras */
-                    .gantt-bar.focus-mode {{
-                        filter: grayscale(100%) brightness(0.4) !important;
-                        opacity: 0.5 !important;
-                        transition: all 0.3s ease;
-                    }}
-
-                    .gantt-bar.focus-mode.focused {{
-                        filter: none !important;
-                        opacity: 1 !important;
-                    }}
-
-                    .radial-tooltip {{
-                        position: absolute;
-                        padding: 3px 6px;
-                        border-radius: 10px;
-                        font-size: 8px;
-                        font-weight: 500;
-                        white-space: nowrap;
-                        display: flex;
-                        align-items: center;
-                        gap: 5px;
-                        pointer-events: none;
-                        transition: background 0.2s ease, color 0.2s ease;
-                        z-index: 15;
-                        background: #f5f5f5;
-                        color: #333;
-                    }}
-
-                    .radial-item:hover + .radial-tooltip {{
-                        background: #007AFF;
-                        color: white;
-                    }}
-
-                    .radial-item:hover + .radial-tooltip .tooltip-badge {{
-                        background: white;
-                        color: #007AFF;
-                    }}
-
-                    .radial-item:hover + .radial-tooltip.yellow-tooltip {{
-                        background: #FFC107 !important;
-                        color: #333 !important;
-                    }}
-
-                    .radial-item:hover + .radial-tooltip.yellow-tooltip .tooltip-badge {{
-                        background: #333;
-                        color: #FFC107;
-                    }}
-
-                    .tooltip-badge {{
-                        padding: 2px 5px;
-                        border-radius: 4px;
-                        font-size: 8px;
-                        font-weight: 600;
-                        min-width: 14px;
-                        text-align: center;
-                        font-family: 'SF Mono', Monaco, 'Courier New', monospace;
-                        background: #e0e0e0;
-                        color: #666;
-                    }}
-
-                    @keyframes fadeIn {{
-                        from {{ opacity: 0; transform: scale(0.8); }}
-                        to {{ opacity: 1; transform: scale(1); }}
-                    }}
-
-                    .radial-item, .radial-tooltip {{
-                        animation: fadeIn 0.3s ease-out;
-                    }}
-
-                    /* ==== FLOATING NOTEPAD ==== */
-                    #floating-notepad {{
-                        display: none;
-                        position: fixed;
-                        top: 100px;
-                        right: 50px;
-                        width: 320px;
-                        height: 420px;
-                        background: white;
-                        border: 1px solid #e8e8e8;
-                        border-radius: 16px;
-                        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.08);
-                        z-index: 9999;
-                        flex-direction: column;
-                        font-family: 'Inter', sans-serif;
-                        overflow: hidden;
-                        resize: both;
-                        min-width: 250px;
-                        min-height: 200px;
-                        max-width: 600px;
-                        max-height: 80vh;
-                    }}
-
-                    .notepad-header {{
-                        padding: 14px 18px;
-                        background: #2E384A;
-                        color: white;
-                        display: flex;
-                        justify-content: space-between;
-                        align-items: center;
-                        cursor: move;
-                        user-select: none;
-                        border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-                    }}
-
-                    .notepad-header-title {{
-                        display: flex;
-                        align-items: center;
-                        gap: 8px;
-                    }}
-
-                    .notepad-header-title svg {{
-                        width: 18px;
-                        height: 18px;
-                        fill: white;
-                    }}
-
-                    .notepad-header span {{
-                        font-size: 13px;
-                        font-weight: 600;
-                        letter-spacing: 0.3px;
-                    }}
-
-                    .notepad-close {{
-                        background: rgba(255, 255, 255, 0.15);
-                        border: none;
-                        color: white;
-                        width: 26px;
-                        height: 26px;
-                        border-radius: 6px;
-                        cursor: pointer;
-                        font-size: 16px;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        transition: all 0.2s ease;
-                    }}
-
-                    .notepad-close:hover {{
-                        background: rgba(255, 255, 255, 0.25);
-                        transform: scale(1.1);
-                    }}
-
-                    .notepad-content {{
-                        flex: 1;
-                        padding: 18px;
-                        border: none;
-                        outline: none;
-                        resize: none;
-                        font-size: 14px;
-                        line-height: 1.6;
-                        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                        color: #2d3748;
-                    }}
-
-                    .notepad-content::placeholder {{
-                        color: #a0aec0;
-                    }}
-
-                </style>
-            </head>
-            <body>
-                <script id="grupos-gantt-data" type="application/json">{json.dumps(GRUPOS)}</script>
-                
-                <div class="gantt-container" id="gantt-container-{project['id']}">
-                    <!-- Menu Radial de Contexto -->
-                    <div id="radial-menu">
-                        <div class="radial-menu-wrapper">
-                            <div class="radial-background-circle"></div>
-                            <div class="radial-center" title="Menu Radial"></div>
-                            <div class="radial-item" id="btn-notepad" style="top: 74px; left: 120px;">
-                                <svg viewBox="0 0 24 24"><path d="M3 17.25V21h3.75L17.81 9.94l-3.75-3.75L3 17.25zM20.71 7.04c.39-.39.39-1.02 0-1.41l-2.34-2.34c-.39-.39-1.02-.39-1.41 0l-1.83 1.83 3.75 3.75 1.83-1.83z"/></svg>
-                            </div>
-                            <div class="radial-tooltip" style="top: 74px; left: 146px;">Notas <span class="tooltip-badge">N</span></div>
-                            <div class="radial-item" id="btn-focus-mode" style="top: 74px; left: 28px;">
-                                <svg viewBox="0 0 24 24"><rect x="3" y="3" width="7" height="7" rx="1"/><rect x="14" y="3" width="7" height="7" rx="1"/><rect x="3" y="14" width="7" height="7" rx="1"/><path d="M18 18l-3-3m3 3l3-3m-3 3v-6" stroke="currentColor" fill="none" stroke-width="2"/></svg>
-                            </div>
-                            <div class="radial-tooltip" style="top: 74px; right: 146px;">Modo Foco <span class="tooltip-badge">F</span></div>
-                        </div>
-                    </div>
-                    <div id="floating-notepad">
-                        <div class="notepad-header">
-                            <div class="notepad-header-title">
-                                <svg version="1.1" viewBox="0 0 512 512"><path d="M438.8,73.2H292.4L255,0H73.2v512h365.6V73.2z M401.3,474.5H110.7V37.5h119.2l37.4,73.2h134.1V474.5z"/><rect x="146.3" y="150.8" width="219.4" height="36.6"/><rect x="146.3" y="224" width="219.4" height="36.6"/><rect x="146.3" y="297.1" width="219.4" height="36.6"/><rect x="146.3" y="370.3" width="135.9" height="36.6"/></svg>
-                                <span>Anotações</span>
-                            </div>
-                            <button class="notepad-close">×</button>
-                        </div>
-                        <textarea class="notepad-content" placeholder="Digite suas anotações aqui...&#10;&#10;• Use este espaço para lembrar de tarefas pendentes&#10;• Anote insights sobre o projeto&#10;• Suas notas são salvas automaticamente"></textarea>
-                    </div>
-                    
-                <div class="gantt-toolbar" id="gantt-toolbar-{project["id"]}">
-                    <button class="toolbar-btn toolbar-toggle-btn" id="toolbar-toggle-btn-{project["id"]}" title="Recolher/Expandir Tabela">
-                        <span>
-                            <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                <polyline points="18 15 12 9 6 15"></polyline>
-                            </svg>
-                        </span>
-                    </button>
-                    <button class="toolbar-btn" id="filter-btn-{project["id"]}" title="Filtros">
-                        <span>
-                            <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                <polygon points="22 3 2 3 10 12.46 10 19 14 21 14 12.46 22 3"></polygon>
-                            </svg>
-                        </span>
-                    </button>
-                    <button class="toolbar-btn" id="fullscreen-btn-{project["id"]}" title="Tela Cheia">
-                        <span>
-                            <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                <path d="M8 3H5a2 2 0 0 0-2 2v3m18 0V5a2 2 0 0 0-2-2h-3m0 18h3a2 2 0 0 0 2-2v-3M3 16v3a2 2 0 0 0 2 2h3"></path>
-                            </svg>
-                        </span>
-                    </button>
-                </div>
-
-                    <div class="floating-filter-menu" id="filter-menu-{project['id']}">
-                    <div class="filter-group">
-                        <label for="filter-project-{project['id']}">Empreendimento</label>
-                        <select id="filter-project-{project['id']}"></select>
-                    </div>
-                    <div class="filter-group">
-                        <label for="filter-setor-{project['id']}">Setor</label>
-                        <div id="filter-setor-{project['id']}"></div>
-                    </div>
-                    <div class="filter-group">
-                        <label for="filter-etapa-{project['id']}">Etapa</label>
-                        <div id="filter-etapa-{project['id']}"></div>
-                    </div>
-                    <div class="filter-group">
-                        <div class="filter-group-checkbox">
-                            <input type="checkbox" id="filter-concluidas-{project['id']}">
-                            <label for="filter-concluidas-{project['id']}">Mostrar apenas não concluídas</label>
-                        </div>
-                    </div>
-                    <div class="filter-group">
-                        <label>Visualização</label>
-                        <div class="filter-group-radio">
-                            <input type="radio" id="filter-vis-ambos-{project['id']}" name="filter-vis-{project['id']}" value="Ambos" checked>
-                            <label for="filter-vis-ambos-{project['id']}">Ambos</label>
-                        </div>
-                        <div class="filter-group-radio">
-                            <input type="radio" id="filter-vis-previsto-{project['id']}" name="filter-vis-{project['id']}" value="Previsto">
-                            <label for="filter-vis-previsto-{project['id']}">Previsto</label>
-                        </div>
-                        <div class="filter-group-radio">
-                            <input type="radio" id="filter-vis-real-{project['id']}" name="filter-vis-{project['id']}" value="Real">
-                            <label for="filter-vis-real-{project['id']}">Real</label>
-                        </div>
-                    </div>
-                    <button class="filter-apply-btn" id="filter-apply-btn-{project['id']}">Aplicar Filtros</button>
-                </div>
-
-                    <div class="gantt-main">
-                        <div class="gantt-sidebar-wrapper" id="gantt-sidebar-wrapper-{project['id']}">
-                            <div class="gantt-sidebar-header">
-                                <div class="project-title-row">
-                                    <span>{project["name"]}</span>
-                                    <button class="toggle-sidebar-btn" id="toggle-sidebar-btn-{project['id']}" title="Recolher/Expandir Tabela">«</button>
-                                </div>
-                                <div class="sidebar-grid-header-wrapper">
-                                    <div></div>
-                                    <div class="sidebar-grid-header">
-                                        <div class="header-cell task-name-cell">SERVIÇO</div>
-                                        <div class="header-cell">INÍCIO-P</div>
-                                        <div class="header-cell">TÉRMINO-P</div>
-                                        <div class="header-cell">DUR-P</div>
-                                        <div class="header-cell">INÍCIO-R</div>
-                                        <div class="header-cell">TÉRMINO-R</div>
-                                        <div class="header-cell">DUR-R</div>
-                                        <div class="header-cell">%</div>
-                                        <div class="header-cell">VT</div>
-                                        <div class="header-cell">VD</div>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="gantt-sidebar-content" id="gantt-sidebar-content-{project['id']}"></div>
-                        </div>
-                        <div class="gantt-chart-content" id="gantt-chart-content-{project['id']}">
-                            <div class="chart-container" id="chart-container-{project["id"]}">
-                                <div class="chart-header">
-                                    <div class="year-header" id="year-header-{project["id"]}"></div>
-                                    <div class="month-header" id="month-header-{project["id"]}"></div>
-                                </div>
-                                <div class="chart-body" id="chart-body-{project["id"]}"></div>
-                                <div class="today-line" id="today-line-{project["id"]}"></div>
-                                <div class="meta-line" id="meta-line-{project["id"]}"></div>
-                                <div class="meta-line-label" id="meta-line-label-{project["id"]}"></div>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="tooltip" id="tooltip-{project["id"]}"></div>
-                </div>
-                
-                
-                <script src="https://cdn.jsdelivr.net/npm/virtual-select-plugin@1.0.39/dist/virtual-select.min.js"></script>
-                
-
-                <script>
-                    // DEBUG: Verificar dados
-                    console.log('Inicializando Gantt para projeto:', '{project["name"]}');
-                    
-                    const coresPorSetor = {json.dumps(StyleConfig.CORES_POR_SETOR)};
-
-                    const allProjectsData = {json.dumps(gantt_data_base)};
-
-                    let currentProjectIndex = {correct_project_index_for_js};
-                    const initialProjectIndex = {correct_project_index_for_js};
-
-                    let projectData = {json.dumps([project])};
-
-                    // Datas originais (Python)
-                    const dataMinStr = '{data_min_proj.strftime("%Y-%m-%d")}';
-                    const dataMaxStr = '{data_max_proj.strftime("%Y-%m-%d")}';
-
-                    let activeDataMinStr = dataMinStr;
-                    let activeDataMaxStr = dataMaxStr;
-
-                    const initialTipoVisualizacao = '{tipo_visualizacao}';
-                    let tipoVisualizacao = '{tipo_visualizacao}';
-                    const PIXELS_PER_MONTH = 30;
-
-                    // --- ESTRUTURA DE SUBETAPAS ---
-
-                    
-                    // Mapeamento reverso para encontrar etapa pai
-
-
-                    // --- INÍCIO HELPERS DE DATA E PULMÃO ---
-                    const etapas_pulmao = ["PULMÃO VENDA", "PULMÃO INFRA", "PULMÃO RADIER"];
-                    const etapas_sem_alteracao = ["PROSPECÇÃO", "RADIER", "DEMANDA MÍNIMA", "PE. ÁREAS COMUNS (URB)", "PE. ÁREAS COMUNS (ENG)", "ORÇ. ÁREAS COMUNS", "SUP. ÁREAS COMUNS", "EXECUÇÃO ÁREAS COMUNS"];
-
-                    const formatDateDisplay = (dateStr) => {{
-                        if (!dateStr) return "N/D";
-                        const d = parseDate(dateStr);
-                        if (!d || isNaN(d.getTime())) return "N/D";
-                        const day = String(d.getUTCDate()).padStart(2, '0');
-                        const month = String(d.getUTCMonth() + 1).padStart(2, '0');
-                        const year = String(d.getUTCFullYear()).slice(-2);
-                        return `${{day}}/${{month}}/${{year}}`;
-                    }};
-
-                    function addMonths(dateStr, months) {{
-                        if (!dateStr) return null;
-                        const date = parseDate(dateStr);
-                        if (!date || isNaN(date.getTime())) return null;
-                        const originalDay = date.getUTCDate();
-                        date.setUTCMonth(date.getUTCMonth() + months);
-                        if (date.getUTCDate() !== originalDay) {{
-                            date.setUTCDate(0);
-                        }}
-                        return date.toISOString().split('T')[0];
-                    }}
-                    // --- FIM HELPERS DE DATA E PULMÃO ---
-
-                    const filterOptions = {json.dumps(filter_options)};
-
-                    let allTasks_baseData = {json.dumps(tasks_base_data)};
-
-                    const initialPulmaoStatus = '{pulmao_status}';
-                    const initialPulmaoMeses = {pulmao_meses};
-
-                    let pulmaoStatus = '{pulmao_status}';
-                    let filtersPopulated = false;
-
-                    // *** INÍCIO: Variáveis Globais para Virtual Select ***
-                    let vsSetor, vsGrupo, vsEtapa;
-                    // *** FIM: Variáveis Globais para Virtual Select ***
-
-                    function parseDate(dateStr) {{ 
-                        if (!dateStr) return null; 
-                        const [year, month, day] = dateStr.split('-').map(Number); 
-                        return new Date(Date.UTC(year, month - 1, day)); 
-                    }}
-
-                    function findNewDateRange(tasks) {{
-                        let minDate = null;
-                        let maxDate = null;
-
-                        const updateRange = (dateStr) => {{
-                            if (!dateStr) return;
-                            const date = parseDate(dateStr);
-                            if (!date || isNaN(date.getTime())) return;
-
-                            if (!minDate || date < minDate) {{
-                                minDate = date;
-                            }}
-                            if (!maxDate || date > maxDate) {{
-                                maxDate = date;
-                            }}
-                        }};
-
-                        tasks.forEach(task => {{
-                            updateRange(task.start_previsto);
-                            updateRange(task.end_previsto);
-                            updateRange(task.start_real);
-                            updateRange(task.end_real_original_raw || task.end_real);
-                        }});
-
-                        return {{
-                            min: minDate ? minDate.toISOString().split('T')[0] : null,
-                            max: maxDate ? maxDate.toISOString().split('T')[0] : null
-                        }};
-                    }}
-
-                    // --- FUNÇÕES DE AGRUPAMENTO ---
-                    function organizarTasksComSubetapas(tasks) {{
-                        const tasksOrganizadas = [];
-                        const tasksProcessadas = new Set();
-                        
-                        // Primeiro, adiciona todas as etapas principais
-                        tasks.forEach(task => {{
-                            if (tasksProcessadas.has(task.name)) return;
-                            
-                            const etapaPai = null;
-                            
-                            // Se é uma subetapa, pula por enquanto
-                            if (etapaPai) return;
-                            
-                            // Se é uma etapa principal que tem subetapas
-                            if (false) {{
-                                const taskPrincipal = {{...task, isMainTask: true, expanded: false}};
-                                tasksOrganizadas.push(taskPrincipal);
-                                tasksProcessadas.add(task.name);
-                                
-                                // Adiciona subetapas
-                                SUBETAPAS[task.name].forEach(subetapaNome => {{
-                                    const subetapa = tasks.find(t => t.name === subetapaNome);
-                                    if (subetapa) {{
-                                        const subetapaComPai = {{
-                                            ...subetapa, 
-                                            isSubtask: true, 
-                                            parentTask: task.name,
-                                            visible: false
-                                        }};
-                                        tasksOrganizadas.push(subetapaComPai);
-                                        tasksProcessadas.add(subetapaNome);
-                                    }}
-                                }});
-                            }} else {{
-                                // É uma etapa principal sem subetapas
-                                tasksOrganizadas.push({{...task, isMainTask: true}});
-                                tasksProcessadas.add(task.name);
-                            }}
-                        }});
-                        
-                        // Adiciona quaisquer tasks que não foram processadas (não estão no mapeamento)
-                        tasks.forEach(task => {{
-                            if (!tasksProcessadas.has(task.name)) {{
-                                tasksOrganizadas.push({{...task, isMainTask: true}});
-                                tasksProcessadas.add(task.name);
-                            }}
-                        }});
-                        
-                        return tasksOrganizadas;
-                    }}
-
-                    function toggleSubtasks(taskName) {{
-                        const subtaskRows = document.querySelectorAll('.subtask-row[data-parent="' + taskName + '"]');
-                        const ganttSubtaskRows = document.querySelectorAll('.gantt-subtask-row[data-parent="' + taskName + '"]');
-                        const button = document.querySelector('.expand-collapse-btn[data-task="' + taskName + '"]');
-                        
-                        const isVisible = subtaskRows[0]?.classList.contains('visible');
-                        
-                        // Alterna visibilidade
-                        subtaskRows.forEach(row => {{
-                            row.classList.toggle('visible', !isVisible);
-                        }});
-                        
-                        ganttSubtaskRows.forEach(row => {{
-                            row.style.display = isVisible ? 'none' : 'block';
-                            row.classList.toggle('visible', !isVisible);
-                        }});
-                        
-                        // Atualiza ícone do botão
-                        if (button) {{
-                            button.textContent = isVisible ? '+' : '-';
-                        }}
-                        
-                        // Atualiza estado no array de tasks
-                        const taskIndex = projectData[0].tasks.findIndex(t => t.name === taskName && t.isMainTask);
-                        if (taskIndex !== -1) {{
-                            projectData[0].tasks[taskIndex].expanded = !isVisible;
-                        }}
-
-                        // Aplica/remove estilo nas barras reais da etapa pai
-                        updateParentTaskBarStyle(taskName, !isVisible);
-                    }}
-
-                    function updateParentTaskBarStyle(taskName, isExpanded) {{
-                        const parentTaskRow = document.querySelector('.gantt-row[data-task="' + taskName + '"]');
-                        if (parentTaskRow) {{
-                            const realBars = parentTaskRow.querySelectorAll('.gantt-bar.real');
-                            realBars.forEach(bar => {{
-                                if (isExpanded) {{
-                                    bar.classList.add('parent-task-real', 'expanded');
-                                    // Define a cor da borda com a mesma cor original
-                                    const originalColor = bar.style.backgroundColor;
-                                    bar.style.borderColor = originalColor;
-                                }} else {{
-                                    bar.classList.remove('parent-task-real', 'expanded');
-                                    bar.style.borderColor = '';
-                                }}
-                            }});
-                        }}
-                    }}
-
-                    function initGantt() {{
-                        console.log('Iniciando Gantt com dados:', projectData);
-                        
-                        // Verificar se há dados para renderizar
-                        if (!projectData || !projectData[0] || !projectData[0].tasks || projectData[0].tasks.length === 0) {{
-                            console.error('Nenhum dado disponível para renderizar');
-                            document.getElementById('chart-body-{project["id"]}').innerHTML = '<div style="padding: 20px; text-align: center; color: red;">Erro: Nenhum dado disponível</div>';
-                            return;
-                        }}
-
-                        // Organizar tasks com estrutura de subetapas
-                        projectData[0].tasks = organizarTasksComSubetapas(projectData[0].tasks);
-                        allTasks_baseData = JSON.parse(JSON.stringify(projectData[0].tasks));
-
-                        applyInitialPulmaoState();
-
-                        if (initialPulmaoStatus === 'Com Pulmão' && initialPulmaoMeses > 0) {{
-                            const {{ min: newMinStr, max: newMaxStr }} = findNewDateRange(projectData[0].tasks);
-                            const newMin = parseDate(newMinStr);
-                            const newMax = parseDate(newMaxStr);
-                            const originalMin = parseDate(activeDataMinStr);
-                            const originalMax = parseDate(activeDataMaxStr);
-
-                            let finalMinDate = originalMin;
-                            if (newMin && newMin < finalMinDate) {{
-                                finalMinDate = newMin;
-                            }}
-                            let finalMaxDate = originalMax;
-                            if (newMax && newMax > finalMaxDate) {{
-                                finalMaxDate = newMax;
-                            }}
-
-                            finalMinDate = new Date(finalMinDate.getTime());
-                            finalMaxDate = new Date(finalMaxDate.getTime());
-
-                            finalMinDate.setUTCDate(1);
-                            finalMaxDate.setUTCMonth(finalMaxDate.getUTCMonth() + 1, 0);
-
-                            activeDataMinStr = finalMinDate.toISOString().split('T')[0];
-                            activeDataMaxStr = finalMaxDate.toISOString().split('T')[0];
-                        }}
-
-                        renderSidebar();
-                        renderHeader();
-                        renderChart();
-                        renderMonthDividers();
-                        setupEventListeners();
-                        positionTodayLine();
-                        positionMetaLine();
-                        populateFilters();
-                    }}
-
-                    function applyInitialPulmaoState() {{
-                        if (initialPulmaoStatus === 'Com Pulmão' && initialPulmaoMeses > 0) {{
-                            const offsetMeses = -initialPulmaoMeses;
-                            let baseTasks = projectData[0].tasks;
-
-                            baseTasks.forEach(task => {{
-                                const etapaNome = task.name;
-                                if (etapas_sem_alteracao.includes(etapaNome)) {{
-                                    // Não altera datas
-                                }}
-                                else if (etapas_pulmao.includes(etapaNome)) {{
-                                    // APENAS PREVISTO
-                                    task.start_previsto = addMonths(task.start_previsto, offsetMeses);
-                                    task.inicio_previsto = formatDateDisplay(task.start_previsto);
-                                }}
-                                else {{
-                                    // APENAS PREVISTO
-                                    task.start_previsto = addMonths(task.start_previsto, offsetMeses);
-                                    task.end_previsto = addMonths(task.end_previsto, offsetMeses);
-                                    task.inicio_previsto = formatDateDisplay(task.start_previsto);
-                                    task.termino_previsto = formatDateDisplay(task.end_previsto);
-                                    // NÃO modificar dados reais
-                                }}
-                            }});
-
-                            allTasks_baseData = JSON.parse(JSON.stringify(baseTasks));
-                        }}
-                    }}
-
-                    function renderSidebar() {{
-                        const sidebarContent = document.getElementById('gantt-sidebar-content-{project['id']}');
-                        const gruposGantt = JSON.parse(document.getElementById('grupos-gantt-data').textContent);
-                        const tasks = projectData[0].tasks;
-                        
-                        if (!tasks || tasks.length === 0) {{
-                            sidebarContent.innerHTML = '<div style="padding: 20px; text-align: center; color: #666;">Nenhuma tarefa disponível para os filtros aplicados</div>';
-                            return;
-                        }}
-                        
-                        let html = '';
-                        let globalRowIndex = 0;
-                        
-                        // CORREÇÃO: Renderizar as tasks na ORDEM EXATA em que estão no array
-                        // Ignorar completamente a estrutura de grupos e seguir apenas a ordem das tasks
-                        html += '<div class="sidebar-rows-container">';
-                        
-                        tasks.forEach(task => {{
-                            if (task.isSubtask) return; // Pular subetapas se existirem
-                            
-                            globalRowIndex++;
-                            const rowClass = globalRowIndex % 2 !== 0 ? 'odd-row' : '';
-                            const hasSubtasks = false;
-                            const mainTaskClass = hasSubtasks ? 'main-task-row has-subtasks' : 'main-task-row';
-                            
-                            html += `<div class="sidebar-row ${{mainTaskClass}} ${{rowClass}}" data-task="${{task.name}}">`;
-                            
-                            // Coluna do botão de expandir/recolher
-                            if (hasSubtasks) {{
-                                html += `<div class="sidebar-cell task-name-cell" style="display: flex; align-items: center;">`;
-                                html += `<button class="expand-collapse-btn" data-task="${{task.name}}">${{task.expanded ? '-' : '+'}}</button>`;
-                                html += `<span title="${{task.numero_etapa}}. ${{task.name}}">${{task.numero_etapa}}. ${{task.name}}</span>`;
-                                html += `</div>`;
-                            }} else {{
-                                html += `<div class="sidebar-cell task-name-cell" title="${{task.numero_etapa}}. ${{task.name}}">${{task.numero_etapa}}. ${{task.name}}</div>`;
-                            }}
-                            
-                            html += `<div class="sidebar-cell">${{task.inicio_previsto}}</div>`;
-                            html += `<div class="sidebar-cell">${{task.termino_previsto}}</div>`;
-                            html += `<div class="sidebar-cell">${{task.duracao_prev_meses}}</div>`;
-                            html += `<div class="sidebar-cell">${{task.inicio_real}}</div>`;
-                            html += `<div class="sidebar-cell">${{task.termino_real}}</div>`;
-                            html += `<div class="sidebar-cell">${{task.duracao_real_meses}}</div>`;
-                            html += `<div class="sidebar-cell ${{task.status_color_class}}">${{task.progress}}%</div>`;
-                            html += `<div class="sidebar-cell ${{task.status_color_class}}">${{task.vt_text}}</div>`;
-                            html += `<div class="sidebar-cell ${{task.status_color_class}}">${{task.vd_text}}</div>`;
-                            html += `</div>`;
-                            
-                            // Adicionar subetapas se existirem (mantido para compatibilidade)
-                            if (hasSubtasks && SUBETAPAS[task.name]) {{
-                                SUBETAPAS[task.name].forEach(subetapaNome => {{
-                                    const subetapa = tasks.find(t => t.name === subetapaNome && t.isSubtask);
-                                    if (subetapa) {{
-                                        globalRowIndex++;
-                                        const subtaskRowClass = globalRowIndex % 2 !== 0 ? 'odd-row' : '';
-                                        const visibleClass = task.expanded ? 'visible' : '';
-                                        html += `<div class="sidebar-row subtask-row ${{subtaskRowClass}} ${{visibleClass}}" data-parent="${{task.name}}">`;
-                                        html += `<div class="sidebar-cell task-name-cell" title="${{subetapa.numero_etapa}}. • ${{subetapa.name}}">${{subetapa.numero_etapa}}. • ${{subetapa.name}}</div>`;
-                                        html += `<div class="sidebar-cell">${{subetapa.inicio_previsto}}</div>`;
-                                        html += `<div class="sidebar-cell">${{subetapa.termino_previsto}}</div>`;
-                                        html += `<div class="sidebar-cell">${{subetapa.duracao_prev_meses}}</div>`;
-                                        html += `<div class="sidebar-cell">${{subetapa.inicio_real}}</div>`;
-                                        html += `<div class="sidebar-cell">${{subetapa.termino_real}}</div>`;
-                                        html += `<div class="sidebar-cell">${{subetapa.duracao_real_meses}}</div>`;
-                                        html += `<div class="sidebar-cell ${{subetapa.status_color_class}}">${{subetapa.progress}}%</div>`;
-                                        html += `<div class="sidebar-cell ${{subetapa.status_color_class}}">${{subetapa.vt_text}}</div>`;
-                                        html += `<div class="sidebar-cell ${{subetapa.status_color_class}}">${{subetapa.vd_text}}</div>`;
-                                        html += `</div>`;
-                                    }}
-                                }});
-                            }}
-                        }});
-                        
-                        html += '</div>';
-                        sidebarContent.innerHTML = html;
-                        
-                        // Adicionar event listeners para os botões de expandir/recolher
-                        document.querySelectorAll('.expand-collapse-btn').forEach(button => {{
-                            button.addEventListener('click', function(e) {{
-                                e.stopPropagation();
-                                const taskName = this.getAttribute('data-task');
-                                toggleSubtasks(taskName);
-                            }});
-                        }});
-                        
-                        // Adicionar event listeners para as linhas principais com subetapas
-                        document.querySelectorAll('.main-task-row.has-subtasks').forEach(row => {{
-                            row.addEventListener('click', function() {{
-                                const taskName = this.getAttribute('data-task');
-                                toggleSubtasks(taskName);
-                            }});
-                        }});
-                    }}
-
-                    function renderHeader() {{
-                        const yearHeader = document.getElementById('year-header-{project["id"]}');
-                        const monthHeader = document.getElementById('month-header-{project["id"]}');
-                        let yearHtml = '', monthHtml = '';
-                        const yearsData = [];
-
-                        let currentDate = parseDate(activeDataMinStr);
-                        const dataMax = parseDate(activeDataMaxStr);
-
-                        if (!currentDate || !dataMax || isNaN(currentDate.getTime()) || isNaN(dataMax.getTime())) {{
-                            yearHeader.innerHTML = "Datas inválidas";
-                            monthHeader.innerHTML = "";
-                            return;
-                        }}
-
-                        // DECLARE estas variáveis
-                        let currentYear = -1, monthsInCurrentYear = 0;
-
-                        let totalMonths = 0;
-                        while (currentDate <= dataMax && totalMonths < 240) {{
-                            const year = currentDate.getUTCFullYear();
-                            if (year !== currentYear) {{
-                                if (currentYear !== -1) yearsData.push({{ year: currentYear, count: monthsInCurrentYear }});
-                                currentYear = year; 
-                                monthsInCurrentYear = 0;
-                            }}
-                            const monthNumber = String(currentDate.getUTCMonth() + 1).padStart(2, '0');
-                            monthHtml += `<div class="month-cell">${{monthNumber}}</div>`;
-                            monthsInCurrentYear++;
-                            currentDate.setUTCMonth(currentDate.getUTCMonth() + 1);
-                            totalMonths++;
-                        }}
-                        if (currentYear !== -1) yearsData.push({{ year: currentYear, count: monthsInCurrentYear }});
-                        yearsData.forEach(data => {{ 
-                            const yearWidth = data.count * PIXELS_PER_MONTH; 
-                            yearHtml += `<div class="year-section" style="width:${{yearWidth}}px">${{data.year}}</div>`; 
-                        }});
-
-                        const chartContainer = document.getElementById('chart-container-{project["id"]}');
-                        if (chartContainer) {{
-                            chartContainer.style.minWidth = `${{totalMonths * PIXELS_PER_MONTH}}px`;
-                        }}
-
-                        yearHeader.innerHTML = yearHtml;
-                        monthHeader.innerHTML = monthHtml;
-                    }}
-
-                    function renderChart() {{
-                        const chartBody = document.getElementById('chart-body-{project["id"]}');
-                        const tasks = projectData[0].tasks;
-                        
-                        if (!tasks || tasks.length === 0) {{
-                            chartBody.innerHTML = '<div style="padding: 20px; text-align: center; color: #666;">Nenhuma tarefa disponível</div>';
-                            return;
-                        }}
-                        
-                        chartBody.innerHTML = '';
-                        
-                        // CORREÇÃO: Renderizar as tasks na ORDEM EXATA do array
-                        tasks.forEach(task => {{
-                            if (task.isSubtask) return; // Pular subetapas
-                            
-                            // Linha principal
-                            const row = document.createElement('div'); 
-                            row.className = 'gantt-row';
-                            row.setAttribute('data-task', task.name);
-                            
-                            let barPrevisto = null;
-                            if (tipoVisualizacao === 'Ambos' || tipoVisualizacao === 'Previsto') {{ 
-                                barPrevisto = createBar(task, 'previsto'); 
-                                if (barPrevisto) row.appendChild(barPrevisto); 
-                            }}
-                            let barReal = null;
-                            if ((tipoVisualizacao === 'Ambos' || tipoVisualizacao === 'Real') && task.start_real && (task.end_real_original_raw || task.end_real)) {{ 
-                                barReal = createBar(task, 'real'); 
-                                if (barReal) row.appendChild(barReal); 
-                            }}
-                            if (barPrevisto && barReal) {{
-                                const s_prev = parseDate(task.start_previsto), e_prev = parseDate(task.end_previsto), s_real = parseDate(task.start_real), e_real = parseDate(task.end_real_original_raw || task.end_real);
-                                if (s_prev && e_prev && s_real && e_real && s_real <= s_prev && e_real >= e_prev) {{ 
-                                    barPrevisto.style.zIndex = '8'; 
-                                    barReal.style.zIndex = '7'; 
-                                }}
-                                renderOverlapBar(task, row);
-                            }}
-                            chartBody.appendChild(row);
-                            
-                            // Aplica estilo se a tarefa pai estiver expandida
-                            if (task.expanded) {{
-                                updateParentTaskBarStyle(task.name, true);
-                            }}
-                            
-                            // Subetapas - SEMPRE criar as linhas, mas controlar visibilidade via CSS
-                            if (false) {{
-                                SUBETAPAS[task.name].forEach(subetapaNome => {{
-                                    const subetapa = tasks.find(t => t.name === subetapaNome && t.isSubtask);
-                                    if (subetapa) {{
-                                        const subtaskRow = document.createElement('div'); 
-                                        subtaskRow.className = 'gantt-row gantt-subtask-row';
-                                        subtaskRow.setAttribute('data-parent', task.name);
-                                        // Inicialmente oculto - será mostrado via toggle
-                                        subtaskRow.style.display = task.expanded ? 'block' : 'none';
-                                        if (task.expanded) {{
-                                            subtaskRow.classList.add('visible');
-                                        }}
-                                        
-                                        let subBarPrevisto = null;
-                                        if (tipoVisualizacao === 'Ambos' || tipoVisualizacao === 'Previsto') {{ 
-                                            subBarPrevisto = createBar(subetapa, 'previsto'); 
-                                            if (subBarPrevisto) subtaskRow.appendChild(subBarPrevisto); 
-                                        }}
-                                        let subBarReal = null;
-                                        if ((tipoVisualizacao === 'Ambos' || tipoVisualizacao === 'Real') && subetapa.start_real && (subetapa.end_real_original_raw || subetapa.end_real)) {{ 
-                                            subBarReal = createBar(subetapa, 'real'); 
-                                            if (subBarReal) subtaskRow.appendChild(subBarReal); 
-                                        }}
-                                        if (subBarPrevisto && subBarReal) {{
-                                            const s_prev = parseDate(subetapa.start_previsto), e_prev = parseDate(subetapa.end_previsto), s_real = parseDate(subetapa.start_real), e_real = parseDate(subetapa.end_real_original_raw || subetapa.end_real);
-                                            if (s_prev && e_prev && s_real && e_real && s_real <= s_prev && e_real >= e_prev) {{ 
-                                                subBarPrevisto.style.zIndex = '8'; 
-                                                subBarReal.style.zIndex = '7'; 
-                                            }}
-                                            renderOverlapBar(subetapa, subtaskRow);
-                                        }}
-                                        chartBody.appendChild(subtaskRow);
-                                    }}
-                                }});
-                            }}
-                        }});
-                    }}
-
-                    function createBar(task, tipo) {{
-                        const startDate = parseDate(tipo === 'previsto' ? task.start_previsto : task.start_real);
-                        const endDate = parseDate(tipo === 'previsto' ? task.end_previsto : (task.end_real_original_raw || task.end_real));
-
-                        if (!startDate || !endDate) {{
-                            console.log('Datas inválidas para barra:', task.name, tipo);
-                            return null;
-                        }}
-                        
-                        const left = getPosition(startDate);
-                        const width = Math.max(getPosition(endDate) - left + (PIXELS_PER_MONTH / 30), 5); // Mínimo de 5px
-                        
-                        if (width <= 0) {{
-                            console.log('Largura inválida para barra:', task.name, tipo, width);
-                            return null;
-                        }}
-                        
-                        const bar = document.createElement('div'); 
-                        bar.className = `gantt-bar ${{tipo}}`;
-                        const coresSetor = coresPorSetor[task.setor] || coresPorSetor['Não especificado'] || {{previsto: '#cccccc', real: '#888888'}};
-                        bar.style.backgroundColor = tipo === 'previsto' ? coresSetor.previsto : coresSetor.real;
-                        bar.style.left = `${{left}}px`; 
-                        bar.style.width = `${{width}}px`;
-                        
-                        // Adicionar rótulo apenas se houver espaço suficiente
-                        if (width > 40) {{
-                            const barLabel = document.createElement('span'); 
-                            barLabel.className = 'bar-label'; 
-                            barLabel.textContent = `${{task.name}} (${{task.progress}}%)`; 
-                            bar.appendChild(barLabel);
-                        }}
-                        
-                        bar.addEventListener('mousemove', e => showTooltip(e, task, tipo));
-                        bar.addEventListener('mouseout', () => hideTooltip());
-                        return bar;
-                    }}
-
-                    function renderOverlapBar(task, row) {{
-                    if (!task.start_real || !(task.end_real_original_raw || task.end_real)) return;
-                        const s_prev = parseDate(task.start_previsto), e_prev = parseDate(task.end_previsto), s_real = parseDate(task.start_real), e_real = parseDate(task.end_real_original_raw || task.end_real);
-                        const overlap_start = new Date(Math.max(s_prev, s_real)), overlap_end = new Date(Math.min(e_prev, e_real));
-                        if (overlap_start < overlap_end) {{
-                            const left = getPosition(overlap_start), width = getPosition(overlap_end) - left + (PIXELS_PER_MONTH / 30);
-                            if (width > 0) {{ 
-                                const overlapBar = document.createElement('div'); 
-                                overlapBar.className = 'gantt-bar-overlap'; 
-                                overlapBar.style.left = `${{left}}px`; 
-                                overlapBar.style.width = `${{width}}px`; 
-                                row.appendChild(overlapBar); 
-                            }}
-                        }}
-                    }}
-
-                    function getPosition(date) {{
-                        if (!date) return 0;
-                        const chartStart = parseDate(activeDataMinStr);
-                        if (!chartStart || isNaN(chartStart.getTime())) return 0;
-
-                        const monthsOffset = (date.getUTCFullYear() - chartStart.getUTCFullYear()) * 12 + (date.getUTCMonth() - chartStart.getUTCMonth());
-                        const dayOfMonth = date.getUTCDate() - 1;
-                        const daysInMonth = new Date(date.getUTCFullYear(), date.getUTCMonth() + 1, 0).getUTCDate();
-                        const fractionOfMonth = daysInMonth > 0 ? dayOfMonth / daysInMonth : 0;
-                        return (monthsOffset + fractionOfMonth) * PIXELS_PER_MONTH;
-                    }}
-
-                    function positionTodayLine() {{
-                        const todayLine = document.getElementById('today-line-{project["id"]}');
-                        const today = new Date(), todayUTC = new Date(Date.UTC(today.getFullYear(), today.getMonth(), today.getDate()));
-
-                        const chartStart = parseDate(activeDataMinStr);
-                        const chartEnd = parseDate(activeDataMaxStr);
-
-                        if (chartStart && chartEnd && !isNaN(chartStart.getTime()) && !isNaN(chartEnd.getTime()) && todayUTC >= chartStart && todayUTC <= chartEnd) {{ 
-                            const offset = getPosition(todayUTC); 
-                            todayLine.style.left = `${{offset}}px`; 
-                            todayLine.style.display = 'block'; 
-                        }} else {{ 
-                            todayLine.style.display = 'none'; 
-                        }}
-                    }}
-
-                    function positionMetaLine() {{
-                        const metaLine = document.getElementById('meta-line-{project["id"]}'), metaLabel = document.getElementById('meta-line-label-{project["id"]}');
-                        const metaDateStr = projectData[0].meta_assinatura_date;
-                        if (!metaDateStr) {{ metaLine.style.display = 'none'; metaLabel.style.display = 'none'; return; }}
-
-                        const metaDate = parseDate(metaDateStr);
-                        const chartStart = parseDate(activeDataMinStr);
-                        const chartEnd = parseDate(activeDataMaxStr);
-
-                        if (metaDate && chartStart && chartEnd && !isNaN(metaDate.getTime()) && !isNaN(chartStart.getTime()) && !isNaN(chartEnd.getTime()) && metaDate >= chartStart && metaDate <= chartEnd) {{ 
-                            const offset = getPosition(metaDate); 
-                            metaLine.style.left = `${{offset}}px`; 
-                            metaLabel.style.left = `${{offset}}px`; 
-                            metaLine.style.display = 'block'; 
-                            metaLabel.style.display = 'block'; 
-                            metaLabel.textContent = `Entrega Prev.: ${{metaDate.toLocaleDateString('pt-BR', {{day: '2-digit', month: '2-digit', year: '2-digit', timeZone: 'UTC'}})}}`; 
-                        }} else {{ 
-                            metaLine.style.display = 'none'; 
-                            metaLabel.style.display = 'none'; 
-                        }}
-                    }}
-
-                    function showTooltip(e, task, tipo) {{
-                        const tooltip = document.getElementById('tooltip-{project["id"]}');
-                        let content = `<b>${{task.name}}</b><br>`;
-                        if (tipo === 'previsto') {{ content += `Previsto: ${{task.inicio_previsto}} - ${{task.termino_previsto}}<br>Duração: ${{task.duracao_prev_meses}}M`; }} else {{ content += `Real: ${{task.inicio_real}} - ${{task.termino_real}}<br>Duração: ${{task.duracao_real_meses}}M<br>Variação Término: ${{task.vt_text}}<br>Variação Duração: ${{task.vd_text}}`; }}
-                        content += `<br><b>Progresso: ${{task.progress}}%</b><br>Setor: ${{task.setor}}<br>Grupo: ${{task.grupo}}`;
-                        tooltip.innerHTML = content;
-                        tooltip.classList.add('show');
-                        const tooltipWidth = tooltip.offsetWidth;
-                        const tooltipHeight = tooltip.offsetHeight;
-                        const viewportWidth = window.innerWidth;
-                        const viewportHeight = window.innerHeight;
-                        const mouseX = e.clientX; 
-                        const mouseY = e.clientY;
-                        const padding = 15;
-                        let left, top;
-                        if ((mouseX + padding + tooltipWidth) > viewportWidth) {{
-                            left = mouseX - padding - tooltipWidth;
-                        }} else {{
-                            left = mouseX + padding;
-                        }}
-                        if ((mouseY + padding + tooltipHeight) > viewportHeight) {{
-                            top = mouseY - padding - tooltipHeight;
-                        }} else {{
-                            top = mouseY + padding;
-                        }}
-                        if (left < padding) left = padding;
-                        if (top < padding) top = padding;
-                        tooltip.style.left = `${{left}}px`;
-                        tooltip.style.top = `${{top}}px`;
-                    }}
-
-                    function hideTooltip() {{ 
-                        document.getElementById('tooltip-{project["id"]}').classList.remove('show'); 
-                    }}
-
-                    function renderMonthDividers() {{
-                        const chartContainer = document.getElementById('chart-container-{project["id"]}');
-                        chartContainer.querySelectorAll('.month-divider, .month-divider-label').forEach(el => el.remove());
-
-                        let currentDate = parseDate(activeDataMinStr);
-                        const dataMax = parseDate(activeDataMaxStr);
-
-                        if (!currentDate || !dataMax || isNaN(currentDate.getTime()) || isNaN(dataMax.getTime())) return;
-
-                        let totalMonths = 0;
-                        while (currentDate <= dataMax && totalMonths < 240) {{
-                            const left = getPosition(currentDate);
-                            const divider = document.createElement('div'); 
-                            divider.className = 'month-divider';
-                            if (currentDate.getUTCMonth() === 0) divider.classList.add('first');
-                            divider.style.left = `${{left}}px`; 
-                            chartContainer.appendChild(divider);
-                            currentDate.setUTCMonth(currentDate.getUTCMonth() + 1);
-                            totalMonths++;
-                        }}
-                    }}
-
-                    function setupEventListeners() {{
-                        const ganttChartContent = document.getElementById('gantt-chart-content-{project["id"]}'), sidebarContent = document.getElementById('gantt-sidebar-content-{project['id']}');
-                        const fullscreenBtn = document.getElementById('fullscreen-btn-{project["id"]}'), toggleBtn = document.getElementById('toggle-sidebar-btn-{project['id']}');
-                        const filterBtn = document.getElementById('filter-btn-{project["id"]}');
-                        const filterMenu = document.getElementById('filter-menu-{project['id']}');
-                        const container = document.getElementById('gantt-container-{project["id"]}');
-
-                        const applyBtn = document.getElementById('filter-apply-btn-{project["id"]}');
-                        if (applyBtn) applyBtn.addEventListener('click', () => applyFiltersAndRedraw());
-
-
-                        if (fullscreenBtn) fullscreenBtn.addEventListener('click', () => toggleFullscreen());
-
-                        const toolbarToggleBtn = document.getElementById('toolbar-toggle-btn-{project["id"]}');
-                        if (toolbarToggleBtn) {{
-                            toolbarToggleBtn.addEventListener('click', (e) => {{
-                                e.stopPropagation();
-                                const toolbar = document.getElementById('gantt-toolbar-{project["id"]}');
-                                if (toolbar) toolbar.classList.toggle('collapsed');
-                                
-                                // Se a toolbar estiver colapsada, fecha o menu de filtro se estiver aberto
-                                if (toolbar && toolbar.classList.contains('collapsed')) {{
-                                    if (filterMenu) filterMenu.classList.remove('is-open');
-                                }}
-                            }});
-                        }}
-
-                        // Adiciona listener para o botão de filtro
-                        if (filterBtn) {{
-                            filterBtn.addEventListener('click', () => {{
-                                filterMenu.classList.toggle('is-open');
-                            }});
-                        }}
-
-                        // Fecha o menu de filtro ao clicar fora
-                        document.addEventListener('click', (event) => {{
-                            if (filterMenu && filterBtn && !filterMenu.contains(event.target) && !filterBtn.contains(event.target)) {{
-                                filterMenu.classList.remove('is-open');
-                            }}
-                        }});
-
-                        if (container) container.addEventListener('fullscreenchange', () => handleFullscreenChange());
-
-                        if (toggleBtn) toggleBtn.addEventListener('click', () => toggleSidebar());
-                        if (ganttChartContent && sidebarContent) {{
-                            let isSyncing = false;
-                            ganttChartContent.addEventListener('scroll', () => {{ if (!isSyncing) {{ isSyncing = true; sidebarContent.scrollTop = ganttChartContent.scrollTop; isSyncing = false; }} }});
-                            sidebarContent.addEventListener('scroll', () => {{ if (!isSyncing) {{ isSyncing = true; ganttChartContent.scrollTop = sidebarContent.scrollTop; isSyncing = false; }} }});
-                            let isDown = false, startX, scrollLeft;
-                            ganttChartContent.addEventListener('mousedown', (e) => {{ isDown = true; ganttChartContent.classList.add('active'); startX = e.pageX - ganttChartContent.offsetLeft; scrollLeft = ganttChartContent.scrollLeft; }});
-                            ganttChartContent.addEventListener('mouseleave', () => {{ isDown = false; ganttChartContent.classList.remove('active'); }});
-                            ganttChartContent.addEventListener('mouseup', () => {{ isDown = false; ganttChartContent.classList.remove('active'); }});
-                            ganttChartContent.addEventListener('mousemove', (e) => {{ if (!isDown) return; e.preventDefault(); const x = e.pageX - ganttChartContent.offsetLeft; const walk = (x - startX) * 2; ganttChartContent.scrollLeft = scrollLeft - walk; }});
-                        }}
-                    }}
-
-                    function toggleSidebar() {{ 
-                        document.getElementById('gantt-sidebar-wrapper-{project["id"]}').classList.toggle('collapsed'); 
-                    }}
-
-                    function updatePulmaoInputVisibility() {{
-                        const radioCom = document.getElementById('filter-pulmao-com-{project["id"]}');
-                        const mesesGroup = document.getElementById('pulmao-meses-group-{project["id"]}');
-                        if (radioCom && mesesGroup) {{ 
-                            if (radioCom.checked) {{
-                                mesesGroup.style.display = 'block';
-                            }} else {{
-                                mesesGroup.style.display = 'none';
-                            }}
-                        }}
-                    }}
-
-                    function resetToInitialState() {{
-                        currentProjectIndex = initialProjectIndex;
-                        const initialProject = allProjectsData[initialProjectIndex];
-
-                        projectData = [JSON.parse(JSON.stringify(initialProject))];
-                        // Reorganizar tasks com estrutura de subetapas
-                        projectData[0].tasks = organizarTasksComSubetapas(projectData[0].tasks);
-                        allTasks_baseData = JSON.parse(JSON.stringify(projectData[0].tasks));
-
-                        tipoVisualizacao = initialTipoVisualizacao;
-                        pulmaoStatus = initialPulmaoStatus;
-
-                        applyInitialPulmaoState();
-
-                        activeDataMinStr = dataMinStr;
-                        activeDataMaxStr = dataMaxStr;
-
-                        if (initialPulmaoStatus === 'Com Pulmão' && initialPulmaoMeses > 0) {{
-                            const {{ min: newMinStr, max: newMaxStr }} = findNewDateRange(projectData[0].tasks);
-                            const newMin = parseDate(newMinStr);
-                            const newMax = parseDate(newMaxStr);
-                            const originalMin = parseDate(activeDataMinStr);
-                            const originalMax = parseDate(activeDataMaxStr);
-
-                            let finalMinDate = originalMin;
-                            if (newMin && newMin < finalMinDate) {{
-                                finalMinDate = newMin;
-                            }}
-                            let finalMaxDate = originalMax;
-                            if (newMax && newMax > finalMaxDate) {{
-                                finalMaxDate = newMax;
-                            }}
-
-                            finalMinDate = new Date(finalMinDate.getTime());
-                            finalMaxDate = new Date(finalMaxDate.getTime());
-                            finalMinDate.setUTCDate(1);
-                            finalMaxDate.setUTCMonth(finalMaxDate.getUTCMonth() + 1, 0);
-
-                            activeDataMinStr = finalMinDate.toISOString().split('T')[0];
-                            activeDataMaxStr = finalMaxDate.toISOString().split('T')[0];
-                        }}
-
-                        document.getElementById('filter-project-{project["id"]}').value = initialProjectIndex;
-                        
-                        // *** CORREÇÃO: Reset Virtual Select ***
-                        if(vsSetor) vsSetor.setValue(["Todos"]);
-                        if(vsGrupo) vsGrupo.setValue(["Todos"]);
-                        if(vsEtapa) vsEtapa.setValue(["Todas"]);
-                        
-                        document.getElementById('filter-concluidas-{project["id"]}').checked = false;
-
-                        const visRadio = document.querySelector('input[name="filter-vis-{project['id']}"][value="' + initialTipoVisualizacao + '"]');
-                        if (visRadio) visRadio.checked = true;
-
-                        const pulmaoRadio = document.querySelector('input[name="filter-pulmao-{project['id']}"][value="' + initialPulmaoStatus + '"]');
-                        if (pulmaoRadio) pulmaoRadio.checked = true;
-
-                        document.getElementById('filter-pulmao-meses-{project["id"]}').value = initialPulmaoMeses;
-
-                        updatePulmaoInputVisibility();
-
-                        renderHeader();
-                        renderMonthDividers();
-                        renderSidebar();
-                        renderChart();
-                        positionTodayLine();
-                        positionMetaLine();
-                        updateProjectTitle();
-                    }}
-
-                    function updateProjectTitle() {{
-                        const projectTitle = document.querySelector('#gantt-sidebar-wrapper-{project["id"]} .project-title-row span');
-                        if (projectTitle) {{
-                            projectTitle.textContent = projectData[0].name;
-                        }}
-                    }}
-
-                    function toggleFullscreen() {{
-                        const container = document.getElementById('gantt-container-{project["id"]}');
-                        if (!document.fullscreenElement) {{
-                            container.requestFullscreen().catch(err => alert('Erro: ' + err.message));
-                        }} else {{
-                            document.exitFullscreen();
-                        }}
-                    }}
-
-
-
-                    function toggleFullscreen() {{
-                        const container = document.getElementById('gantt-container-{project["id"]}');
-                        if (!document.fullscreenElement) {{
-                            container.requestFullscreen().catch(err => console.error('Erro ao tentar entrar em tela cheia: ' + err.message));
-                        }} else {{
-                            document.exitFullscreen();
-                        }}
-                    }}
-
-                    function handleFullscreenChange() {{
-                        const btn = document.getElementById('fullscreen-btn-{project["id"]}');
-                        const container = document.getElementById('gantt-container-{project["id"]}');
-                        if (document.fullscreenElement === container) {{
-                            btn.innerHTML = '<span><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M9 9l6 6m0-6l-6 6M3 20.29V5a2 2 0 012-2h14a2 2 0 012 2v10a2 2 0 01-2 2H5a2 2 0 01-2-2v-.29"></path></svg></span>';
-                            btn.classList.add('is-fullscreen');
-                        }} else {{
-                            btn.innerHTML = '<span><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M8 3H5a2 2 0 0 0-2 2v3m18 0V5a2 2 0 0 0-2-2h-3m0 18h3a2 2 0 0 0 2-2v-3M3 16v3a2 2 0 0 0 2 2h3"></path></svg></span>';
-                            btn.classList.remove('is-fullscreen');
-                            document.getElementById('filter-menu-{project["id"]}').classList.remove('is-open');
-                        }}
-                    }}
-                    function populateFilters() {{
-                        if (filtersPopulated) return;
-
-                        // Popula o select normal de Projeto
-                        const selProject = document.getElementById('filter-project-{project["id"]}');
-                        allProjectsData.forEach((proj, index) => {{
-                            const isSelected = (index === initialProjectIndex) ? 'selected' : '';
-                            selProject.innerHTML += '<option value="' + index + '" ' + isSelected + '>' + proj.name + '</option>';
-                        }});
-
-                        // Configurações comuns para Virtual Select
-                        const vsConfig = {{
-                            multiple: true,
-                            search: true,
-                            optionsCount: 6,
-                            showResetButton: true,
-                            resetButtonText: 'Limpar',
-                            selectAllText: 'Selecionar Todos',
-                            allOptionsSelectedText: 'Todos',
-                            optionsSelectedText: 'selecionados',
-                            searchPlaceholderText: 'Buscar...',
-                            optionHeight: '30px',
-                            popupDropboxBreakpoint: '3000px',
-                            noOptionsText: 'Nenhuma opção encontrada',
-                            noSearchResultsText: 'Nenhum resultado encontrado',
-                        }};
-
-                        // Prepara opções e inicializa Virtual Select para Setor
-                        const setorOptions = filterOptions.setores.map(s => ({{ label: s, value: s }}));
-                        vsSetor = VirtualSelect.init({{
-                            ...vsConfig,
-                            ele: '#filter-setor-{project["id"]}',
-                            options: setorOptions,
-                            placeholder: "Selecionar Setor(es)",
-                            selectedValue: ["Todos"]
-                        }});
-
-                        // Prepara opções e inicializa Virtual Select para Etapa
-                        const etapaOptions = filterOptions.etapas.map(e => ({{ label: e, value: e }}));
-                        vsEtapa = VirtualSelect.init({{
-                            ...vsConfig,
-                            ele: '#filter-etapa-{project["id"]}',
-                            options: etapaOptions,
-                            placeholder: "Selecionar Etapa(s)",
-                            selectedValue: ["Todas"]
-                        }});
-
-                        // Configura os radios de visualização
-                        const visRadio = document.querySelector('input[name="filter-vis-{project['id']}"][value="' + initialTipoVisualizacao + '"]');
-                        if (visRadio) visRadio.checked = true;
-
-                        filtersPopulated = true;
-                    }}
-                    // *** FUNÇÃO applyFiltersAndRedraw CORRIGIDA ***
-                    function applyFiltersAndRedraw() {{
-                        try {{
-                            const selProjectIndex = parseInt(document.getElementById('filter-project-{project["id"]}').value, 10);
-                            
-                            // *** LEITURA CORRIGIDA dos Virtual Select ***
-                            const selSetorArray = vsSetor ? vsSetor.getValue() || [] : [];
-                            const selEtapaArray = vsEtapa ? vsEtapa.getValue() || [] : [];
-                            
-                            const selConcluidas = document.getElementById('filter-concluidas-{project["id"]}').checked;
-                            const selVis = document.querySelector('input[name="filter-vis-{project['id']}"]:checked').value;
-
-                            console.log('Filtros aplicados:', {{
-                                setor: selSetorArray,
-                                etapa: selEtapaArray,
-                                concluidas: selConcluidas,
-                                visualizacao: selVis,
-                            }});
-
-                            // *** FECHAR MENU DE FILTROS ***
-                            document.getElementById('filter-menu-{project["id"]}').classList.remove('is-open');
-
-                            if (selProjectIndex !== currentProjectIndex) {{
-                                currentProjectIndex = selProjectIndex;
-                                const newProject = allProjectsData[selProjectIndex];
-                                projectData = [JSON.parse(JSON.stringify(newProject))];
-                                // Reorganizar tasks com estrutura de subetapas
-                                projectData[0].tasks = organizarTasksComSubetapas(projectData[0].tasks);
-                                allTasks_baseData = JSON.parse(JSON.stringify(projectData[0].tasks));
-                            }}
-
-                            let baseTasks = JSON.parse(JSON.stringify(allTasks_baseData));
-                            let filteredTasks = baseTasks;
-
-                            // *** LÓGICA DE FILTRO CORRIGIDA ***
-                            // Filtro por Setor
-                            if (selSetorArray.length > 0 && !selSetorArray.includes('Todos')) {{
-                                filteredTasks = filteredTasks.filter(t => selSetorArray.includes(t.setor));
-                                console.log('Após filtro setor:', filteredTasks.length);
-                            }}
-                            
-                            // Filtro por Etapa
-                            if (selEtapaArray.length > 0 && !selEtapaArray.includes('Todas')) {{
-                                filteredTasks = filteredTasks.filter(t => selEtapaArray.includes(t.name));
-                                console.log('Após filtro etapa:', filteredTasks.length);
-                            }}
-
-                            // Filtro por Concluídas
-                            if (selConcluidas) {{
-                                filteredTasks = filteredTasks.filter(t => t.progress < 100);
-                                console.log('Após filtro concluídas:', filteredTasks.length);
-                            }}
-
-                            console.log('Tasks após filtros:', filteredTasks.length);
-                            console.log('Tasks filtradas:', filteredTasks);
-
-                            // Se não há tasks após filtrar, mostrar mensagem mas permitir continuar
-                            if (filteredTasks.length === 0) {{
-                                console.warn('Nenhuma task passou pelos filtros aplicados');
-                                // Não interromper o processo, deixar que o renderSidebar mostre a mensagem apropriada
-                            }}
-
-                            // Recalcular range de datas apenas se houver tasks
-                            if (filteredTasks.length > 0) {{
-                                const {{ min: newMinStr, max: newMaxStr }} = findNewDateRange(filteredTasks);
-                                const newMin = parseDate(newMinStr);
-                                const newMax = parseDate(newMaxStr);
-                                const originalMin = parseDate(dataMinStr);
-                                const originalMax = parseDate(dataMaxStr);
-
-                                let finalMinDate = originalMin;
-                                if (newMin && newMin < finalMinDate) {{
-                                    finalMinDate = newMin;
-                                }}
-
-                                let finalMaxDate = originalMax;
-                                if (newMax && newMax > finalMaxDate) {{
-                                    finalMaxDate = newMax;
-                                }}
-
-                                finalMinDate = new Date(finalMinDate.getTime());
-                                finalMaxDate = new Date(finalMaxDate.getTime());
-                                finalMinDate.setUTCDate(1);
-                                finalMaxDate.setUTCMonth(finalMaxDate.getUTCMonth() + 1, 0);
-
-                                activeDataMinStr = finalMinDate.toISOString().split('T')[0];
-                                activeDataMaxStr = finalMaxDate.toISOString().split('T')[0];
-                            }}
-
-                            // Atualizar dados e redesenhar
-                            projectData[0].tasks = filteredTasks;
-                            tipoVisualizacao = selVis;
-
-                            renderSidebar();
-                            renderHeader();
-                            renderChart();
-                            positionTodayLine();
-                            positionMetaLine();
-                            updateProjectTitle();
-
-                        }} catch (error) {{
-                            console.error('Erro ao aplicar filtros:', error);
-                            alert('Erro ao aplicar filtros: ' + error.message);
-                        }}
-                    }}                  // DEBUG: Verificar se há dados antes de inicializar
-                    console.log('Dados do projeto:', projectData);
-                    console.log('Tasks base:', allTasks_baseData);
-                    
-                    // Inicializar o Gantt
-                    initGantt();
-                    
-                    // ==== MENU RADIAL DE CONTEXTO ====
-                    (function() {{
-                        const container = document.getElementById('gantt-container-{project["id"]}');
-                        if (!container) return;
-                        
-                        const menu = document.getElementById('radial-menu');
-                        const notepad = document.getElementById('floating-notepad');
-                        
-                        if (!menu || !notepad) {{
-                            console.warn('Menu radial ou notepad não encontrado');
-                            return;
-                        }}
-                        
-                        // --- 1. ABRIR MENU COM RIGHT-CLICK ---
-                        container.addEventListener('contextmenu', (e) => {{
-                            e.preventDefault();
-                            e.stopPropagation();
-                            
-                            const menuWidth = 170;
-                            const menuHeight = 170;
-                            const viewportWidth = window.innerWidth;
-                            const viewportHeight = window.innerHeight;
-                            
-                            let left = e.clientX - (menuWidth / 2);
-                            let top = e.clientY - (menuHeight / 2);
-                            
-                            if (left + menuWidth > viewportWidth) left = viewportWidth - menuWidth - 10;
-                            if (left < 0) left = 10;
-                            if (top + menuHeight > viewportHeight) top = viewportHeight - menuHeight - 10;
-                            if (top < 0) top = 10;
-                            
-                            menu.style.left = left + 'px';
-                            menu.style.top = top + 'px';
-                            menu.style.display = 'block';
-                            
-                            console.log('📍 Menu radial aberto');
-                        }});
-                        
-                        // --- 2. FECHAR MENU AO CLICAR FORA ---
-                        document.addEventListener('click', (e) => {{
-                            if (!menu.contains(e.target) && menu.style.display === 'block') {{
-                                menu.style.display = 'none';
-                            }}
-                        }});
-                        
-                        // --- 2.1. FECHAR MENU AO CLICAR NOS CÍRCULOS INTERNOS ---
-                        const radialCenter = menu.querySelector('.radial-center');
-                        const radialBgCircle = menu.querySelector('.radial-background-circle');
-                        
-                        if (radialCenter) {{
-                            radialCenter.addEventListener('click', (e) => {{
-                                e.stopPropagation();
-                                menu.style.display = 'none';
-                                console.log('❌ Menu fechado (clique no centro)');
-                            }});
-                        }}
-                        
-                        if (radialBgCircle) {{
-                            radialBgCircle.addEventListener('click', (e) => {{
-                                e.stopPropagation();
-                                menu.style.display = 'none';
-                                console.log('❌ Menu fechado (clique no círculo de fundo)');
-                            }});
-                        }}
-                        
-                        // --- 3. FLOATING NOTEPAD ---
-                        let notepadActive = false;
-                        const notepadBtn = document.getElementById('btn-notepad');
-                        const notepadTextarea = notepad.querySelector('.notepad-content');
-                        const notepadClose = notepad.querySelector('.notepad-close');
-                        const NOTEPAD_STORAGE_KEY = 'gantt_notepad_content';
-                        
-                        const savedContent = localStorage.getItem(NOTEPAD_STORAGE_KEY);
-                        if (savedContent && notepadTextarea) {{
-                            notepadTextarea.value = savedContent;
-                        }}
-                        
-                        if (notepadTextarea) {{
-                            notepadTextarea.addEventListener('input', () => {{
-                                localStorage.setItem(NOTEPAD_STORAGE_KEY, notepadTextarea.value);
-                            }});
-                        }}
-                        
-                        if (notepadBtn) {{
-                            notepadBtn.addEventListener('click', (e) => {{
-                                e.stopPropagation();
-                                notepadActive = !notepadActive;
-                                notepad.style.display = notepadActive ? 'flex' : 'none';
-                                
-                                if (notepadActive) {{
-                                    notepadBtn.style.borderColor = '#007AFF';
-                                    notepadBtn.style.background = '#e6f2ff';
-                                }} else {{
-                                    notepadBtn.style.borderColor = '';
-                                    notepadBtn.style.background = '';
-                                }}
-                                
-                                menu.style.display = 'none';
-                                console.log('📝 Notepad toggled:', notepadActive);
-                            }});
-                        }}
-                        
-                        if (notepadClose) {{
-                            notepadClose.addEventListener('click', () => {{
-                                notepadActive = false;
-                                notepad.style.display = 'none';
-                                if (notepadBtn) {{
-                                    notepadBtn.style.borderColor = '';
-                                    notepadBtn.style.background = '';
-                                }}
-                            }});
-                        }}
-                        
-                        // Drag-and-drop do notepad
-                        let isDragging = false;
-                        let offsetX, offsetY;
-                        const notepadHeader = notepad.querySelector('.notepad-header');
-                        
-                        if (notepadHeader) {{
-                            notepadHeader.addEventListener('mousedown', (e) => {{
-                                if (e.target.closest('.notepad-close')) return;
-                                isDragging = true;
-                                offsetX = e.clientX - notepad.offsetLeft;
-                                offsetY = e.clientY - notepad.offsetTop;
-                                notepadHeader.style.cursor = 'grabbing';
-                            }});
-                        }}
-                        
-                        document.addEventListener('mousemove', (e) => {{
-                            if (isDragging) {{
-                                notepad.style.left = (e.clientX - offsetX) + 'px';
-                                notepad.style.top = (e.clientY - offsetY) + 'px';
-                                notepad.style.right = 'auto';
-                            }}
-                        }});
-                        
-                        document.addEventListener('mouseup', () => {{
-                            if (isDragging) {{
-                                isDragging = false;
-                                if (notepadHeader) notepadHeader.style.cursor = 'move';
-                            }}
-                        }});
-                        
-                        // --- 5. MODO FOCO ---
-                        let focusModeActive = false;
-                        const focusBtn = document.getElementById('btn-focus-mode');
-                        
-                        if (focusBtn) {{
-                            focusBtn.addEventListener('click', (e) => {{
-                                e.stopPropagation();
-                                focusModeActive = !focusModeActive;
-                                
-                                const allBars = container.querySelectorAll('.gantt-bar');
-                                
-                                if (focusModeActive) {{
-                                    allBars.forEach(bar => bar.classList.add('focus-mode'));
-                                    focusBtn.style.borderColor = '#007AFF';
-                                    focusBtn.style.background = '#e6f2ff';
-                                    console.log('🎯 Modo foco ATIVADO');
-                                }} else {{
-                                    allBars.forEach(bar => {{
-                                        bar.classList.remove('focus-mode', 'focused');
-                                    }});
-                                    focusBtn.style.borderColor = '';
-                                    focusBtn.style.background = '';
-                                    console.log('🎯 Modo foco DESATIVADO');
-                                }}
-                                
-                                menu.style.display = 'none';
-                            }});
-                        }}
-                        
-                        // --- 6. CLICK EM BARRAS PARA FOCAR/DESFOCAR ---
-                        container.addEventListener('click', (e) => {{
-                            if (!focusModeActive) return;
-                            
-                            const clickedBar = e.target.closest('.gantt-bar');
-                            if (!clickedBar) return;
-                            
-                            if (clickedBar.classList.contains('focused')) {{
-                                clickedBar.classList.remove('focused');
-                                console.log('⚫ Barra desfocada');
-                            }} else {{
-                                clickedBar.classList.add('focused');
-                                console.log('⚪ Barra focada');
-                            }}
-                        }});
-                        
-                        console.log('✅ Menu radial de contexto inicializado');
-                    }})();
-                </script>
-            </body>
-            </html>
-        """
+        gantt_html = renderizar_template_gantt(
+            "gantt_projeto.html",
+            PROJECT_ID=project['id'],
+            PROJECT_NAME=project['name'],
+            PROJECT_INDEX=correct_project_index_for_js,
+            CHART_MIN_WIDTH=total_meses_proj * 30,
+            GRUPOS_JSON=json.dumps(GRUPOS),
+            CORES_POR_SETOR_JSON=json.dumps(StyleConfig.CORES_POR_SETOR),
+            ALL_PROJECTS_JSON=payload_gantt['all_projects_json'],
+            PROJECT_DATA_JSON=payload_gantt['project_json'],
+            TASKS_JSON=payload_gantt['tasks_json'],
+            FILTER_OPTIONS_JSON=json.dumps(filter_options),
+            DATA_MIN=data_min_proj.strftime('%Y-%m-%d'),
+            DATA_MAX=data_max_proj.strftime('%Y-%m-%d'),
+            TIPO_VISUALIZACAO=tipo_visualizacao,
+            PULMAO_STATUS=pulmao_status,
+            PULMAO_MESES=pulmao_meses,
+        )
         # Exibe o componente HTML no Streamlit
         components.html(gantt_html, height=altura_gantt, scrolling=True)
         # *** GERAÇÃO DO RELATÓRIO TXT ***
@@ -2724,11 +1009,6 @@ def converter_dados_para_gantt_consolidado(df, etapa_selecionada):
             start_real = row.get("Inicio_Real")
             end_real_original = row.get("Termino_Real")
 
-            # Garantir que as datas são objetos datetime, pois o .get() pode retornar NaT ou None
-            if pd.notna(start_date): start_date = pd.to_datetime(start_date)
-            if pd.notna(end_date): end_date = pd.to_datetime(end_date)
-            if pd.notna(start_real): start_real = pd.to_datetime(start_real)
-            if pd.notna(end_real_original): end_real_original = pd.to_datetime(end_real_original)
             progress = row.get("% concluído", 0)
 
             # Lógica para tratar datas vazias
@@ -2777,16 +1057,16 @@ def converter_dados_para_gantt_consolidado(df, etapa_selecionada):
                 "numero_etapa": i + 1,
                 "start_previsto": start_date.strftime("%Y-%m-%d"),
                 "end_previsto": end_date.strftime("%Y-%m-%d"),
-                "start_real": pd.to_datetime(start_real).strftime("%Y-%m-%d") if pd.notna(start_real) else None,
-                "end_real": pd.to_datetime(end_real_visual).strftime("%Y-%m-%d") if pd.notna(end_real_visual) else None,
-                "end_real_original_raw": pd.to_datetime(end_real_original).strftime("%Y-%m-%d") if pd.notna(end_real_original) else None,
+                "start_real": start_real.strftime("%Y-%m-%d") if pd.notna(start_real) else None,
+                "end_real": end_real_visual.strftime("%Y-%m-%d") if pd.notna(end_real_visual) else None,
+                "end_real_original_raw": end_real_original.strftime("%Y-%m-%d") if pd.notna(end_real_original) else None,
                 "setor": row.get("SETOR", "Não especificado"),
                 "grupo": "Consolidado",
                 "progress": int(progress),
                 "inicio_previsto": start_date.strftime("%d/%m/%y"),
                 "termino_previsto": end_date.strftime("%d/%m/%y"),
-                "inicio_real": pd.to_datetime(start_real).strftime("%d/%m/%y") if pd.notna(start_real) else "N/D",
-                "termino_real": pd.to_datetime(end_real_original).strftime("%d/%m/%y") if pd.notna(end_real_original) else "N/D",
+                "inicio_real": start_real.strftime("%d/%m/%y") if pd.notna(start_real) else "N/D",
+                "termino_real": end_real_original.strftime("%d/%m/%y") if pd.notna(end_real_original) else "N/D",
                 "duracao_prev_meses": f"{dur_prev_meses:.1f}".replace('.', ',') if dur_prev_meses is not None else "-",
                 "duracao_real_meses": f"{dur_real_meses:.1f}".replace('.', ',') if dur_real_meses is not None else "-",
                 "vt_text": f"{int(vt):+d}d" if pd.notna(vt) else "-",
@@ -2805,6 +1085,99 @@ def converter_dados_para_gantt_consolidado(df, etapa_selecionada):
     gantt_data.append(project)
 
     return gantt_data
+def montar_tarefas_por_etapa(df_gantt_agg):
+    """
+    Monta, em uma única passada sobre o DataFrame agregado por (Etapa, Empreendimento),
+    a lista de tarefas de TODAS as etapas da visão consolidada.
+
+    Retorna o dicionário {nome completo da etapa: tarefas} e a lista de nomes das etapas.
+    """
+    if df_gantt_agg.empty:
+        return {}, []
+
+    dados = df_gantt_agg
+    agora = pd.Timestamp.now()
+    hoje = agora.normalize()
+
+    inicio_real = dados['Inicio_Real']
+    termino_real = dados['Termino_Real']
+    progresso = dados['% concluído'].fillna(0)
+
+    inicio_prev = dados['Inicio_Prevista'].fillna(agora)
+    termino_prev = dados['Termino_Prevista'].fillna(inicio_prev + pd.Timedelta(days=30))
+    termino_real_visual = termino_real.mask(inicio_real.notna() & (progresso < 100) & termino_real.isna(), agora)
+
+    vt = calculate_business_days_batch(termino_prev, termino_real)
+    vd = calculate_business_days_batch(inicio_real, termino_real) - calculate_business_days_batch(inicio_prev, termino_prev)
+
+    concluida = progresso == 100
+    terminos_validos = termino_real.notna() & termino_prev.notna()
+    status_color_class = np.select(
+        [
+            concluida & terminos_validos & (termino_real <= termino_prev),
+            concluida & terminos_validos,
+            (progresso < 100) & termino_real.notna() & (termino_real < hoje),
+        ],
+        ['status-green', 'status-red', 'status-yellow'],
+        default='status-default'
+    )
+
+    # Índice de cada etapa na ordem em que aparece (usado no ID único da tarefa)
+    indice_etapa, etapas_unicas = pd.factorize(dados['Etapa'])
+    nomes_etapas = [sigla_para_nome_completo.get(sigla, sigla) for sigla in etapas_unicas]
+    setores = dados['SETOR'] if 'SETOR' in dados.columns else pd.Series("Não especificado", index=dados.index)
+
+    colunas_tarefa = zip(
+        indice_etapa.tolist(),
+        dados.index.tolist(),
+        dados['Empreendimento'].tolist(),
+        _datas_para_texto(inicio_prev, "%Y-%m-%d"),
+        _datas_para_texto(termino_prev, "%Y-%m-%d"),
+        _datas_para_texto(inicio_real, "%Y-%m-%d"),
+        _datas_para_texto(termino_real_visual, "%Y-%m-%d"),
+        _datas_para_texto(termino_real, "%Y-%m-%d"),
+        setores.tolist(),
+        progresso.astype(int).tolist(),
+        _datas_para_texto(inicio_prev, "%d/%m/%y"),
+        _datas_para_texto(termino_prev, "%d/%m/%y"),
+        _datas_para_texto(inicio_real, "%d/%m/%y", "N/D"),
+        _datas_para_texto(termino_real, "%d/%m/%y", "N/D"),
+        _meses_para_texto((termino_prev - inicio_prev).dt.days / 30.4375),
+        _meses_para_texto((termino_real - inicio_real).dt.days / 30.4375),
+        _dias_para_texto(vt),
+        _dias_para_texto(vd),
+        status_color_class.tolist(),
+    )
+
+    all_data_by_stage_js = {nome: [] for nome in nomes_etapas}
+    for (i, j, empreendimento, start_previsto, end_previsto, start_real, end_real, end_real_original_raw, setor,
+         progress, inicio_previsto, termino_previsto, inicio_real_txt, termino_real_txt,
+         duracao_prev_meses, duracao_real_meses, vt_text, vd_text, status) in colunas_tarefa:
+        all_data_by_stage_js[nomes_etapas[i]].append({
+            "id": f"t{j}_{i}", # ID único
+            "name": empreendimento, # O 'name' ainda é o Empreendimento
+            "numero_etapa": j + 1,
+            "start_previsto": start_previsto,
+            "end_previsto": end_previsto,
+            "start_real": start_real,
+            "end_real": end_real,
+            "end_real_original_raw": end_real_original_raw,
+            "setor": setor,
+            "grupo": "Consolidado",
+            "progress": progress,
+            "inicio_previsto": inicio_previsto,
+            "termino_previsto": termino_previsto,
+            "inicio_real": inicio_real_txt,
+            "termino_real": termino_real_txt,
+            "duracao_prev_meses": duracao_prev_meses,
+            "duracao_real_meses": duracao_real_meses,
+            "vt_text": vt_text,
+            "vd_text": vd_text,
+            "status_color_class": status
+        })
+
+    return all_data_by_stage_js, nomes_etapas
+
 # Substitua sua função gerar_gantt_consolidado inteira por esta
 def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, pulmao_status, pulmao_meses, etapa_selecionada_inicialmente):
     """
@@ -2817,17 +1190,15 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
 
     # --- 1. Preparação dos Dados (MODIFICADO) ---
     df_gantt = df.copy() # df agora tem MÚLTIPLAS etapas
+    conferir_esquema(df_gantt, "gerar_gantt_consolidado")
 
-    for col in ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]:
-        if col in df_gantt.columns:
-            df_gantt[col] = pd.to_datetime(df_gantt[col], errors="coerce")
-
+    # "% concluído" já vem normalizado (0-100) desde a carga
     if "% concluído" not in df_gantt.columns: 
-        df_gantt["% concluído"] = 0
-    df_gantt["% concluído"] = df_gantt["% concluído"].fillna(0).apply(converter_porcentagem)
+        df_gantt["% concluído"] = 0.0
+    df_gantt["% concluído"] = df_gantt["% concluído"].fillna(0)
 
     # Agrupar por Etapa E Empreendimento
-    df_gantt_agg = df_gantt.groupby(['Etapa', 'Empreendimento']).agg(
+    df_gantt_agg = df_gantt.groupby(['Etapa', 'Empreendimento'], observed=True).agg(
         Inicio_Prevista=('Inicio_Prevista', 'min'),
         Termino_Prevista=('Termino_Prevista', 'max'),
         Inicio_Real=('Inicio_Real', 'min'),
@@ -2836,74 +1207,8 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
         SETOR=('SETOR', 'first')
     ).reset_index()
     
-    all_data_by_stage_js = {}
-    all_stage_names_full = [] # Para o novo filtro
-    # Iterar por cada etapa única
-    etapas_unicas_no_df = df_gantt_agg['Etapa'].unique()
-    
-    for i, etapa_sigla in enumerate(etapas_unicas_no_df):
-        df_etapa_agg = df_gantt_agg[df_gantt_agg['Etapa'] == etapa_sigla]
-        etapa_nome_completo = sigla_para_nome_completo.get(etapa_sigla, etapa_sigla)
-        all_stage_names_full.append(etapa_nome_completo)
-        
-        tasks_base_data_for_stage = []
-        
-        for j, row in df_etapa_agg.iterrows():
-            start_date = row.get("Inicio_Prevista")
-            end_date = row.get("Termino_Prevista")
-            start_real = row.get("Inicio_Real")
-            end_real_original = row.get("Termino_Real")
-
-            # Garantir que as datas são objetos datetime, pois o .get() pode retornar NaT ou None
-            if pd.notna(start_date): start_date = pd.to_datetime(start_date)
-            if pd.notna(end_date): end_date = pd.to_datetime(end_date)
-            if pd.notna(start_real): start_real = pd.to_datetime(start_real)
-            if pd.notna(end_real_original): end_real_original = pd.to_datetime(end_real_original)
-            progress = row.get("% concluído", 0)
-
-            if pd.isna(start_date): start_date = datetime.now()
-            if pd.isna(end_date): end_date = start_date + timedelta(days=30)
-            end_real_visual = end_real_original
-            if pd.notna(start_real) and progress < 100 and pd.isna(end_real_original): end_real_visual = datetime.now()
-
-            vt = calculate_business_days(end_date, end_real_original)
-            duracao_prevista_uteis = calculate_business_days(start_date, end_date)
-            duracao_real_uteis = calculate_business_days(start_real, end_real_original)
-            vd = None
-            if pd.notna(duracao_real_uteis) and pd.notna(duracao_prevista_uteis): vd = duracao_real_uteis - duracao_prevista_uteis
-            status_color_class = 'status-default'
-            hoje = pd.Timestamp.now().normalize()
-            if progress == 100:
-                if pd.notna(end_real_original) and pd.notna(end_date):
-                    if end_real_original <= end_date: status_color_class = 'status-green'
-                    else: status_color_class = 'status-red'
-            elif progress < 100 and pd.notna(end_real_original) and (end_real_original < hoje): status_color_class = 'status-yellow'
-
-            task = {
-                "id": f"t{j}_{i}", # ID único
-                "name": row["Empreendimento"], # O 'name' ainda é o Empreendimento
-                "numero_etapa": j + 1,
-                "start_previsto": start_date.strftime("%Y-%m-%d"),
-                "end_previsto": end_date.strftime("%Y-%m-%d"),
-                "start_real": pd.to_datetime(start_real).strftime("%Y-%m-%d") if pd.notna(start_real) else None,
-                "end_real": pd.to_datetime(end_real_visual).strftime("%Y-%m-%d") if pd.notna(end_real_visual) else None,
-                "end_real_original_raw": pd.to_datetime(end_real_original).strftime("%Y-%m-%d") if pd.notna(end_real_original) else None,
-                "setor": row.get("SETOR", "Não especificado"),
-                "grupo": "Consolidado", # Correto
-                "progress": int(progress),
-                "inicio_previsto": start_date.strftime("%d/%m/%y"),
-                "termino_previsto": end_date.strftime("%d/%m/%y"),
-                "inicio_real": pd.to_datetime(start_real).strftime("%d/%m/%y") if pd.notna(start_real) else "N/D",
-                "termino_real": pd.to_datetime(end_real_original).strftime("%d/%m/%y") if pd.notna(end_real_original) else "N/D",
-                "duracao_prev_meses": f"{(end_date - start_date).days / 30.4375:.1f}".replace('.', ',') if pd.notna(start_date) and pd.notna(end_date) else "-",
-                "duracao_real_meses": f"{(end_real_original - start_real).days / 30.4375:.1f}".replace('.', ',') if pd.notna(start_real) and pd.notna(end_real_original) else "-",
-                "vt_text": f"{int(vt):+d}d" if pd.notna(vt) else "-",
-                "vd_text": f"{int(vd):+d}d" if pd.notna(vd) else "-",
-                "status_color_class": status_color_class
-            }
-            tasks_base_data_for_stage.append(task)
-            
-        all_data_by_stage_js[etapa_nome_completo] = tasks_base_data_for_stage
+    # Tarefas de todas as etapas montadas de uma vez
+    all_data_by_stage_js, all_stage_names_full = montar_tarefas_por_etapa(df_gantt_agg)
     
     if not all_data_by_stage_js:
         st.warning("Nenhum dado válido para o Gantt Consolidado após a conversão.")
@@ -2919,8 +1224,9 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
     # Pegar os dados da *primeira* etapa selecionada para a renderização inicial
     tasks_base_data_inicial = all_data_by_stage_js.get(etapa_selecionada_inicialmente, [])
 
-    # Criar um "projeto" único
-    project_id = f"p_cons_{random.randint(1000, 9999)}"
+    # Criar um "projeto" único (ID fixo: cada components.html é um iframe isolado, e um ID estável
+    # mantém o HTML idêntico entre reruns, evitando que o navegador recarregue o gráfico à toa)
+    project_id = "p_cons"
     project = {
         "id": project_id,
         "name": f"Comparativo: {etapa_selecionada_inicialmente}", # Nome inicial
@@ -2937,1201 +1243,21 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
     altura_gantt = max(400, (len(empreendimentos_no_df) * 30) + 150)
 
     # --- 4. Geração do HTML/JS Corrigido ---
-    gantt_html = f"""
-    <!DOCTYPE html>
-        <html lang="pt-BR">
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            {'''
-            <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/virtual-select-plugin@1.0.39/dist/virtual-select.min.css">
-            '''}
-            <style>
-                /* CSS idêntico ao de gerar_gantt_por_projeto, exceto adaptações para consolidado */
-                 * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-                html, body {{ width: 100%; height: 100%; font-family: 'Segoe UI', sans-serif; background-color: #f5f5f5; color: #333; overflow: hidden; }}
-                .gantt-container {{ width: 100%; height: 100%; background-color: white; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); overflow: hidden; position: relative; display: flex; flex-direction: column; }}
-                .gantt-main {{ display: flex; flex: 1; overflow: hidden; }}
-                .gantt-sidebar-wrapper {{ width: 680px; display: flex; flex-direction: column; flex-shrink: 0; transition: width 0.3s ease-in-out; border-right: 2px solid #e2e8f0; overflow: hidden; }}
-                .gantt-sidebar-header {{ background: linear-gradient(135deg, #4a5568, #2d3748); display: flex; flex-direction: column; height: 60px; flex-shrink: 0; }}
-                .project-title-row {{ display: flex; justify-content: space-between; align-items: center; padding: 0 15px; height: 30px; color: white; font-weight: 600; font-size: 14px; }}
-                .toggle-sidebar-btn {{ background: rgba(255,255,255,0.2); border: none; color: white; width: 24px; height: 24px; border-radius: 5px; cursor: pointer; font-size: 14px; display: flex; align-items: center; justify-content: center; transition: background-color 0.2s, transform 0.3s ease-in-out; }}
-                .toggle-sidebar-btn:hover {{ background: rgba(255,255,255,0.4); }}
-                .sidebar-grid-header-wrapper {{ display: grid; grid-template-columns: 0px 1fr; color: #d1d5db; font-size: 9px; font-weight: 600; text-transform: uppercase; height: 30px; align-items: center; }}
-                .sidebar-grid-header {{ display: grid; grid-template-columns: 2.5fr 0.9fr 0.9fr 0.6fr 0.9fr 0.9fr 0.6fr 0.5fr 0.6fr 0.6fr; padding: 0 10px; align-items: center; }}
-                .sidebar-row {{ display: grid; grid-template-columns: 2.5fr 0.9fr 0.9fr 0.6fr 0.9fr 0.9fr 0.6fr 0.5fr 0.6fr 0.6fr; border-bottom: 1px solid #eff2f5; height: 30px; padding: 0 10px; background-color: white; transition: all 0.2s ease-in-out; }}
-                .sidebar-cell {{ display: flex; align-items: center; justify-content: center; font-size: 11px; color: #4a5568; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; padding: 0 8px; border: none; }}
-                .header-cell {{ text-align: center; }}
-                .header-cell.task-name-cell {{ text-align: left; }}
-                .gantt-sidebar-content {{ background-color: #f8f9fa; flex: 1; overflow-y: auto; overflow-x: hidden; }}
-                .sidebar-group-wrapper {{ display: flex; border-bottom: none; }}
-                .gantt-sidebar-content > .sidebar-group-wrapper:last-child {{ border-bottom: none; }}
-                .sidebar-group-title-vertical {{ display: none; }}
-                .sidebar-group-spacer {{ display: none; }}
-                .sidebar-rows-container {{ flex-grow: 1; }}
-                .sidebar-row.odd-row {{ background-color: #fdfdfd; }}
-                .sidebar-rows-container .sidebar-row:last-child {{ border-bottom: none; }}
-                .sidebar-row:hover {{ background-color: #f5f8ff; }}
-                .sidebar-cell.task-name-cell {{ justify-content: flex-start; font-weight: 600; color: #2d3748; }}
-                .sidebar-cell.status-green {{ color: #1E8449; font-weight: 700; }}
-                .sidebar-cell.status-red   {{ color: #C0392B; font-weight: 700; }}
-                .sidebar-cell.status-yellow{{ color: #B9770E; font-weight: 700; }}
-                .sidebar-cell.status-default{{ color: #566573; font-weight: 700; }}
-                .sidebar-row .sidebar-cell:nth-child(2),
-                .sidebar-row .sidebar-cell:nth-child(3),
-                .sidebar-row .sidebar-cell:nth-child(4),
-                .sidebar-row .sidebar-cell:nth-child(5),
-                .sidebar-row .sidebar-cell:nth-child(6),
-                .sidebar-row .sidebar-cell:nth-child(7),
-                .sidebar-row .sidebar-cell:nth-child(8),
-                .sidebar-row .sidebar-cell:nth-child(9),
-                .sidebar-row .sidebar-cell:nth-child(10) {{ font-size: 8px; }}
-                .gantt-row-spacer, .sidebar-row-spacer {{ display: none; }}
-                .gantt-sidebar-wrapper.collapsed {{ width: 250px; }}
-                .gantt-sidebar-wrapper.collapsed .sidebar-grid-header, .gantt-sidebar-wrapper.collapsed .sidebar-row {{ grid-template-columns: 1fr; padding: 0 15px 0 10px; }}
-                .gantt-sidebar-wrapper.collapsed .header-cell:not(.task-name-cell), .gantt-sidebar-wrapper.collapsed .sidebar-cell:not(.task-name-cell) {{ display: none; }}
-                .gantt-sidebar-wrapper.collapsed .toggle-sidebar-btn {{ transform: rotate(180deg); }}
-                .gantt-chart-content {{ flex: 1; overflow: auto; position: relative; background-color: white; user-select: none; cursor: grab; }}
-                .gantt-chart-content.active {{ cursor: grabbing; }}
-                .chart-container {{ position: relative; min-width: {total_meses_proj * 30}px; }}
-                .chart-header {{ background: linear-gradient(135deg, #4a5568, #2d3748); color: white; height: 60px; position: sticky; top: 0; z-index: 9; display: flex; flex-direction: column; }}
-                .year-header {{ height: 30px; display: flex; align-items: center; border-bottom: 1px solid rgba(255,255,255,0.2); }}
-                .year-section {{ text-align: center; font-weight: 600; font-size: 12px; display: flex; align-items: center; justify-content: center; background: rgba(255,255,255,0.1); height: 100%; }}
-                .month-header {{ height: 30px; display: flex; align-items: center; }}
-                .month-cell {{ width: 30px; height: 30px; border-right: 1px solid rgba(255,255,255,0.2); display: flex; align-items: center; justify-content: center; font-size: 10px; font-weight: 500; }}
-                .chart-body {{ position: relative; }}
-                .gantt-row {{ position: relative; height: 30px; border-bottom: 1px solid #eff2f5; background-color: white; }}
-                .gantt-bar {{ position: absolute; height: 14px; top: 8px; border-radius: 3px; cursor: pointer; transition: all 0.2s ease; display: flex; align-items: center; padding: 0 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-                .gantt-bar-overlap {{ position: absolute; height: 14px; top: 8px; background-image: linear-gradient(45deg, rgba(0, 0, 0, 0.25) 25%, transparent 25%, transparent 50%, rgba(0, 0, 0, 0.25) 50%, rgba(0, 0, 0, 0.25) 75%, transparent 75%, transparent); background-size: 8px 8px; z-index: 9; pointer-events: none; border-radius: 3px; }}
-                .gantt-bar:hover {{ transform: translateY(-1px) scale(1.01); box-shadow: 0 4px 8px rgba(0,0,0,0.2); z-index: 10 !important; }}
-                .gantt-bar.previsto {{ z-index: 7; }}
-                .gantt-bar.real {{ z-index: 8; }}
-                .bar-label {{ font-size: 8px; font-weight: 600; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; text-shadow: 0 1px 2px rgba(0,0,0,0.4); }}
-                .gantt-bar.real .bar-label {{ color: white; }}
-                .gantt-bar.previsto .bar-label {{ color: #6C6C6C; }}
-                .tooltip {{ position: fixed; background-color: #2d3748; color: white; padding: 6px 10px; border-radius: 4px; font-size: 11px; z-index: 1000; box-shadow: 0 2px 8px rgba(0,0,0,0.3); pointer-events: none; opacity: 0; transition: opacity 0.2s ease; max-width: 220px; }}
-                .tooltip.show {{ opacity: 1; }}
-                .today-line {{ position: absolute; top: 60px; bottom: 0; width: 1px; background-color: #fdf1f1; z-index: 5; box-shadow: 0 0 1px rgba(229, 62, 62, 0.6); }}
-                .month-divider {{ position: absolute; top: 60px; bottom: 0; width: 1px; background-color: #fcf6f6; z-index: 4; pointer-events: none; }}
-                .month-divider.first {{ background-color: #eeeeee; width: 1px; }}
-                .meta-line, .meta-line-label {{ display: none; }}
-                .gantt-chart-content, .gantt-sidebar-content {{ scrollbar-width: thin; scrollbar-color: transparent transparent; }}
-                .gantt-chart-content:hover, .gantt-sidebar-content:hover {{ scrollbar-color: #d1d5db transparent; }}
-                .gantt-chart-content::-webkit-scrollbar, .gantt-sidebar-content::-webkit-scrollbar {{ height: 8px; width: 8px; }}
-                .gantt-chart-content::-webkit-scrollbar-track, .gantt-sidebar-content::-webkit-scrollbar-track {{ background: transparent; }}
-                .gantt-chart-content::-webkit-scrollbar-thumb, .gantt-sidebar-content::-webkit-scrollbar-thumb {{ background-color: transparent; border-radius: 4px; }}
-                .gantt-chart-content:hover::-webkit-scrollbar-thumb, .gantt-sidebar-content:hover::-webkit-scrollbar-thumb {{ background-color: #d1d5db; }}
-                .gantt-chart-content:hover::-webkit-scrollbar-thumb:hover, .gantt-sidebar-content:hover::-webkit-scrollbar-thumb:hover {{ background-color: #a8b2c1; }}
-                .gantt-toolbar {{
-                    position: absolute; top: 10px; right: 10px;
-                    z-index: 100;
-                    display: flex;
-                    flex-direction: column;
-                    gap: 5px;
-                    background: rgba(45, 55, 72, 0.9); /* Cor de fundo escura para minimalismo */
-                    border-radius: 6px;
-                    padding: 5px;
-                    box-shadow: 0 4px 12px rgba(0,0,0,0.3);
-                }}
-                .toolbar-btn {{
-                    background: none;
-                    border: none;
-                    width: 36px;
-                    height: 36px;
-                    border-radius: 4px;
-                    cursor: pointer;
-                    font-size: 20px;
-                    color: white;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    transition: background-color 0.2s, box-shadow 0.2s;
-                    padding: 0;
-                }}
-                .toolbar-btn:hover {{
-                    background-color: rgba(255, 255, 255, 0.1);
-                    box-shadow: 0 0 0 2px rgba(255, 255, 255, 0.2);
-                }}
-                .toolbar-btn.is-fullscreen {{
-                    background-color: #3b82f6; /* Cor de destaque para o botão ativo */
-                    box-shadow: 0 0 0 2px #3b82f6;
-                }}
-                .toolbar-btn.is-fullscreen:hover {{
-                    background-color: #2563eb;
-                }}
-                /* Tira o background do container quando colapsado e esconde botões */
-                .gantt-toolbar.collapsed {{
-                    background: transparent;
-                    box-shadow: none;
-                    padding: 0;
-                    pointer-events: none;
-                    top: 3px; /* Alinha com o botão de toggle da sidebar */
-                }}
-                .gantt-toolbar.collapsed .toolbar-btn {{
-                    display: none;
-                }}
-                /* O botão de toggle sempre aparece, mas muda de estilo quando colapsado */
-                .gantt-toolbar.collapsed .toolbar-toggle-btn {{
-                    display: flex;
-                    pointer-events: auto;
-                    background: rgba(255, 255, 255, 0.3);
-                    color: #4a5568;
-                    width: 24px;
-                    height: 24px;
-                    border-radius: 4px;
-                    backdrop-filter: blur(2px);
-                }}
-                .gantt-toolbar.collapsed .toolbar-toggle-btn:hover {{
-                    background: rgba(255, 255, 255, 0.8);
-                    opacity: 1;
-                    transform: scale(1.1);
-                }}
-                .toolbar-toggle-btn {{
-                     /* Botão normal dentro da toolbar */
-                     margin-bottom: 2px;
-                }}
-                .toolbar-toggle-btn svg {{
-                    transition: transform 0.3s ease;
-                }}
-                .gantt-toolbar.collapsed .toolbar-toggle-btn svg {{
-                    transform: rotate(180deg);
-                }}
-                 /* *** INÍCIO: Arredondar Dropdown Virtual Select *** */
-                    .floating-filter-menu .vscomp-dropbox {{
-                        border-radius: 8px; /* Controla o arredondamento dos cantos do dropdown */
-                        overflow: hidden;   /* Necessário para que o conteúdo interno não "vaze" pelos cantos arredondados */
-                        box-shadow: 0 5px 15px rgba(0,0,0,0.2); /* Sombra para melhor visualização (opcional) */
-                        border: 1px solid #ccc; /* Borda sutil (opcional) */
-                    }}
-
-                    /* Opcional: Arredondar também o campo de busca interno, se ele ficar visível no topo */
-                    .floating-filter-menu .vscomp-search-wrapper {{
-                    /* Remove o arredondamento padrão se houver, para não conflitar com o container */
-                    border-radius: 0;
-                    }}
-
-                    /* Opcional: Garantir que a lista de opções não ultrapasse */
-                    .floating-filter-menu .vscomp-options-container {{
-                        /* Geralmente não precisa de arredondamento próprio se o overflow:hidden funcionar */
-                    }}
-                    .floating-filter-menu .vscomp-toggle-button .vscomp-value-tag .vscomp-clear-button {{
-                        display: inline-flex;    /* Usa flex para alinhar o ícone interno */
-                        align-items: center;     /* Alinha verticalmente o ícone */
-                        justify-content: center; /* Alinha horizontalmente o ícone */
-                        vertical-align: middle;  /* Ajuda no alinhamento com o texto adjacente */
-                        margin-left: 4px;        /* Espaçamento à esquerda (ajuste conforme necessário) */
-                        padding: 0;            /* Remove padding interno se houver */
-                        position: static;        /* Garante que não use posicionamento absoluto/relativo que possa quebrar o fluxo */
-                        transform: none;         /* Remove qualquer translação que possa estar desalinhando */
-                    }}
-
-                    /* Opcional: Se o próprio ícone 'X' (geralmente uma tag <i>) precisar de ajuste */
-                    .floating-filter-menu .vscomp-toggle-button .vscomp-value-tag .vscomp-clear-button i {{
-                    }}
-                .fullscreen-btn.is-fullscreen {{
-	                    font-size: 24px; padding: 5px 10px; color: white;
-	                }}
-	                .floating-filter-menu {{
-	                    display: none;
-	                    position: absolute;
-	                    top: 10px; right: 50px; /* Ajuste a posição para abrir ao lado da barra de ferramentas */
-	                    width: 280px;
-	                    background: white;
-	                    border-radius: 8px;
-	                    box-shadow: 0 5px 15px rgba(0,0,0,0.3);
-	                    z-index: 99;
-	                    padding: 15px;
-	                    border: 1px solid #e2e8f0;
-	                }}
-	                .floating-filter-menu.is-open {{
-	                    display: block;
-	                }}
-                .filter-group {{ margin-bottom: 12px; }}
-                .filter-group label {{
-                    display: block; font-size: 11px; font-weight: 600;
-                    color: #4a5568; margin-bottom: 4px;
-                    text-transform: uppercase;
-                }}
-                .filter-group select, .filter-group input[type=number] {{
-                    width: 100%; padding: 6px 8px;
-                    border: 1px solid #cbd5e0; border-radius: 4px;
-                    font-size: 13px;
-                }}
-
-                .filter-group-radio, .filter-group-checkbox {{
-                    display: flex; align-items: center; padding: 5px 0;
-                }}
-                .filter-group-radio input, .filter-group-checkbox input {{
-                    width: auto; margin-right: 8px;
-                }}
-                .filter-group-radio label, .filter-group-checkbox label {{
-                    font-size: 13px; font-weight: 500;
-                    color: #2d3748; margin-bottom: 0; text-transform: none;
-                }}
-                .filter-apply-btn {{
-                    width: 100%; padding: 8px; font-size: 14px; font-weight: 600;
-                    color: white; background-color: #2d3748;
-                    border: none; border-radius: 4px; cursor: pointer;
-                    margin-top: 5px;
-                }}
-                .floating-filter-menu .vscomp-toggle-button {{
-                    border: 1px solid #cbd5e0;
-                    border-radius: 4px;
-                    padding: 6px 8px;
-                    font-size: 13px;
-                    min-height: 30px;
-                }}
-                .floating-filter-menu .vscomp-options {{
-                    font-size: 13px;
-                }}
-                .floating-filter-menu .vscomp-option {{
-                }}
-                .floating-filter-menu .vscomp-search-input {{
-                    height: 30px;
-                    font-size: 13px;
-                }}
-                #radial-menu{{position:fixed;display:none;z-index:99999;pointer-events:auto}}.radial-menu-wrapper{{position:relative;width:170px;height:170px}}.radial-center{{position:absolute;top:50%;left:50%;transform:translate(-50%,-50%);width:28px;height:28px;border:2px solid #007AFF;border-radius:50%;background:transparent;cursor:pointer;transition:all .2s ease;z-index:10;display:flex;align-items:center;justify-content:center}}.radial-center:hover{{transform:translate(-50%,-50%) scale(1.1);border-width:3px}}.radial-background-circle{{position:absolute;top:50%;left:50%;transform:translate(-50%,-50%);width:90px;height:90px;border:2px solid #f0f0f0;border-radius:50%;background:transparent;z-index:1}}.radial-item{{position:absolute;width:22px;height:22px;display:flex;align-items:center;justify-content:center;cursor:pointer;transition:all .2s ease;z-index:5;background:white;border:1.5px solid #f0f0f0;border-radius:5px;box-shadow:0 1px 4px rgba(0,0,0,.1)}}.radial-item:hover{{background:#f5f5f5;transform:scale(1.1);box-shadow:0 2px 6px rgba(0,0,0,.15);border-color:#007AFF}}.radial-item svg{{width:14px;height:14px;transition:all .2s ease;fill:#333;stroke:#333}}.radial-item:hover svg{{fill:#007AFF;stroke:#007AFF}}.radial-tooltip{{position:absolute;padding:3px 6px;border-radius:10px;font-size:8px;font-weight:500;white-space:nowrap;display:flex;align-items:center;gap:4px;background:rgba(45,55,72,.95);color:white;opacity:0;pointer-events:none;transition:opacity .2s ease;box-shadow:0 2px 8px rgba(0,0,0,.2);z-index:4}}.radial-tooltip.yellow-tooltip{{background:rgba(255,193,7,.95);color:#333}}.radial-item:hover+.radial-tooltip{{opacity:1}}.tooltip-badge{{padding:2px 5px;border-radius:4px;font-size:8px;font-weight:600;min-width:14px;text-align:center;font-family:'SF Mono',Monaco,'Courier New',monospace;background:#e0e0e0;color:#333}}#floating-notepad{{position:fixed;top:80px;right:20px;width:300px;background:white;border-radius:10px;box-shadow:0 8px 24px rgba(0,0,0,.15);z-index:9999;display:none;flex-direction:column;overflow:hidden;font-family:'Inter',sans-serif;resize:both;min-width:250px;min-height:200px;max-width:600px;max-height:80vh}}.notepad-header{{padding:14px 18px;background:#2E384A;color:white;display:flex;justify-content:space-between;align-items:center;cursor:move;user-select:none;border-bottom:1px solid rgba(255,255,255,.1)}}.notepad-header-title{{display:flex;align-items:center;gap:8px}}.notepad-header-title svg{{width:18px;height:18px;fill:white}}.notepad-close{{background:rgba(255,255,255,.15);border:none;color:white;width:26px;height:26px;border-radius:6px;cursor:pointer;font-size:16px;display:flex;align-items:center;justify-content:center;transition:all .2s ease}}.notepad-close:hover{{background:rgba(255,255,255,.25);transform:scale(1.1)}}.notepad-content{{flex:1;padding:18px;border:none;outline:none;resize:none;font-size:14px;line-height:1.6;font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif;color:#2d3748}}.notepad-content::placeholder{{color:#a0aec0}}.gantt-bar.focus-mode{{filter:grayscale(100%) brightness(0.4)!important;opacity:0.5!important;transition:all .3s ease}}.gantt-bar.focus-mode.focused{{filter:none!important;opacity:1!important;transform:scale(1.02);z-index:100}}
-            </style>
-        </head>
-        <body>
-            <div class="gantt-container" id="gantt-container-{project['id']}">
-                    <!-- Menu Radial de Contexto -->
-                    <div id="radial-menu">
-                        <div class="radial-menu-wrapper">
-                            <div class="radial-background-circle"></div>
-                            <div class="radial-center" title="Menu Radial"></div>
-                            <div class="radial-item" id="btn-notepad" style="top: 74px; left: 120px;">
-                                <svg viewBox="0 0 24 24"><path d="M3 17.25V21h3.75L17.81 9.94l-3.75-3.75L3 17.25zM20.71 7.04c.39-.39.39-1.02 0-1.41l-2.34-2.34c-.39-.39-1.02-.39-1.41 0l-1.83 1.83 3.75 3.75 1.83-1.83z"/></svg>
-                            </div>
-                            <div class="radial-tooltip" style="top: 74px; left: 146px;">Notas <span class="tooltip-badge">N</span></div>
-                            <div class="radial-item" id="btn-focus-mode" style="top: 74px; left: 28px;">
-                                <svg viewBox="0 0 24 24"><rect x="3" y="3" width="7" height="7" rx="1"/><rect x="14" y="3" width="7" height="7" rx="1"/><rect x="3" y="14" width="7" height="7" rx="1"/><path d="M18 18l-3-3m3 3l3-3m-3 3v-6" stroke="currentColor" fill="none" stroke-width="2"/></svg>
-                            </div>
-                            <div class="radial-tooltip" style="top: 74px; right: 146px;">Modo Foco <span class="tooltip-badge">F</span></div>
-                        </div>
-                    </div>
-                    <div id="floating-notepad">
-                        <div class="notepad-header">
-                            <div class="notepad-header-title">
-                                <svg version="1.1" viewBox="0 0 512 512"><path d="M438.8,73.2H292.4L255,0H73.2v512h365.6V73.2z M401.3,474.5H110.7V37.5h119.2l37.4,73.2h134.1V474.5z"/><rect x="146.3" y="150.8" width="219.4" height="36.6"/><rect x="146.3" y="224" width="219.4" height="36.6"/><rect x="146.3" y="297.1" width="219.4" height="36.6"/><rect x="146.3" y="370.3" width="135.9" height="36.6"/></svg>
-                                <span>Anotações</span>
-                            </div>
-                            <button class="notepad-close">×</button>
-                        </div>
-                        <textarea class="notepad-content" placeholder="Digite suas anotações aqui...&#10;&#10;• Use este espaço para lembrar de tarefas pendentes&#10;• Anote insights sobre o projeto&#10;• Suas notas são salvas automaticamente"></textarea>
-                    </div>
-                    
-                    <div class="gantt-toolbar" id="gantt-toolbar-{project["id"]}">
-                        <button class="toolbar-btn toolbar-toggle-btn" id="toolbar-toggle-btn-{project["id"]}" title="Recolher/Expandir Tabela">
-                            <span>
-                                <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                    <polyline points="18 15 12 9 6 15"></polyline>
-                                </svg>
-                            </span>
-                        </button>
-                        <button class="toolbar-btn" id="filter-btn-{project["id"]}" title="Filtros">
-                        <span>
-                            <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                <polygon points="22 3 2 3 10 12.46 10 19 14 21 14 12.46 22 3"></polygon>
-                            </svg>
-                        </span>
-                    </button>
-                    <button class="toolbar-btn" id="fullscreen-btn-{project["id"]}" title="Tela Cheia">
-                        <span>
-                            <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                <path d="M8 3H5a2 2 0 0 0-2 2v3m18 0V5a2 2 0 0 0-2-2h-3m0 18h3a2 2 0 0 0 2-2v-3M3 16v3a2 2 0 0 0 2 2h3"></path>
-                            </svg>
-                        </span>
-                    </button>
-                </div>
-
-                <div class="floating-filter-menu" id="filter-menu-{project['id']}">
-                    
-                    <div class="filter-group">
-                        <label for="filter-etapa-consolidada-{project['id']}">Etapa (Visão Atual)</label>
-                        <select id="filter-etapa-consolidada-{project['id']}">
-                            </select>
-                    </div>
-
-                    <div class="filter-group">
-                        <label for="filter-empreendimento-{project['id']}">Empreendimento</label>
-                        <div id="filter-empreendimento-{project['id']}"></div>
-                    </div>
-
-                    <div class="filter-group">
-                        <div class="filter-group-checkbox">
-                            <input type="checkbox" id="filter-concluidas-{project['id']}">
-                            <label for="filter-concluidas-{project['id']}">Mostrar apenas não concluídas</label>
-                        </div>
-                    </div>
-                    
-                    <div class="filter-group">
-                        <label>Visualização</label>
-                        <div class="filter-group-radio">
-                            <input type="radio" id="filter-vis-ambos-{project['id']}" name="filter-vis-{project['id']}" value="Ambos" checked>
-                            <label for="filter-vis-ambos-{project['id']}">Ambos</label>
-                        </div>
-                        <div class="filter-group-radio">
-                            <input type="radio" id="filter-vis-previsto-{project['id']}" name="filter-vis-{project['id']}" value="Previsto">
-                            <label for="filter-vis-previsto-{project['id']}">Previsto</label>
-                        </div>
-                        <div class="filter-group-radio">
-                            <input type="radio" id="filter-vis-real-{project['id']}" name="filter-vis-{project['id']}" value="Real">
-                            <label for="filter-vis-real-{project['id']}">Real</label>
-                        </div>
-                    </div>
-
-                
-                    <button class="filter-apply-btn" id="filter-apply-btn-{project['id']}">Aplicar Filtros</button>
-                </div>
-
-                <div class="gantt-main">
-                    <div class="gantt-sidebar-wrapper" id="gantt-sidebar-wrapper-{project['id']}">
-                        <div class="gantt-sidebar-header">
-                            <div class="project-title-row">
-                                <span>{project["name"]}</span>
-                                <button class="toggle-sidebar-btn" id="toggle-sidebar-btn-{project['id']}" title="Recolher/Expandir Tabela">«</button>
-                            </div>
-                            <div class="sidebar-grid-header-wrapper">
-                                <div style="width: 0px;"></div>
-                                <div class="sidebar-grid-header">
-                                    <div class="header-cell task-name-cell">EMPREENDIMENTO</div>
-                                    <div class="header-cell">INÍCIO-P</div>
-                                    <div class="header-cell">TÉRMINO-P</div>
-                                    <div class="header-cell">DUR-P</div>
-                                    <div class="header-cell">INÍCIO-R</div>
-                                    <div class="header-cell">TÉRMINO-R</div>
-                                    <div class="header-cell">DUR-R</div>
-                                    <div class="header-cell">%</div>
-                                    <div class="header-cell">VT</div>
-                                    <div class="header-cell">VD</div>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="gantt-sidebar-content" id="gantt-sidebar-content-{project['id']}"></div>
-                    </div>
-                    <div class="gantt-chart-content" id="gantt-chart-content-{project['id']}">
-                        <div class="chart-container" id="chart-container-{project["id"]}">
-                            <div class="chart-header">
-                                <div class="year-header" id="year-header-{project["id"]}"></div>
-                                <div class="month-header" id="month-header-{project["id"]}"></div>
-                            </div>
-                            <div class="chart-body" id="chart-body-{project["id"]}"></div>
-                            <div class="today-line" id="today-line-{project["id"]}"></div>
-                            <div class="meta-line" id="meta-line-{project["id"]}" style="display: none;"></div>
-                            <div class="meta-line-label" id="meta-line-label-{project["id"]}" style="display: none;"></div>
-                        </div>
-                    </div>
-                </div>
-                <div class="tooltip" id="tooltip-{project["id"]}"></div>
-            </div>
-
-            {''''''}
-            <script src="https://cdn.jsdelivr.net/npm/virtual-select-plugin@1.0.39/dist/virtual-select.min.js"></script>
-            {''''''}
-
-            <script>
-                // DEBUG: Verificar dados
-                console.log('Inicializando Gantt Consolidado para:', '{project["name"]}');
-                
-                const coresPorSetor = {json.dumps(StyleConfig.CORES_POR_SETOR)};
-                
-                // --- NOVAS VARIÁVEIS DE DADOS ---
-                // 'projectData' armazena o estado ATUAL (inicia com a etapa selecionada)
-                const projectData = [{json.dumps(project)}]; 
-                // 'allDataByStage' armazena TUDO, chaveado por nome de etapa
-                const allDataByStage = {json.dumps(all_data_by_stage_js)};
-                
-                // 'allTasks_baseData' agora armazena os dados "crus" da etapa ATUAL
-                let allTasks_baseData = {json.dumps(tasks_base_data_inicial)}; 
-                
-                const initialStageName = {json.dumps(etapa_selecionada_inicialmente)};
-                let currentStageName = initialStageName;
-                // --- FIM NOVAS VARIÁVEIS ---
-                
-                const dataMinStr = '{data_min_proj.strftime("%Y-%m-%d")}'; // Range global
-                const dataMaxStr = '{data_max_proj.strftime("%Y-%m-%d")}'; // Range global
-                let tipoVisualizacao = '{tipo_visualizacao}';
-                const PIXELS_PER_MONTH = 30;
-
-                // --- Helpers de Data ---
-                const formatDateDisplay = (dateStr) => {{
-                    if (!dateStr) return "N/D";
-                    const d = parseDate(dateStr);
-                    if (!d || isNaN(d.getTime())) return "N/D";
-                    const day = String(d.getUTCDate()).padStart(2, '0');
-                    const month = String(d.getUTCMonth() + 1).padStart(2, '0');
-                    const year = String(d.getUTCFullYear()).slice(-2);
-                    return `${{day}}/${{month}}/${{year}}`;
-                }};
-
-                function addMonths(dateStr, months) {{
-                    if (!dateStr) return null;
-                    const date = parseDate(dateStr);
-                    if (!date || isNaN(date.getTime())) return null;
-                    const originalDay = date.getUTCDate();
-                    date.setUTCMonth(date.getUTCMonth() + months);
-                    if (date.getUTCDate() !== originalDay) {{
-                        date.setUTCDate(0);
-                    }}
-                    return date.toISOString().split('T')[0];
-                }}
-
-                function parseDate(dateStr) {{ 
-                    if (!dateStr) return null; 
-                    const [year, month, day] = dateStr.split('-').map(Number); 
-                    return new Date(Date.UTC(year, month - 1, day)); 
-                }}
-
-                // --- Dados de Filtro e Tasks ---
-                const filterOptions = {json.dumps(filter_options)};
-                // 'allTasks_baseData' (definido acima) é a base da etapa inicial
-
-                const initialPulmaoStatus = 'Sem Pulmão'; // Valor fixo
-                const initialPulmaoMeses = 0; // Zero meses
-                let pulmaoStatus = 'Sem Pulmão'; // Valor fixo
-                let filtersPopulated = false;
-
-                // *** Variáveis Globais para Filtros ***
-                // let vsSetor, vsGrupo; // REMOVIDO
-                let vsEmpreendimento; 
-                let selEtapaConsolidada; // Novo <select>
-
-            
-                // --- Lógica de Pulmão para Consolidado ---
-                // *** aplicarLogicaPulmaoConsolidado ***
-                function aplicarLogicaPulmaoConsolidado(tasks, offsetMeses, stageName) {{
-                    console.log(`Aplicando pulmão de ${{offsetMeses}}m para etapa: ${{stageName}}`);
-
-                    // Verifica o *tipo* de etapa que estamos processando
-                    if (etapas_sem_alteracao.includes(stageName)) {{
-                        console.log("Etapa sem alteração, retornando tasks originais.");
-                        return tasks; // Não altera datas
-                    
-                    }} else if (etapas_pulmao.includes(stageName)) {{
-                        console.log("Etapa Pulmão: movendo apenas início PREVISTO.");
-                        // Para etapas de pulmão, move apenas o Início PREVISTO
-                        tasks.forEach(task => {{
-                            task.start_previsto = addMonths(task.start_previsto, offsetMeses);
-                            // DATAS REAIS PERMANECEM INALTERADAS
-                            task.inicio_previsto = formatDateDisplay(task.start_previsto);
-                            // Não mexe no 'end_date' real
-                        }});
-                    
-                    }} else {{
-                        console.log("Etapa Padrão: movendo apenas PREVISTO.");
-                        // Para todas as outras etapas, move apenas Início e Fim PREVISTOS
-                        tasks.forEach(task => {{
-                            task.start_previsto = addMonths(task.start_previsto, offsetMeses);
-                            task.end_previsto = addMonths(task.end_previsto, offsetMeses);
-                            // DATAS REAIS PERMANECEM INALTERADAS
-
-                            task.inicio_previsto = formatDateDisplay(task.start_previsto);
-                            task.termino_previsto = formatDateDisplay(task.end_previsto);
-                            // Datas reais mantêm seus valores originais
-                        }});
-                    }}
-                    return tasks;
-                }}
-
-                // *** FUNÇÃO CORRIGIDA: applyInitialPulmaoState ***
-                function applyInitialPulmaoState() {{
-                    if (initialPulmaoStatus === 'Com Pulmão' && initialPulmaoMeses > 0) {{
-                        const offsetMeses = -initialPulmaoMeses;
-                        let baseTasks = JSON.parse(JSON.stringify(allTasks_baseData));
-                        
-                        // Passa o nome da etapa inicial - APENAS DATAS PREVISTAS SERÃO MODIFICADAS
-                        const tasksProcessadas = aplicarLogicaPulmaoConsolidado(baseTasks, offsetMeses, initialStageName);
-                        
-                        projectData[0].tasks = tasksProcessadas;
-                        // Atualiza também o 'allTasks_baseData' que é a fonte "crua" da etapa atual
-                        allTasks_baseData = JSON.parse(JSON.stringify(tasksProcessadas));
-                    }}
-                }}
-
-
-                function initGantt() {{
-                    console.log('Iniciando Gantt Consolidado com dados:', projectData);
-                    
-                    if (!projectData || !projectData[0] || !projectData[0].tasks || projectData[0].tasks.length === 0) {{
-                        console.warn('Nenhum dado disponível para renderizar na etapa inicial');
-                    }}
-
-                    // NOTA: applyInitialPulmaoState foi movida para DENTRO de initGantt
-                    applyInitialPulmaoState(); 
-                    
-                    renderSidebar();
-                    renderHeader();
-                    renderChart();
-                    renderMonthDividers();
-                    setupEventListeners();
-                    positionTodayLine();
-                    populateFilters();
-                }}
-
-                // *** FUNÇÃO CORRIGIDA: renderSidebar para ordenação ***
-                function renderSidebar() {{
-                    const sidebarContent = document.getElementById('gantt-sidebar-content-{project["id"]}');
-                    let tasks = projectData[0].tasks;
-
-                    if (!tasks || tasks.length === 0) {{
-                        sidebarContent.innerHTML = '<div style="padding: 20px; text-align: center; color: #666;">Nenhum empreendimento disponível</div>';
-                        return;
-                    }}
-
-                // *** ORDENAÇÃO RESTAURADA: do mais antigo para o mais novo ***
-                const dateSortFallback = new Date(8640000000000000);
-
-                if (tipoVisualizacao === 'Real') {{
-                    tasks.sort((a, b) => {{
-                        const dateA = a.start_real ? parseDate(a.start_real) : dateSortFallback;
-                        const dateB = b.start_real ? parseDate(b.start_real) : dateSortFallback;
-                        if (dateA > dateB) return 1;
-                        if (dateA < dateB) return -1;
-                        return a.name.localeCompare(b.name);
-                    }});
-                }} else {{
-                    tasks.sort((a, b) => {{
-                        const dateA = a.start_previsto ? parseDate(a.start_previsto) : dateSortFallback;
-                        const dateB = b.start_previsto ? parseDate(b.start_previsto) : dateSortFallback;
-                        if (dateA > dateB) return 1;
-                        if (dateA < dateB) return -1;
-                        return a.name.localeCompare(b.name);
-                    }});
-                }}
-                    let html = '';
-                    let globalRowIndex = 0;
-
-                    html += '<div class="sidebar-rows-container">';
-                    tasks.forEach(task => {{
-                        globalRowIndex++;
-                        const rowClass = globalRowIndex % 2 !== 0 ? 'odd-row' : '';
-                        task.numero_etapa = globalRowIndex;
-
-                        html += '<div class="sidebar-row ' + rowClass + '">' +
-                            '<div class="sidebar-cell task-name-cell" title="' + task.numero_etapa + '. ' + task.name + '">' + task.numero_etapa + '. ' + task.name + '</div>' +
-                            '<div class="sidebar-cell">' + task.inicio_previsto + '</div>' +
-                            '<div class="sidebar-cell">' + task.termino_previsto + '</div>' +
-                            '<div class="sidebar-cell">' + task.duracao_prev_meses + '</div>' +
-                            '<div class="sidebar-cell">' + task.inicio_real + '</div>' +
-                            '<div class="sidebar-cell">' + task.termino_real + '</div>' +
-                            '<div class="sidebar-cell">' + task.duracao_real_meses + '</div>' +
-                            '<div class="sidebar-cell ' + task.status_color_class + '">' + task.progress + '%</div>' +
-                            '<div class="sidebar-cell ' + task.status_color_class + '">' + task.vt_text + '</div>' +
-                            '<div class="sidebar-cell ' + task.status_color_class + '">' + task.vd_text + '</div>' +
-                            '</div>';
-                    }});
-                    html += '</div>';
-                    sidebarContent.innerHTML = html;
-                }}
-
-                // *** FUNÇÃO CORRIGIDA: renderHeader ***
-                function renderHeader() {{
-                    const yearHeader = document.getElementById('year-header-{project["id"]}');
-                    const monthHeader = document.getElementById('month-header-{project["id"]}');
-                    let yearHtml = '', monthHtml = '';
-                    const yearsData = [];
-                    let currentDate = parseDate(dataMinStr);
-                    const dataMax = parseDate(dataMaxStr);
-
-                    if (!currentDate || !dataMax || isNaN(currentDate.getTime()) || isNaN(dataMax.getTime())) {{
-                         yearHeader.innerHTML = "Datas inválidas";
-                         monthHeader.innerHTML = "";
-                         return;
-                    }}
-
-                    // DECLARE estas variáveis
-                    let currentYear = -1, monthsInCurrentYear = 0;
-
-                    let totalMonths = 0;
-                    while (currentDate <= dataMax && totalMonths < 240) {{
-                        const year = currentDate.getUTCFullYear();
-                        if (year !== currentYear) {{
-                            if (currentYear !== -1) yearsData.push({{ year: currentYear, count: monthsInCurrentYear }});
-                            currentYear = year; 
-                            monthsInCurrentYear = 0;
-                        }}
-                        const monthNumber = String(currentDate.getUTCMonth() + 1).padStart(2, '0');
-                        monthHtml += '<div class="month-cell">' + monthNumber + '</div>';
-                        monthsInCurrentYear++;
-                        currentDate.setUTCMonth(currentDate.getUTCMonth() + 1);
-                        totalMonths++;
-                    }}
-                    if (currentYear !== -1) yearsData.push({{ year: currentYear, count: monthsInCurrentYear }});
-                    yearsData.forEach(data => {{ 
-                        const yearWidth = data.count * PIXELS_PER_MONTH; 
-                        yearHtml += '<div class="year-section" style="width:' + yearWidth + 'px">' + data.year + '</div>'; 
-                    }});
-
-                    const chartContainer = document.getElementById('chart-container-{project["id"]}');
-                    if (chartContainer) {{
-                        chartContainer.style.minWidth = totalMonths * PIXELS_PER_MONTH + 'px';
-                    }}
-
-                    yearHeader.innerHTML = yearHtml;
-                    monthHeader.innerHTML = monthHtml;
-                }}
-
-                function renderChart() {{
-                    const chartBody = document.getElementById('chart-body-{project["id"]}');
-                    const tasks = projectData[0].tasks;
-                    
-                    if (!tasks || tasks.length === 0) {{
-                        chartBody.innerHTML = '<div style="padding: 20px; text-align: center; color: #666;">Nenhum empreendimento disponível</div>';
-                        return;
-                    }}
-                    
-                    chartBody.innerHTML = '';
-
-                    tasks.forEach(task => {{
-                        const row = document.createElement('div'); 
-                        row.className = 'gantt-row';
-                        let barPrevisto = null;
-                        if (tipoVisualizacao === 'Ambos' || tipoVisualizacao === 'Previsto') {{ 
-                            barPrevisto = createBar(task, 'previsto'); 
-                            row.appendChild(barPrevisto); 
-                        }}
-                        let barReal = null;
-                        if ((tipoVisualizacao === 'Ambos' || tipoVisualizacao === 'Real') && task.start_real && (task.end_real_original_raw || task.end_real)) {{ 
-                            barReal = createBar(task, 'real'); 
-                            row.appendChild(barReal); 
-                        }}
-                        if (barPrevisto && barReal) {{
-                            const s_prev = parseDate(task.start_previsto), e_prev = parseDate(task.end_previsto), s_real = parseDate(task.start_real), e_real = parseDate(task.end_real_original_raw || task.end_real);
-                            if (s_prev && e_prev && s_real && e_real && s_real <= s_prev && e_real >= e_prev) {{ 
-                                barPrevisto.style.zIndex = '8'; 
-                                barReal.style.zIndex = '7'; 
-                            }}
-                            renderOverlapBar(task, row);
-                        }}
-                        chartBody.appendChild(row);
-                    }});
-                }}
-
-                function createBar(task, tipo) {{
-                    const startDate = parseDate(tipo === 'previsto' ? task.start_previsto : task.start_real);
-                    const endDate = parseDate(tipo === 'previsto' ? task.end_previsto : (task.end_real_original_raw || task.end_real));
-                    if (!startDate || !endDate) return document.createElement('div');
-                    const left = getPosition(startDate);
-                    const width = getPosition(endDate) - left + (PIXELS_PER_MONTH / 30);
-                    const bar = document.createElement('div'); 
-                    bar.className = 'gantt-bar ' + tipo;
-                    const coresSetor = coresPorSetor[task.setor] || coresPorSetor['Não especificado'] || {{previsto: '#cccccc', real: '#888888'}};
-                    bar.style.backgroundColor = tipo === 'previsto' ? coresSetor.previsto : coresSetor.real;
-                    bar.style.left = left + 'px'; 
-                    bar.style.width = width + 'px';
-                    const barLabel = document.createElement('span'); 
-                    barLabel.className = 'bar-label'; 
-                    barLabel.textContent = task.name + ' (' + task.progress + '%)'; 
-                    bar.appendChild(barLabel);
-                    bar.addEventListener('mousemove', e => showTooltip(e, task, tipo));
-                    bar.addEventListener('mouseout', () => hideTooltip());
-                    return bar;
-                }}
-
-                function renderOverlapBar(task, row) {{
-                   if (!task.start_real || !(task.end_real_original_raw || task.end_real)) return;
-                    const s_prev = parseDate(task.start_previsto), e_prev = parseDate(task.end_previsto), s_real = parseDate(task.start_real), e_real = parseDate(task.end_real_original_raw || task.end_real);
-                    const overlap_start = new Date(Math.max(s_prev, s_real)), overlap_end = new Date(Math.min(e_prev, e_real));
-                    if (overlap_start < overlap_end) {{
-                        const left = getPosition(overlap_start), width = getPosition(overlap_end) - left + (PIXELS_PER_MONTH / 30);
-                        if (width > 0) {{ 
-                            const overlapBar = document.createElement('div'); 
-                            overlapBar.className = 'gantt-bar-overlap'; 
-                            overlapBar.style.left = left + 'px'; 
-                            overlapBar.style.width = width + 'px'; 
-                            row.appendChild(overlapBar); 
-                        }}
-                    }}
-                }}
-
-                function getPosition(date) {{
-                    if (!date) return 0;
-                    const chartStart = parseDate(dataMinStr);
-                    if (!chartStart || isNaN(chartStart.getTime())) return 0;
-                    const monthsOffset = (date.getUTCFullYear() - chartStart.getUTCFullYear()) * 12 + (date.getUTCMonth() - chartStart.getUTCMonth());
-                    const dayOfMonth = date.getUTCDate() - 1;
-                    const daysInMonth = new Date(date.getUTCFullYear(), date.getUTCMonth() + 1, 0).getUTCDate();
-                    const fractionOfMonth = daysInMonth > 0 ? dayOfMonth / daysInMonth : 0;
-                    return (monthsOffset + fractionOfMonth) * PIXELS_PER_MONTH;
-                }}
-
-                function positionTodayLine() {{
-                    const todayLine = document.getElementById('today-line-{project["id"]}');
-                    const today = new Date(), todayUTC = new Date(Date.UTC(today.getFullYear(), today.getMonth(), today.getDate()));
-                    const chartStart = parseDate(dataMinStr), chartEnd = parseDate(dataMaxStr);
-                    if (chartStart && chartEnd && !isNaN(chartStart.getTime()) && !isNaN(chartEnd.getTime()) && todayUTC >= chartStart && todayUTC <= chartEnd) {{ 
-                        const offset = getPosition(todayUTC); 
-                        todayLine.style.left = offset + 'px'; 
-                        todayLine.style.display = 'block'; 
-                    }} else {{ 
-                        todayLine.style.display = 'none'; 
-                    }}
-                }}
-
-                function showTooltip(e, task, tipo) {{
-                    const tooltip = document.getElementById('tooltip-{project["id"]}');
-                    let content = '<b>' + task.name + '</b><br>';
-                    if (tipo === 'previsto') {{ 
-                        content += 'Previsto: ' + task.inicio_previsto + ' - ' + task.termino_previsto + '<br>Duração: ' + task.duracao_prev_meses + 'M'; 
-                    }} else {{ 
-                        content += 'Real: ' + task.inicio_real + ' - ' + task.termino_real + '<br>Duração: ' + task.duracao_real_meses + 'M<br>Variação Término: ' + task.vt_text + '<br>Variação Duração: ' + task.vd_text; 
-                    }}
-                    content += '<br><b>Progresso: ' + task.progress + '%</b><br>Setor: ' + task.setor + '<br>Grupo: ' + task.grupo;
-                    tooltip.innerHTML = content;
-                    tooltip.classList.add('show');
-                    const tooltipWidth = tooltip.offsetWidth, tooltipHeight = tooltip.offsetHeight;
-                    const viewportWidth = window.innerWidth, viewportHeight = window.innerHeight;
-                    const mouseX = e.clientX, mouseY = e.clientY;
-                    const padding = 15;
-                    let left, top;
-                    if ((mouseX + padding + tooltipWidth) > viewportWidth) {{ 
-                        left = mouseX - padding - tooltipWidth; 
-                    }} else {{ 
-                        left = mouseX + padding; 
-                    }}
-                    if ((mouseY + padding + tooltipHeight) > viewportHeight) {{ 
-                        top = mouseY - padding - tooltipHeight; 
-                    }} else {{ 
-                        top = mouseY + padding; 
-                    }}
-                    if (left < padding) left = padding;
-                    if (top < padding) top = padding;
-                    tooltip.style.left = left + 'px';
-                    tooltip.style.top = top + 'px';
-                }}
-
-                function hideTooltip() {{ 
-                    document.getElementById('tooltip-{project["id"]}').classList.remove('show'); 
-                }}
-
-                function renderMonthDividers() {{
-                    const chartContainer = document.getElementById('chart-container-{project["id"]}');
-                    chartContainer.querySelectorAll('.month-divider, .month-divider-label').forEach(el => el.remove());
-                    let currentDate = parseDate(dataMinStr);
-                    const dataMax = parseDate(dataMaxStr);
-                     if (!currentDate || !dataMax || isNaN(currentDate.getTime()) || isNaN(dataMax.getTime())) return;
-                    let totalMonths = 0;
-                    while (currentDate <= dataMax && totalMonths < 240) {{
-                        const left = getPosition(currentDate);
-                        const divider = document.createElement('div'); 
-                        divider.className = 'month-divider';
-                        if (currentDate.getUTCMonth() === 0) divider.classList.add('first');
-                        divider.style.left = left + 'px'; 
-                        chartContainer.appendChild(divider);
-                        currentDate.setUTCMonth(currentDate.getUTCMonth() + 1);
-                        totalMonths++;
-                    }}
-                }}
-
-                function setupEventListeners() {{
-                    const ganttChartContent = document.getElementById('gantt-chart-content-{project["id"]}'), sidebarContent = document.getElementById('gantt-sidebar-content-{project['id']}');
-                    const fullscreenBtn = document.getElementById('fullscreen-btn-{project["id"]}'), toggleBtn = document.getElementById('toggle-sidebar-btn-{project['id']}');
-                    const filterBtn = document.getElementById('filter-btn-{project["id"]}');
-                    const filterMenu = document.getElementById('filter-menu-{project['id']}');
-                    const container = document.getElementById('gantt-container-{project["id"]}');
-
-                    const applyBtn = document.getElementById('filter-apply-btn-{project["id"]}');
-                    if (applyBtn) applyBtn.addEventListener('click', () => applyFiltersAndRedraw());
-
-                    if (fullscreenBtn) fullscreenBtn.addEventListener('click', () => toggleFullscreen());
-
-                    const toolbarToggleBtn = document.getElementById('toolbar-toggle-btn-{project["id"]}');
-                    if (toolbarToggleBtn) {{
-                        toolbarToggleBtn.addEventListener('click', (e) => {{
-                            e.stopPropagation();
-                            const toolbar = document.getElementById('gantt-toolbar-{project["id"]}');
-                            if (toolbar) toolbar.classList.toggle('collapsed');
-                            
-                            // Se a toolbar estiver colapsada, fecha o menu de filtro se estiver aberto
-                            if (toolbar && toolbar.classList.contains('collapsed')) {{
-                                if (filterMenu) filterMenu.classList.remove('is-open');
-                            }}
-                        }});
-                    }}
-
-                    // Adiciona listener para o botão de filtro
-                    if (filterBtn) {{
-                        filterBtn.addEventListener('click', () => {{
-                            filterMenu.classList.toggle('is-open');
-                        }});
-                    }}
-
-                    // Fecha o menu de filtro ao clicar fora
-                    document.addEventListener('click', (event) => {{ 
-                        if (filterMenu && filterBtn && !filterMenu.contains(event.target) && !filterBtn.contains(event.target)) {{
-                            filterMenu.classList.remove('is-open');
-                        }}
-                    }});
-
-                    if (container) container.addEventListener('fullscreenchange', () => handleFullscreenChange());
-
-                    if (toggleBtn) toggleBtn.addEventListener('click', () => toggleSidebar());
-                    if (ganttChartContent && sidebarContent) {{
-                        let isSyncing = false;
-                        ganttChartContent.addEventListener('scroll', () => {{ if (!isSyncing) {{ isSyncing = true; sidebarContent.scrollTop = ganttChartContent.scrollTop; isSyncing = false; }} }});
-                        sidebarContent.addEventListener('scroll', () => {{ if (!isSyncing) {{ isSyncing = true; ganttChartContent.scrollTop = sidebarContent.scrollTop; isSyncing = false; }} }});
-                        let isDown = false, startX, scrollLeft;
-                        ganttChartContent.addEventListener('mousedown', (e) => {{ isDown = true; ganttChartContent.classList.add('active'); startX = e.pageX - ganttChartContent.offsetLeft; scrollLeft = ganttChartContent.scrollLeft; }});
-                        ganttChartContent.addEventListener('mouseleave', () => {{ isDown = false; ganttChartContent.classList.remove('active'); }});
-                        ganttChartContent.addEventListener('mouseup', () => {{ isDown = false; ganttChartContent.classList.remove('active'); }});
-                        ganttChartContent.addEventListener('mousemove', (e) => {{ if (!isDown) return; e.preventDefault(); const x = e.pageX - ganttChartContent.offsetLeft; const walk = (x - startX) * 2; ganttChartContent.scrollLeft = scrollLeft - walk; }});
-                    }}
-                }}
-
-                function toggleSidebar() {{ 
-                    document.getElementById('gantt-sidebar-wrapper-{project["id"]}').classList.toggle('collapsed'); 
-                }}
-
-                function toggleFullscreen() {{
-                    const container = document.getElementById('gantt-container-{project["id"]}');
-                    if (!document.fullscreenElement) {{
-                        container.requestFullscreen().catch(err => alert('Erro: ' + err.message));
-                    }} else {{
-                        document.exitFullscreen();
-                    }}
-                }}
-
-                function handleFullscreenChange() {{
-                        const btn = document.getElementById('fullscreen-btn-{project["id"]}');
-                        const container = document.getElementById('gantt-container-{project["id"]}');
-                        if (document.fullscreenElement === container) {{
-                            btn.innerHTML = '<span><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M9 9l6 6m0-6l-6 6M3 20.29V5a2 2 0 012-2h14a2 2 0 012 2v10a2 2 0 01-2 2H5a2 2 0 01-2-2v-.29"></path></svg></span>';
-                            btn.classList.add('is-fullscreen');
-                        }} else {{
-                            btn.innerHTML = '<span><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M8 3H5a2 2 0 0 0-2 2v3m18 0V5a2 2 0 0 0-2-2h-3m0 18h3a2 2 0 0 0 2-2v-3M3 16v3a2 2 0 0 0 2 2h3"></path></svg></span>';
-                            btn.classList.remove('is-fullscreen');
-                            document.getElementById('filter-menu-{project["id"]}').classList.remove('is-open');
-                        }}
-                    }}
-
-                // *** FUNÇÃO populateFilters MODIFICADA ***
-                function populateFilters() {{
-                    if (filtersPopulated) return;
-
-                    // *** 1. NOVO FILTRO DE ETAPA (Single Select) ***
-                    selEtapaConsolidada = document.getElementById('filter-etapa-consolidada-{project["id"]}');
-                    filterOptions.etapas_consolidadas.forEach(etapaNome => {{
-                        const isSelected = (etapaNome === initialStageName) ? 'selected' : '';
-                        selEtapaConsolidada.innerHTML += `<option value="${{etapaNome}}" ${{isSelected}}>${{etapaNome}}</option>`;
-                    }});
-
-                    const vsConfig = {{
-                        multiple: true,
-                        search: true,
-                        optionsCount: 6,
-                        showResetButton: true,
-                        resetButtonText: 'Limpar',
-                        selectAllText: 'Selecionar Todos',
-                        allOptionsSelectedText: 'Todos',
-                        optionsSelectedText: 'selecionados',
-                        searchPlaceholderText: 'Buscar...',
-                        optionHeight: '30px',
-                        popupDropboxBreakpoint: '3000px',
-                        noOptionsText: 'Nenhuma opção encontrada',
-                        noSearchResultsText: 'Nenhum resultado encontrado',
-                    }};
-
-                    // *** 2. FILTRO DE SETOR (REMOVIDO) ***
-                    // if (filterOptions.setores) {{
-                    //     const setorOptions = filterOptions.setores.map(s => ({{ label: s, value: s }}));
-                    //     vsSetor = VirtualSelect.init({{ ... }});
-                    // }}
-
-                    // *** 3. FILTRO DE GRUPO (REMOVIDO) ***
-                    // if (filterOptions.grupos) {{
-                    //     const grupoOptions = filterOptions.grupos.map(g => ({{ label: g, value: g }}));
-                    //     vsGrupo = VirtualSelect.init({{ ... }});
-                    // }}
-
-                    // *** 4. FILTRO DE EMPREENDIMENTO (Renomeado) ***
-                    const empreendimentoOptions = filterOptions.empreendimentos.map(e => ({{ label: e, value: e }}));
-                    vsEmpreendimento = VirtualSelect.init({{ // Renomeado de vsEtapa
-                        ...vsConfig,
-                        ele: '#filter-empreendimento-{project["id"]}', // ID Modificado
-                        options: empreendimentoOptions,
-                        placeholder: "Selecionar Empreendimento(s)",
-                        selectedValue: ["Todos"]
-                    }});
-
-                    // *** 5. RESTO DOS FILTROS (Idêntico) ***
-                    const visRadio = document.querySelector('input[name="filter-vis-{project['id']}"][value="' + tipoVisualizacao + '"]');
-                    if(visRadio) visRadio.checked = true;
-
-                    filtersPopulated = true;
-                }}
-
-                // *** FUNÇÃO updateProjectTitle (Nova/Modificada) ***
-                function updateProjectTitle(newStageName) {{
-                    const projectTitle = document.querySelector('#gantt-sidebar-wrapper-{project["id"]} .project-title-row span');
-                    if (projectTitle) {{
-                        projectTitle.textContent = `Comparativo: ${{newStageName}}`;
-                        // Atualiza também o 'projectData' global se necessário, embora o 'name' não seja mais usado
-                        projectData[0].name = `Comparativo: ${{newStageName}}`;
-                    }}
-                }}
-
-                // *** FUNÇÃO applyFiltersAndRedraw MODIFICADA ***
-                function applyFiltersAndRedraw() {{
-                    try {{
-                        // *** 1. LER A ETAPA PRIMEIRO ***
-                        const selEtapaNome = selEtapaConsolidada.value;
-                        
-                        // *** 2. LER OUTROS FILTROS ***
-                        const selEmpreendimentoArray = vsEmpreendimento ? vsEmpreendimento.getValue() || [] : [];
-                        
-                        const selConcluidas = document.getElementById('filter-concluidas-{project["id"]}').checked;
-                        const selVis = document.querySelector('input[name="filter-vis-{project['id']}"]:checked').value;
-                        // selPulmao e selPulmaoMeses removidos - pulmão desativado
-
-                        // *** FECHAR MENU DE FILTROS ***
-                        document.getElementById('filter-menu-{project["id"]}').classList.remove('is-open');
-
-                        // *** 3. ATUALIZAR DADOS BASE SE A ETAPA MUDOU ***
-                        if (selEtapaNome !== currentStageName) {{
-                            currentStageName = selEtapaNome;
-                            // Pegar os dados "crus" para a nova etapa
-                            allTasks_baseData = JSON.parse(JSON.stringify(allDataByStage[currentStageName] || []));
-                            console.log(`Mudando para etapa: ${{currentStageName}}. Tasks carregadas: ${{allTasks_baseData.length}}`);
-                        }}
-
-                        // Começar com os dados da etapa (já atualizados ou não)
-                        let baseTasks = JSON.parse(JSON.stringify(allTasks_baseData));
-
-                        // *** 4. PULMÃO DESATIVADO - NÃO APLICA LÓGICA DE PULMÃO ***
-
-                        // *** 5. APLICAR FILTROS SECUNDÁRIOS ***
-                        let filteredTasks = baseTasks;
-
-                        // Lógica de filtro de empreendimento
-                        if (selEmpreendimentoArray.length > 0 && !selEmpreendimentoArray.includes('Todos')) {{
-                            filteredTasks = filteredTasks.filter(t => selEmpreendimentoArray.includes(t.name));
-                        }}
-
-                        if (selConcluidas) {{
-                            filteredTasks = filteredTasks.filter(t => t.progress < 100);
-                        }}
-
-                        console.log('Empreendimentos após filtros:', filteredTasks.length);
-
-                        // *** 6. ATUALIZAR DADOS E REDESENHAR ***
-                        projectData[0].tasks = filteredTasks; // Atualiza as tarefas ativas
-                        tipoVisualizacao = selVis;
-                        // pulmaoStatus removido
-
-                        // *** 7. ATUALIZAR TÍTULO DO PROJETO ***
-                        updateProjectTitle(currentStageName);
-
-                        // Redesenhar
-                        renderSidebar();
-                        renderChart();
-
-                    }} catch (error) {{
-                        console.error('Erro ao aplicar filtros no consolidado:', error);
-                        alert('Erro ao aplicar filtros: ' + error.message);
-                    }}
-                }}
-
-                // DEBUG: Verificar dados antes de inicializar
-                console.log('Dados do projeto consolidado (inicial):', projectData);
-                console.log('Tasks base consolidado (inicial):', allTasks_baseData);
-                console.log('TODOS os dados de etapa (full):', allDataByStage);
-                
-                // Inicializar o Gantt Consolidado
-                initGantt();
-                // ==== MENU RADIAL CONSOLIDADO ====
-                (function() {{
-                    const container = document.getElementById('gantt-container-{project["id"]}');
-                    if (!container) return;
-                    
-                    const menu = document.getElementById('radial-menu');
-                    const notepad = document.getElementById('floating-notepad');
-                    
-                    if (!menu || !notepad) {{
-                        console.warn('Menu radial ou notepad não encontrado');
-                        return;
-                    }}
-                    
-                    // --- 1. ABRIR MENU COM RIGHT-CLICK ---
-                    container.addEventListener('contextmenu', (e) => {{
-                        e.preventDefault();
-                        e.stopPropagation();
-                        
-                        const menuWidth = 170;
-                        const menuHeight = 170;
-                        const viewportWidth = window.innerWidth;
-                        const viewportHeight = window.innerHeight;
-                        
-                        let left = e.clientX - (menuWidth / 2);
-                        let top = e.clientY - (menuHeight / 2);
-                        
-                        if (left + menuWidth > viewportWidth) left = viewportWidth - menuWidth - 10;
-                        if (left < 0) left = 10;
-                        if (top + menuHeight > viewportHeight) top = viewportHeight - menuHeight - 10;
-                        if (top < 0) top = 10;
-                        
-                        menu.style.left = left + 'px';
-                        menu.style.top = top + 'px';
-                        menu.style.display = 'block';
-                        
-                        console.log('📍 Menu radial aberto (consolidado)');
-                    }});
-                    
-                    // --- 2. FECHAR MENU AO CLICAR FORA ---
-                    document.addEventListener('click', (e) => {{
-                        if (!menu.contains(e.target) && menu.style.display === 'block') {{
-                            menu.style.display = 'none';
-                        }}
-                    }});
-                    
-                    // --- 2.1. FECHAR MENU AO CLICAR NOS CÍRCULOS INTERNOS ---
-                    const radialCenter = menu.querySelector('.radial-center');
-                    const radialBgCircle = menu.querySelector('.radial-background-circle');
-                    
-                    if (radialCenter) {{
-                        radialCenter.addEventListener('click', (e) => {{
-                            e.stopPropagation();
-                            menu.style.display = 'none';
-                            console.log('❌ Menu fechado (clique no centro)');
-                        }});
-                    }}
-                    
-                    if (radialBgCircle) {{
-                        radialBgCircle.addEventListener('click', (e) => {{
-                            e.stopPropagation();
-                            menu.style.display = 'none';
-                            console.log('❌ Menu fechado (clique no círculo de fundo)');
-                        }});
-                    }}
-                    
-                    // --- 3. FLOATING NOTEPAD ---
-                    let notepadActive = false;
-                    const notepadBtn = document.getElementById('btn-notepad');
-                    const notepadTextarea = notepad.querySelector('.notepad-content');
-                    const notepadClose = notepad.querySelector('.notepad-close');
-                    const NOTEPAD_STORAGE_KEY = 'gantt_notepad_consolidado';
-                    
-                    const savedContent = localStorage.getItem(NOTEPAD_STORAGE_KEY);
-                    if (savedContent && notepadTextarea) {{
-                        notepadTextarea.value = savedContent;
-                    }}
-                    
-                    if (notepadTextarea) {{
-                        notepadTextarea.addEventListener('input', () => {{
-                            localStorage.setItem(NOTEPAD_STORAGE_KEY, notepadTextarea.value);
-                        }});
-                    }}
-                    
-                    if (notepadBtn) {{
-                        notepadBtn.addEventListener('click', (e) => {{
-                            e.stopPropagation();
-                            notepadActive = !notepadActive;
-                            notepad.style.display = notepadActive ? 'flex' : 'none';
-                            
-                            if (notepadActive) {{
-                                notepadBtn.style.borderColor = '#007AFF';
-                                notepadBtn.style.background = '#e6f2ff';
-                            }} else {{
-                                notepadBtn.style.borderColor = '';
-                                notepadBtn.style.background = '';
-                            }}
-                            
-                            menu.style.display = 'none';
-                            console.log('📝 Notepad toggled:', notepadActive);
-                        }});
-                    }}
-                    
-                    if (notepadClose) {{
-                        notepadClose.addEventListener('click', () => {{
-                            notepadActive = false;
-                            notepad.style.display = 'none';
-                            if (notepadBtn) {{
-                                notepadBtn.style.borderColor = '';
-                                notepadBtn.style.background = '';
-                            }}
-                        }});
-                    }}
-                    
-                    // Drag-and-drop do notepad
-                    let isDragging = false, offsetX, offsetY;
-                    const notepadHeader = notepad.querySelector('.notepad-header');
-                    
-                    if (notepadHeader) {{
-                        notepadHeader.addEventListener('mousedown', (e) => {{
-                            if (e.target.closest('.notepad-close')) return;
-                            isDragging = true;
-                            offsetX = e.clientX - notepad.offsetLeft;
-                            offsetY = e.clientY - notepad.offsetTop;
-                            notepadHeader.style.cursor = 'grabbing';
-                        }});
-                    }}
-                    
-                    document.addEventListener('mousemove', (e) => {{
-                        if (isDragging) {{
-                            notepad.style.left = (e.clientX - offsetX) + 'px';
-                            notepad.style.top = (e.clientY - offsetY) + 'px';
-                            notepad.style.right = 'auto';
-                        }}
-                    }});
-                    
-                    document.addEventListener('mouseup', () => {{
-                        if (isDragging) {{
-                            isDragging = false;
-                            if (notepadHeader) notepadHeader.style.cursor = 'move';
-                        }}
-                    }});
-                    
-                    // --- 4. MODO FOCO ---
-                    let focusModeActive = false;
-                    const focusBtn = document.getElementById('btn-focus-mode');
-                    
-                    if (focusBtn) {{
-                        focusBtn.addEventListener('click', (e) => {{
-                            e.stopPropagation();
-                            focusModeActive = !focusModeActive;
-                            
-                            const allBars = container.querySelectorAll('.gantt-bar');
-                            
-                            if (focusModeActive) {{
-                                allBars.forEach(bar => bar.classList.add('focus-mode'));
-                                focusBtn.style.borderColor = '#007AFF';
-                                focusBtn.style.background = '#e6f2ff';
-                                console.log('🎯 Modo foco ATIVADO');
-                            }} else {{
-                                allBars.forEach(bar => {{
-                                    bar.classList.remove('focus-mode', 'focused');
-                                }});
-                                focusBtn.style.borderColor = '';
-                                focusBtn.style.background = '';
-                                console.log('🎯 Modo foco DESATIVADO');
-                            }}
-                            
-                            menu.style.display = 'none';
-                        }});
-                    }}
-                    
-                    // --- 5. CLICK EM BARRAS PARA FOCAR/DESFOCAR ---
-                    container.addEventListener('click', (e) => {{
-                        if (!focusModeActive) return;
-                        
-                        const clickedBar = e.target.closest('.gantt-bar');
-                        if (!clickedBar) return;
-                        
-                        if (clickedBar.classList.contains('focused')) {{
-                            clickedBar.classList.remove('focused');
-                            console.log('⚫ Barra desfocada');
-                        }} else {{
-                            clickedBar.classList.add('focused');
-                            console.log('⚪ Barra focada');
-                        }}
-                    }});
-                    
-                    console.log('✅ Menu radial de contexto inicializado (consolidado)');
-                }})();
-            </script>
-        </body>
-        </html>
-    """
+    gantt_html = renderizar_template_gantt(
+        "gantt_consolidado.html",
+        PROJECT_ID=project['id'],
+        PROJECT_NAME=project['name'],
+        CHART_MIN_WIDTH=total_meses_proj * 30,
+        CORES_POR_SETOR_JSON=json.dumps(StyleConfig.CORES_POR_SETOR),
+        PROJECT_JSON=json.dumps(project),
+        ALL_DATA_BY_STAGE_JSON=json.dumps(all_data_by_stage_js),
+        TASKS_JSON=json.dumps(tasks_base_data_inicial),
+        ETAPA_INICIAL_JSON=json.dumps(etapa_selecionada_inicialmente),
+        FILTER_OPTIONS_JSON=json.dumps(filter_options),
+        DATA_MIN=data_min_proj.strftime('%Y-%m-%d'),
+        DATA_MAX=data_max_proj.strftime('%Y-%m-%d'),
+        TIPO_VISUALIZACAO=tipo_visualizacao,
+    )
     components.html(gantt_html, height=altura_gantt, scrolling=True)
     # st.markdown("---") no consolidado, pois ele não é parte de um loop
 
@@ -4191,15 +1317,66 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
+# Tempo máximo de espera por fonte de dados, em segundos, contado a partir do início da carga
+TIMEOUT_FONTES = {"reais": 180, "previstos": 90}
+
+def carregar_fontes_em_paralelo(carregadores):
+    """
+    Executa os carregadores ({nome: função sem argumentos}) ao mesmo tempo em threads.
+
+    Retorna (resultados, erros): uma fonte que falha ou estoura o tempo limite fica sem
+    resultado e tem sua mensagem em `erros`, sem afetar as demais. As chamadas ao Streamlit
+    (st.error etc.) ficam a cargo de quem chama, na thread principal.
+    """
+    carregadores = {nome: funcao for nome, funcao in carregadores.items() if funcao}
+    if not carregadores:
+        return {}, {}
+
+    executor = ThreadPoolExecutor(max_workers=len(carregadores), thread_name_prefix="carga_dados")
+    inicio = time.monotonic()
+    futuros = {nome: executor.submit(funcao) for nome, funcao in carregadores.items()}
+
+    resultados, erros = {}, {}
+    for nome, futuro in futuros.items():
+        limite = TIMEOUT_FONTES.get(nome, 120)
+        try:
+            resultados[nome] = futuro.result(timeout=max(0, limite - (time.monotonic() - inicio)))
+        except FuturesTimeoutError:
+            erros[nome] = f"tempo limite de {limite}s excedido"
+        except Exception as e:
+            erros[nome] = str(e)
+
+    # Não espera threads que estouraram o tempo: elas terminam em segundo plano. A fonte conta como
+    # ausente (a recarga é descartada, ver carregar_conjunto_dados) e processa_neo_smartsheet.main
+    # ignora uma nova sincronização enquanto a anterior não terminar
+    executor.shutdown(wait=False)
+    return resultados, erros
+
+def carregar_dados_base():
+    """
+    Monta o dataset completo (Smartsheet + Excel) e retorna (df, avisos, fontes_ausentes).
+
+    Roda também na thread de atualização em segundo plano, então não chama st.*:
+    as mensagens vão para `avisos` como (nível, texto) e são exibidas por load_data().
+    `fontes_ausentes` lista as fontes ("reais", "previstos") que falharam, estouraram o tempo
+    ou vieram vazias; se não estiver vazia, o df é parcial ou de exemplo.
+    """
+    avisos = []
     df_real = pd.DataFrame()
     df_previsto = pd.DataFrame()
 
+    # Smartsheet (rede) e Excel (disco/CPU) são carregados ao mesmo tempo
+    resultados_fontes, erros_fontes = carregar_fontes_em_paralelo({
+        "reais": processar_smartsheet_main,
+        "previstos": tratar_e_retornar_dados_previstos,
+    })
+    for nome_fonte, erro in erros_fontes.items():
+        avisos.append(("error", f"❌ Erro ao carregar dados {nome_fonte}: {erro}"))
+
     try:
         # CORREÇÃO: Carregar dados REAIS do Smartsheet
         if processar_smartsheet_main:
-            df_real_resultado = processar_smartsheet_main()
+            df_real_resultado = resultados_fontes.get("reais")
             
             if df_real_resultado is not None and not df_real_resultado.empty:
                 df_real = df_real_resultado.copy()
@@ -4222,89 +1399,58 @@ def load_data():
                 
                 # CORREÇÃO: Garantir que temos a coluna Etapa
                 if "Etapa" not in df_real.columns and "FASE" in df_real.columns:
-                    df_real["Etapa"] = df_real["FASE"].apply(padronizar_etapa)
+                    df_real["Etapa"], etapas_nao_mapeadas = padronizar_coluna_etapas(df_real["FASE"])
+                    if etapas_nao_mapeadas:
+                        # Um único resumo por carga em vez de um aviso por linha
+                        logging.warning(f"Etapas não mapeadas ({len(etapas_nao_mapeadas)}): {etapas_nao_mapeadas}")
+                        avisos.append(("warning", f"⚠️ {len(etapas_nao_mapeadas)} etapa(s) não mapeada(s) no Smartsheet: {', '.join(etapas_nao_mapeadas)}"))
                 
                 # Garantir UGB
                 if "UGB" not in df_real.columns:
                     df_real["UGB"] = "Não especificado"
                 
-                # Converter datas
-                for col in ["Inicio_Real", "Termino_Real"]:
-                    if col in df_real.columns:
-                        df_real[col] = pd.to_datetime(df_real[col], errors='coerce')
+                # As datas são convertidas uma única vez em aplicar_esquema_tipado
                 
-                # Converter porcentagem
+                # Converter porcentagem (única normalização: daqui em diante a coluna é float na escala 0-100)
                 if "% concluído" in df_real.columns:
-                    df_real["% concluído"] = df_real["% concluído"].apply(converter_porcentagem)
+                    df_real["% concluído"] = normalizar_porcentagem(df_real["% concluído"])
                 else:
                     df_real["% concluído"] = 0.0
                 
-                # NOVO: Converter nomes dos empreendimentos para nomes completos
-                df_real["Empreendimento"] = df_real["Empreendimento"].apply(converter_nome_empreendimento)
+                # Converter nomes dos empreendimentos para nomes completos (uma vez por valor distinto),
+                # antes do merge para que as duas fontes usem a mesma chave
+                df_real["Empreendimento"] = converter_coluna_empreendimentos(df_real["Empreendimento"])
                 
     except Exception as e:
-        st.error(f"❌ Erro ao carregar dados reais: {e}")
+        avisos.append(("error", f"❌ Erro ao carregar dados reais: {e}"))
         df_real = pd.DataFrame()
 
     try:
         # CORREÇÃO: Carregar dados PREVISTOS do NEO
         if tratar_e_retornar_dados_previstos:
-            df_previsto_resultado = tratar_e_retornar_dados_previstos()
+            df_previsto_resultado = resultados_fontes.get("previstos")
             
             if df_previsto_resultado is not None and not df_previsto_resultado.empty:
                 df_previsto = df_previsto_resultado.copy()
                 
-                # CORREÇÃO: Renomear colunas dos dados PREVISTOS
-                colunas_renomear_prev = {}
-                
-                if "EMP" in df_previsto.columns:
-                    colunas_renomear_prev["EMP"] = "Empreendimento"
-                
-                if colunas_renomear_prev:
-                    df_previsto = df_previsto.rename(columns=colunas_renomear_prev)
-                
-                # CORREÇÃO: Criar pivot para dados previstos
-                if "Inicio_Fim" in df_previsto.columns and "Valor" in df_previsto.columns:
-                    try:
-                        df_previsto_pivot = df_previsto.pivot_table(
-                            index=["UGB", "Empreendimento", "Etapa"], 
-                            columns="Inicio_Fim", 
-                            values="Valor", 
-                            aggfunc="first"
-                        ).reset_index()
-                        
-                        df_previsto_pivot.columns.name = None
-                        
-                        # Renomear colunas após o pivot
-                        colunas_renomeadas = {}
-                        if "INÍCIO" in df_previsto_pivot.columns:
-                            colunas_renomeadas["INÍCIO"] = "Inicio_Prevista"
-                        if "TÉRMINO" in df_previsto_pivot.columns:
-                            colunas_renomeadas["TÉRMINO"] = "Termino_Prevista"
-                            
-                        df_previsto_pivot = df_previsto_pivot.rename(columns=colunas_renomeadas)
-                        df_previsto = df_previsto_pivot
-                        
-                    except Exception as pivot_error:
-                        st.error(f"❌ Erro ao criar pivot: {pivot_error}")
-                        # Manter df_previsto original se o pivot falhar
-                
-                # Garantir que as colunas de data são datetime
-                for col in ["Inicio_Prevista", "Termino_Prevista"]:
-                    if col in df_previsto.columns:
-                        df_previsto[col] = pd.to_datetime(df_previsto[col], errors='coerce')
+                # processa_neo já entrega o formato final, com as datas em datetime64:
+                # [UGB, Empreendimento, Etapa, Inicio_Prevista, Termino_Prevista]
                 
-                # NOVO: Converter nomes dos empreendimentos para nomes completos
-                df_previsto["Empreendimento"] = df_previsto["Empreendimento"].apply(converter_nome_empreendimento)
+                # Converter nomes dos empreendimentos para nomes completos (uma vez por valor distinto),
+                # antes do merge para que as duas fontes usem a mesma chave
+                df_previsto["Empreendimento"] = converter_coluna_empreendimentos(df_previsto["Empreendimento"])
                 
     except Exception as e:
-        st.error(f"❌ Erro ao carregar dados previstos: {e}")
+        avisos.append(("error", f"❌ Erro ao carregar dados previstos: {e}"))
         df_previsto = pd.DataFrame()
 
+    # Fontes sem dados (erro, tempo limite, retorno vazio ou módulo indisponível)
+    fontes_ausentes = [nome for nome, df_fonte in (("reais", df_real), ("previstos", df_previsto)) if df_fonte.empty]
+
     # Fallback para dados de exemplo
     if df_real.empty and df_previsto.empty:
-        st.warning("⚠️ Nenhuma fonte de dados carregada. Usando dados de exemplo.")
-        return criar_dados_exemplo()
+        avisos.append(("warning", "⚠️ Nenhuma fonte de dados carregada. Usando dados de exemplo."))
+        return criar_dados_exemplo(), avisos, fontes_ausentes
     
     # COLUNAS BASE para merge
     colunas_base = ["UGB", "Empreendimento", "Etapa"]
@@ -4342,7 +1488,7 @@ def load_data():
         df_merged = df_merged.drop('_merge', axis=1)
         
     elif not df_previsto.empty:
-        st.info("Usando apenas dados PREVISTOS")
+        avisos.append(("info", "Usando apenas dados PREVISTOS"))
         df_merged = df_previsto.copy()
         # Adicionar colunas reais vazias
         df_merged["Inicio_Real"] = pd.NaT
@@ -4350,14 +1496,14 @@ def load_data():
         df_merged["% concluído"] = 0.0
         
     elif not df_real.empty:
-        st.info("Usando apenas dados REAIS")
+        avisos.append(("info", "Usando apenas dados REAIS"))
         df_merged = df_real.copy()
         # Adicionar colunas previstas vazias
         df_merged["Inicio_Prevista"] = pd.NaT
         df_merged["Termino_Prevista"] = pd.NaT
     else:
-        st.error("❌ Nenhum dado disponível após processamento")
-        return criar_dados_exemplo()
+        avisos.append(("error", "❌ Nenhum dado disponível após processamento"))
+        return criar_dados_exemplo(), avisos, ["reais", "previstos"]
     
     # Garantir que todas as colunas necessárias existam
     colunas_necessarias = {
@@ -4396,12 +1542,119 @@ def load_data():
     linhas_finais = len(df_merged)
     
     if linhas_iniciais != linhas_finais:
-        st.warning(f"🗑️ Removidas {linhas_iniciais - linhas_finais} linhas inválidas")
-    
-    # NOVO: Garantir que todos os nomes de empreendimentos estão convertidos
-    df_merged["Empreendimento"] = df_merged["Empreendimento"].apply(converter_nome_empreendimento)
+        avisos.append(("warning", f"🗑️ Removidas {linhas_iniciais - linhas_finais} linhas inválidas"))
     
-    return df_merged
+    return df_merged, avisos, fontes_ausentes
+
+def categorias_ordenadas(valores_presentes, categorias_fixas=()):
+    # Categorias fixas primeiro (na ordem dada) e os demais valores presentes em ordem alfabética,
+    # para que ordenar pela categoria dê o mesmo resultado que ordenar pelo texto
+    fixas = list(categorias_fixas)
+    conhecidas = set(fixas)
+    extras = sorted({valor for valor in valores_presentes if pd.notna(valor) and valor not in conhecidas})
+    return fixas + extras
+
+def aplicar_esquema_tipado(df):
+    """
+    Converte o dataset para o esquema usado por todo o app:
+    - UGB, Empreendimento, GRUPO e SETOR como categorias (ordem alfabética);
+    - Etapa como categoria ORDENADA pela ORDEM_ETAPAS_GLOBAL (etapas não mapeadas no final),
+      de modo que ordenar por "Etapa" já segue a ordem das etapas;
+    - datas como datetime64[ns] e "% concluído" como float32 (já normalizado na escala 0-100).
+    """
+    df = df.copy()
+    for col in ["UGB", "Empreendimento"]:
+        df[col] = pd.Categorical(df[col], categories=categorias_ordenadas(df[col].unique()))
+    df["GRUPO"] = pd.Categorical(df["GRUPO"], categories=sorted(categorias_ordenadas(df["GRUPO"].unique(), GRUPOS)))
+    df["SETOR"] = pd.Categorical(df["SETOR"], categories=sorted(categorias_ordenadas(df["SETOR"].unique(), SETOR)))
+    df["Etapa"] = pd.Categorical(
+        df["Etapa"],
+        categories=categorias_ordenadas(df["Etapa"].unique(), ORDEM_ETAPAS_GLOBAL),
+        ordered=True
+    )
+    for col in COLUNAS_DATA:
+        df[col] = pd.to_datetime(df[col], errors='coerce').astype("datetime64[ns]")
+    df["% concluído"] = pd.to_numeric(df["% concluído"], errors='coerce').astype(np.float32)
+    return df
+
+def validar_esquema(df, contexto):
+    """
+    Confere se `df` segue o esquema de aplicar_esquema_tipado (para as colunas presentes)
+    e levanta TypeError listando as colunas fora do tipo esperado.
+    """
+    problemas = []
+    for col in COLUNAS_DATA:
+        if col in df.columns and not pd.api.types.is_datetime64_dtype(df[col]):
+            problemas.append(f"{col}: {df[col].dtype} (esperado datetime64)")
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            problemas.append(f"{col}: {df[col].dtype} (esperado category)")
+    if "Etapa" in df.columns and isinstance(df["Etapa"].dtype, pd.CategoricalDtype) and not df["Etapa"].cat.ordered:
+        problemas.append("Etapa: categoria sem ordem (esperado ordenada pela ORDEM_ETAPAS_GLOBAL)")
+    if "% concluído" in df.columns and not pd.api.types.is_float_dtype(df["% concluído"]):
+        problemas.append(f"% concluído: {df['% concluído'].dtype} (esperado float)")
+    if problemas:
+        raise TypeError(f"Esquema inválido em {contexto}: " + "; ".join(problemas))
+
+def conferir_esquema(df, contexto):
+    # Só valida no modo de depuração (NEO_VALIDAR_ESQUEMA), para não pesar nos reruns
+    if VALIDAR_ESQUEMA:
+        validar_esquema(df, contexto)
+
+def carregar_conjunto_dados():
+    """
+    Carrega o dataset, aplica o esquema tipado e monta o IndexedDataset compartilhado pelas
+    sessões, com os índices das colunas de filtro já calculados. Retorna (conjunto_dados, avisos).
+
+    Se alguma fonte ficou sem dados, levanta DegradedLoadError com o resultado parcial: o
+    BackgroundRefresher só o publica enquanto não houver uma carga completa; depois disso,
+    mantém os dados anteriores e tenta de novo em RETRY_SECONDS.
+    """
+    df, avisos, fontes_ausentes = carregar_dados_base()
+    # Os nomes de empreendimentos já saem convertidos de carregar_dados_base (os dados de exemplo
+    # usam nomes completos), então filtros e ordenações não precisam reconvertê-los
+    df = aplicar_esquema_tipado(df)
+    # Validação sempre feita na carga: daqui em diante o app conta com as colunas já tipadas
+    validar_esquema(df, "carga")
+    resultado = (IndexedDataset(df, COLUNAS_FILTRO), avisos)
+    if fontes_ausentes:
+        raise DegradedLoadError(resultado, f"fontes sem dados: {', '.join(fontes_ausentes)}")
+    return resultado
+
+
+@st.cache_resource(show_spinner=False)
+def obter_atualizador_dados():
+    """Atualizador único por processo: recarrega o dataset a cada TTL_SECONDS em segundo plano."""
+    return BackgroundRefresher(carregar_conjunto_dados, TTL_SECONDS, name="atualizacao-dados")
+
+def load_data():
+    """
+    Retorna o conjunto de dados mais recente (IndexedDataset) e a versão dele, sem esperar
+    recargas (só a primeira carga do processo é síncrona), e exibe os avisos gerados nessa carga.
+    A versão identifica o dataset nos caches derivados (ver obter_cache_derivados).
+    """
+    snapshot = obter_atualizador_dados().get()
+    conjunto_dados, avisos = snapshot.value
+    for nivel, mensagem in avisos:
+        getattr(st, nivel)(mensagem)
+    return conjunto_dados, snapshot.version
+
+@st.cache_resource(show_spinner=False)
+def obter_cache_derivados():
+    """
+    Resultados derivados do dataset (opções dos filtros, ordenação dos empreendimentos),
+    compartilhados entre sessões e indexados pela versão dos dados: quando uma recarga publica
+    uma versão nova, só as entradas da versão antiga são descartadas.
+    """
+    return VersionedCache(max_entries=256)
+
+def montar_filtros(ugb_filter, emp_filter, grupo_filter, setor_filter):
+    # Filtros da sidebar no formato de IndexedDataset ({coluna: valores}); listas viram tuplas
+    # para também servirem de chave de cache
+    return {
+        coluna: tuple(valores) if valores else ()
+        for coluna, valores in zip(COLUNAS_FILTRO, (ugb_filter, emp_filter, grupo_filter, setor_filter))
+    }
 
 
 def criar_dados_exemplo():
@@ -4420,41 +1673,38 @@ def criar_dados_exemplo():
     df_exemplo["SETOR"] = df_exemplo["Etapa"].map(SETOR_POR_ETAPA).fillna("PROSPECÇÃO")
     return df_exemplo
 
-@st.cache_data
-def get_unique_values(df, column):
-    if column == "Empreendimento":
-        # Para empreendimentos, garantir que estamos usando os nomes convertidos
-        df_temp = df.copy()
-        df_temp[column] = df_temp[column].apply(converter_nome_empreendimento)
-        return sorted(df_temp[column].dropna().unique().tolist())
-    else:
-        return sorted(df[column].dropna().unique().tolist())
+def get_unique_values(versao_dados, conjunto_dados, column, filtros=None):
+    """
+    Valores únicos (ordenados) de `column` no conjunto de dados da versão `versao_dados`,
+    opcionalmente restrito por `filtros` = (ugb, emp, grupo, setor) como em filter_dataframe.
+    O conjunto não entra na chave do cache: ele é sempre o dataset dessa versão.
+    """
+    filtros = montar_filtros(*filtros) if filtros else None
+    chave = ("get_unique_values", column, tuple(filtros.items()) if filtros else None)
 
-@st.cache_data
-def filter_dataframe(df, ugb_filter, emp_filter, grupo_filter, setor_filter):
+    def calcular():
+        if filtros is not None and not filtros["UGB"]:
+            return []
+        return conjunto_dados.unique(column, filtros)
+
+    return obter_cache_derivados().get_or_compute(versao_dados, chave, calcular)
+
+def filter_dataframe(conjunto_dados, ugb_filter, emp_filter, grupo_filter, setor_filter):
+    """
+    Recorte do conjunto de dados pelos filtros da sidebar, resolvido pelos índices pré-calculados.
+    Sem filtro efetivo, retorna o próprio DataFrame compartilhado entre as sessões (sem cópia):
+    trate o resultado como somente leitura e copie antes de alterá-lo.
+    """
     if not ugb_filter:
-        return df.iloc[0:0]
+        return conjunto_dados.frame.iloc[0:0]
 
-    # Aplicar conversão aos nomes dos empreendimentos
-    df_filtered = df.copy()
-    df_filtered["Empreendimento"] = df_filtered["Empreendimento"].apply(converter_nome_empreendimento)
-    df_filtered = df_filtered[df_filtered["UGB"].isin(ugb_filter)]
-    
-    # Aplicar filtros apenas se não estiverem vazios
-    if emp_filter and len(emp_filter) > 0:
-        df_filtered = df_filtered[df_filtered["Empreendimento"].isin(emp_filter)]
-    
-    if grupo_filter and len(grupo_filter) > 0:
-        df_filtered = df_filtered[df_filtered["GRUPO"].isin(grupo_filter)]
-    
-    if setor_filter and len(setor_filter) > 0:
-        df_filtered = df_filtered[df_filtered["SETOR"].isin(setor_filter)]
-        
-    return df_filtered
+    # Filtros vazios (EMP, GRUPO, SETOR) não restringem a coluna
+    return conjunto_dados.select(montar_filtros(ugb_filter, emp_filter, grupo_filter, setor_filter))
 
 # --- Bloco Principal ---
 with st.spinner("Carregando e processando dados..."):
-    df_data = load_data()
+    conjunto_dados, versao_dados = load_data()
+    df_data = conjunto_dados.frame
     if df_data is not None and not df_data.empty:
         with st.sidebar:
             st.markdown("<br>", unsafe_allow_html=True)
@@ -4462,9 +1712,9 @@ with st.spinner("Carregando e processando dados..."):
 
             # --- WIDGET DE ATUALIZAÇÃO (REPLICADO) ---
             with col1:
-                 # Inicializar timestamp se necessário
-                if 'data_loaded_at' not in st.session_state:
-                    st.session_state.data_loaded_at = datetime.now(pytz.timezone('America/Sao_Paulo'))
+                # Horário da carga em uso (a mesma para todas as sessões do processo)
+                atualizador_dados = obter_atualizador_dados()
+                data_loaded_at = atualizador_dados.get().loaded_at.astimezone(pytz.timezone('America/Sao_Paulo'))
                 
                 # CSS para fixar o botão no CABEÇALHO da sidebar (Visualmente fora do fluxo)
                 st.markdown("""
@@ -4503,8 +1753,13 @@ with st.spinner("Carregando e processando dados..."):
 
                 # Popover nativo
                 with st.popover("⚙", use_container_width=False):
-                    loaded_time = st.session_state.data_loaded_at.strftime("%d/%m %H:%M")
-                    next_refresh_time = (st.session_state.data_loaded_at + timedelta(hours=TTL_HOURS)).strftime("%H:%M")
+                    loaded_time = data_loaded_at.strftime("%d/%m %H:%M")
+                    next_refresh_time = (data_loaded_at + timedelta(seconds=TTL_SECONDS)).strftime("%H:%M")
+                    if atualizador_dados.refreshing:
+                        next_refresh_time = "em andamento"
+                    elif atualizador_dados.last_error is not None:
+                        # Recarga falhou ou veio incompleta: os dados exibidos são os anteriores (ou parciais)
+                        next_refresh_time = "nova tentativa em breve"
                     
                     st.markdown(f"""
                     <div style="min-width: 150px; padding: 0 5px;">
@@ -4522,10 +1777,9 @@ with st.spinner("Carregando e processando dados..."):
                     """, unsafe_allow_html=True)
                     
                     if st.button("↻ Atualizar", type="secondary", use_container_width=True, key="refresh_popover_top"):
-                        st.cache_data.clear()
-                        st.cache_resource.clear()
-                        st.session_state.data_loaded_at = datetime.now(pytz.timezone('America/Sao_Paulo'))
-                        st.rerun()
+                        # Recarrega em segundo plano; os dados atuais seguem em uso até a troca
+                        atualizador_dados.request_refresh()
+                        st.toast("Atualização iniciada. Os novos dados aparecem na próxima interação após a carga.")
 
             with col2:
                 try:
@@ -4569,7 +1823,7 @@ with st.spinner("Carregando e processando dados..."):
             </style>
             """, unsafe_allow_html=True)
             
-            ugb_options = get_unique_values(df_data, "UGB")
+            ugb_options = get_unique_values(versao_dados, conjunto_dados, "UGB")
             
             # Inicializar session_state para UGB se não existir
             if 'selected_ugb' not in st.session_state:
@@ -4597,18 +1851,17 @@ with st.spinner("Carregando e processando dados..."):
             """, unsafe_allow_html=True)
             
             # Definir valores padrão para os filtros removidos
-            selected_emp = get_unique_values(df_data[df_data["UGB"].isin(selected_ugb)], "Empreendimento") if selected_ugb else []
-            selected_grupo = get_unique_values(df_data, "GRUPO")
+            selected_emp = get_unique_values(versao_dados, conjunto_dados, "Empreendimento", filtros=(selected_ugb, None, None, None)) if selected_ugb else []
+            selected_grupo = get_unique_values(versao_dados, conjunto_dados, "GRUPO")
             selected_setor = list(SETOR.keys())
 
-            # Filtrar o DataFrame com base apenas na UGB para determinar as etapas disponíveis
-            df_temp_filtered = filter_dataframe(df_data, selected_ugb, selected_emp, selected_grupo, selected_setor)
-            if not df_temp_filtered.empty:
-                etapas_disponiveis = get_unique_values(df_temp_filtered, "Etapa")
-                etapas_ordenadas = [etapa for etapa in ORDEM_ETAPAS_GLOBAL if etapa in etapas_disponiveis]
-                etapas_para_exibir = ["Todos"] + [sigla_para_nome_completo.get(e, e) for e in etapas_ordenadas]
-            else:
-                etapas_para_exibir = ["Todos"]
+            # Etapas disponíveis no recorte atual, direto dos índices (vazio quando não há linhas,
+            # então não é preciso materializar o recorte só para testar se ele está vazio)
+            etapas_disponiveis = get_unique_values(
+                versao_dados, conjunto_dados, "Etapa", filtros=(selected_ugb, selected_emp, selected_grupo, selected_setor)
+            )
+            etapas_ordenadas = [etapa for etapa in ORDEM_ETAPAS_GLOBAL if etapa in etapas_disponiveis]
+            etapas_para_exibir = ["Todos"] + [sigla_para_nome_completo.get(e, e) for e in etapas_ordenadas]
             
             # Inicializa o estado da visualização se não existir
             if 'consolidated_view' not in st.session_state:
@@ -4657,7 +1910,9 @@ with st.spinner("Carregando e processando dados..."):
 
         # --- FIM DO NOVO LAYOUT ---
         # Mantemos a chamada a filter_dataframe, mas com os valores padrão para EMP, GRUPO e SETOR
-        df_filtered = filter_dataframe(df_data, selected_ugb, selected_emp, selected_grupo, selected_setor)
+        df_filtered = filter_dataframe(conjunto_dados, selected_ugb, selected_emp, selected_grupo, selected_setor)
+        # Recorte antes do filtro de etapa, reaproveitado pelo Gantt (que aplica a etapa por conta própria)
+        df_filtrado_sidebar = df_filtered
 
         # 2. Determinar o modo de visualização (agora baseado no st.session_state)
         is_consolidated_view = st.session_state.consolidated_view
@@ -4666,23 +1921,30 @@ with st.spinner("Carregando e processando dados..."):
         if is_consolidated_view and not df_filtered.empty:
             sigla_selecionada = nome_completo_para_sigla.get(selected_etapa_nome, selected_etapa_nome)
             df_filtered = df_filtered[df_filtered["Etapa"] == sigla_selecionada]
-        df_para_exibir = df_filtered.copy()
+        # Somente leitura (pode ser o frame compartilhado): as visões agregam ou renomeiam antes de alterar
+        df_para_exibir = df_filtered
         # Criar a lista de ordenação de empreendimentos (necessário para ambas as tabelas)
-        empreendimentos_ordenados_por_meta = criar_ordenacao_empreendimentos(df_data)
-        # Copiar o dataframe filtrado para ser usado nas tabelas
-        df_detalhes = df_para_exibir.copy()
+        empreendimentos_ordenados_por_meta = obter_ordenacao_empreendimentos(versao_dados, conjunto_dados)
+        # Mesmo recorte usado nas tabelas
+        df_detalhes = df_para_exibir
         # A lógica de pulmão foi removida da sidebar, então não é mais aplicada aqui.
-        tab1, tab2 = st.tabs(["Gráfico de Gantt", "Tabelão Horizontal"])
-        with tab1:
+        # Seletor de visão no lugar de st.tabs: as abas executam o conteúdo de todas a cada rerun,
+        # então só a visão escolhida é montada (o tabelão com pivot + Styler só roda quando aberto)
+        visao_selecionada = st.radio(
+            "Visão:",
+            options=VISOES_PRINCIPAIS,
+            horizontal=True,
+            label_visibility="collapsed",
+            key="visao_principal"
+        )
+        if visao_selecionada == "Gráfico de Gantt":
             st.subheader("Gantt Comparativo")
             if df_para_exibir.empty:
                 st.warning("⚠️ Nenhum dado encontrado com os filtros aplicados.")
                 pass
             else:
-                df_para_gantt = filter_dataframe(df_data, selected_ugb, selected_emp, selected_grupo, selected_setor)
-
                 gerar_gantt(
-                    df_para_gantt.copy(), # Passa o DF filtrado (sem filtro de etapa/concluídas)
+                    df_filtrado_sidebar.copy(), # Passa o DF filtrado (sem filtro de etapa/concluídas); o Gantt altera a cópia
                     tipo_visualizacao, 
                     filtrar_nao_concluidas, # Passa o *estado* do checkbox
                     df_data, 
@@ -4698,12 +1960,9 @@ with st.spinner("Carregando e processando dados..."):
                 pass
             else:
                 hoje = pd.Timestamp.now().normalize()
+                conferir_esquema(df_detalhes, "visão detalhada")
 
-                for col in ['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real']:
-                    if col in df_detalhes.columns:
-                        df_detalhes[col] = pd.to_datetime(df_detalhes[col], errors='coerce')
-
-                df_agregado = df_detalhes.groupby(['Empreendimento', 'Etapa']).agg(
+                df_agregado = df_detalhes.groupby(['Empreendimento', 'Etapa'], observed=True).agg(
                     Inicio_Prevista=('Inicio_Prevista', 'min'),
                     Termino_Prevista=('Termino_Prevista', 'max'),
                     Inicio_Real=('Inicio_Real', 'min'),
@@ -4711,11 +1970,8 @@ with st.spinner("Carregando e processando dados..."):
                     Percentual_Concluido=('% concluído', 'mean') if '% concluído' in df_detalhes.columns else ('% concluído', lambda x: 0)
                 ).reset_index()
 
-                if '% concluído' in df_detalhes.columns and not df_agregado.empty and (df_agregado['Percentual_Concluido'].fillna(0).max() <= 1):
-                    df_agregado['Percentual_Concluido'] *= 100
-
-                df_agregado['Var. Term'] = df_agregado.apply(
-                    lambda row: calculate_business_days(row['Termino_Prevista'], row['Termino_Real']), axis=1
+                df_agregado['Var. Term'] = calculate_business_days_batch(
+                    df_agregado['Termino_Prevista'], df_agregado['Termino_Real']
                 )
                 
                 df_agregado['ordem_empreendimento'] = pd.Categorical(
@@ -4724,17 +1980,8 @@ with st.spinner("Carregando e processando dados..."):
                     ordered=True
                 )
                 
-                # 1. Mapear a etapa para sua ordem global (agora incluindo subetapas)
-                def get_global_order_linear(etapa):
-                    try:
-                        return ORDEM_ETAPAS_GLOBAL.index(etapa)
-                    except ValueError:
-                        return len(ORDEM_ETAPAS_GLOBAL) # Coloca no final se não for encontrada
-
-                df_agregado['Etapa_Ordem'] = df_agregado['Etapa'].apply(get_global_order_linear)
-                
-                # 2. Ordenar: Empreendimento, Ordem da Etapa (linear)
-                df_ordenado = df_agregado.sort_values(by=['ordem_empreendimento', 'Etapa_Ordem'])
+                # Ordenar: Empreendimento, Etapa (a categoria "Etapa" segue a ORDEM_ETAPAS_GLOBAL)
+                df_ordenado = df_agregado.sort_values(by=['ordem_empreendimento', 'Etapa'])
 
                 st.write("---")
 
@@ -4745,10 +1992,10 @@ with st.spinner("Carregando e processando dados..."):
                 
                 if usar_layout_horizontal:
                     tabela_para_processar = df_ordenado.copy()
-                    tabela_para_processar['Etapa'] = tabela_para_processar['Etapa'].map(sigla_para_nome_completo)
+                    tabela_para_processar['Etapa'] = tabela_para_processar['Etapa'].astype(object).map(sigla_para_nome_completo)
                     tabela_final_lista.append(tabela_para_processar)
                 else:
-                    for _, grupo in df_ordenado.groupby('ordem_empreendimento', sort=False):
+                    for _, grupo in df_ordenado.groupby('ordem_empreendimento', sort=False, observed=True):
                         if grupo.empty:
                             continue
 
@@ -4768,7 +2015,7 @@ with st.spinner("Carregando e processando dados..."):
                         tabela_final_lista.append(cabecalho)
 
                         grupo_formatado = grupo.copy()
-                        grupo_formatado['Hierarquia'] = ' &nbsp; &nbsp; ' + grupo_formatado['Etapa'].map(sigla_para_nome_completo)
+                        grupo_formatado['Hierarquia'] = ' &nbsp; &nbsp; ' + grupo_formatado['Etapa'].astype(object).map(sigla_para_nome_completo)
                         tabela_final_lista.append(grupo_formatado)
 
                 if not tabela_final_lista:
@@ -4795,7 +2042,7 @@ with st.spinner("Carregando e processando dados..."):
                                 try: percentual = int(percentual.replace('%', ''))
                                 except: percentual = 0
 
-                            termino_real, termino_previsto = pd.to_datetime(row.get("Término Real"), errors='coerce'), pd.to_datetime(row.get("Término Prev."), errors='coerce')
+                            termino_real, termino_previsto = row.get("Término Real"), row.get("Término Prev.")
                             cor = "#000000"
                             if percentual == 100:
                                 if pd.notna(termino_real) and pd.notna(termino_previsto):
@@ -4857,7 +2104,7 @@ with st.spinner("Carregando e processando dados..."):
                     
                     st.markdown(tabela_estilizada.to_html(), unsafe_allow_html=True)
 
-        with tab2:
+        else:
             st.subheader("Tabelão Horizontal")
             
             if df_detalhes.empty: # Usando df_detalhes
@@ -4870,11 +2117,7 @@ with st.spinner("Carregando e processando dados..."):
                     'Termino_prevista': 'Termino_Prevista',
                     'Termino_real': 'Termino_Real'
                 })
-                
-                for col in ['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real']:
-                    if col in df_detalhes_tabelao.columns:
-                        df_detalhes_tabelao[col] = df_detalhes_tabelao[col].replace('-', pd.NA)
-                        df_detalhes_tabelao[col] = pd.to_datetime(df_detalhes_tabelao[col], errors='coerce')
+                conferir_esquema(df_detalhes_tabelao, "tabelão")
 
                 df_detalhes_tabelao['Conclusao_Valida'] = False
                 if '% concluído' in df_detalhes_tabelao.columns:
@@ -4890,7 +2133,7 @@ with st.spinner("Carregando e processando dados..."):
                 col1, col2 = st.columns(2)
                 
                 opcoes_classificacao = {
-                    'Padrão (UGB, Empreendimento e Etapa)': ['UGB', 'Empreendimento', 'Etapa_Ordem'],
+                    'Padrão (UGB, Empreendimento e Etapa)': ['UGB', 'Empreendimento', 'Etapa'],
                     'UGB (A-Z)': ['UGB'],
                     'Empreendimento (A-Z)': ['Empreendimento'],
                     'Data de Início Previsto (Mais antiga)': ['Inicio_Prevista'],
@@ -4912,15 +2155,6 @@ with st.spinner("Carregando e processando dados..."):
                         key="ordem_radio"
                     )
 
-                # 1. Mapear a etapa para sua ordem global (agora incluindo subetapas)
-                def get_global_order_linear_tabelao(etapa):
-                    try:
-                        return ORDEM_ETAPAS_GLOBAL.index(etapa)
-                    except ValueError:
-                        return len(ORDEM_ETAPAS_GLOBAL) # Coloca no final se não for encontrada
-
-                df_detalhes_tabelao['Etapa_Ordem'] = df_detalhes_tabelao['Etapa'].apply(get_global_order_linear_tabelao)
-
                 # Lógica para anular datas previstas de subetapas
                 subetapas_list = []
                 
@@ -4940,7 +2174,7 @@ with st.spinner("Carregando e processando dados..."):
                         na_position='last'
                     )
                     
-                    ordem_ugb_emp = df_detalhes_ordenado.groupby(['UGB', 'Empreendimento']).first().reset_index()
+                    ordem_ugb_emp = df_detalhes_ordenado.groupby(['UGB', 'Empreendimento'], observed=True).first().reset_index()
                     ordem_ugb_emp = ordem_ugb_emp.sort_values(
                         by=coluna_data,
                         ascending=(ordem == 'Crescente'),
@@ -4964,26 +2198,20 @@ with st.spinner("Carregando e processando dados..."):
                 
                 if '% concluído' in df_detalhes_tabelao.columns:
                     agg_dict['Percentual_Concluido'] = ('% concluído', 'mean')
-                    if not df_detalhes_tabelao.empty and (df_detalhes_tabelao['% concluído'].fillna(0).max() <= 1):
-                        df_detalhes_tabelao['% concluído'] *= 100
 
                 if 'ordem_index' in df_detalhes_tabelao.columns:
                     agg_dict['ordem_index'] = ('ordem_index', 'first')
 
-                df_agregado = df_detalhes_tabelao.groupby(['UGB', 'Empreendimento', 'Etapa']).agg(**agg_dict).reset_index()
+                df_agregado = df_detalhes_tabelao.groupby(['UGB', 'Empreendimento', 'Etapa'], observed=True).agg(**agg_dict).reset_index()
                 
-                df_agregado['Var. Term'] = df_agregado.apply(lambda row: calculate_business_days(row['Termino_Prevista'], row['Termino_Real']), axis=1)
+                df_agregado['Var. Term'] = calculate_business_days_batch(df_agregado['Termino_Prevista'], df_agregado['Termino_Real'])
 
                 # Variável que estava faltando, definida a partir da ORDEM_ETAPAS_GLOBAL
                 ordem_etapas_completas = ORDEM_ETAPAS_GLOBAL
 
-                df_agregado['Etapa_Ordem'] = df_agregado['Etapa'].apply(
-                    lambda x: ordem_etapas_completas.index(x) if x in ordem_etapas_completas else len(ordem_etapas_completas)
-                )
-
                 if classificar_por in ['Data de Início Previsto (Mais antiga)', 'Data de Término Previsto (Mais recente)']:
                     df_ordenado = df_agregado.sort_values(
-                        by=['ordem_index', 'UGB', 'Empreendimento', 'Etapa_Ordem'],
+                        by=['ordem_index', 'UGB', 'Empreendimento', 'Etapa'],
                         ascending=[True, True, True, True]
                     )
                 else:
@@ -4998,7 +2226,8 @@ with st.spinner("Carregando e processando dados..."):
                     index=['UGB', 'Empreendimento'],
                     columns='Etapa',
                     values=['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real', 'Var. Term'],
-                    aggfunc='first'
+                    aggfunc='first',
+                    observed=True
                 )
 
                 etapas_existentes_no_pivot = df_pivot.columns.get_level_values(1).unique()
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+# Immutable view of the latest load: the loader's return value, when it was
+# produced (UTC) and a counter that increases on every successful reload
+Snapshot = namedtuple("Snapshot", ["value", "loaded_at", "version"])
+
+class DegradedLoadError(Exception):
+    """
+    Raised by a loader whose value is only a fallback (a source failed, timed out or
+    came back empty). The value is kept in `value`: it is published only while there
+    is no complete snapshot yet (first load, or a previous degraded one), so users
+    still see something; after a complete load it counts as a failed reload.
+    """
+
+    def __init__(self, value, reason):
+        super().__init__(reason)
+        self.value = value
+
+
+class BackgroundRefresher:
+    """
+    Stale-while-revalidate holder for an expensive loader.
+
+    The first call to get() runs the loader synchronously; after that a daemon
+    thread rebuilds the value every `ttl_seconds` (or as soon as
+    request_refresh() is called) and swaps the new snapshot in atomically.
+    Readers always get the last complete snapshot and never wait on a reload.
+    If a reload fails, or returns a degraded value (DegradedLoadError) after a
+    complete snapshot was published, the previous snapshot keeps being served and
+    the reload is retried after RETRY_SECONDS.
+
+    The loader runs outside the Streamlit script thread, so it must not call
+    st.* functions.
+    """
+
+    # Wait before retrying after a failed background reload
+    RETRY_SECONDS = 300
+
+    def __init__(self, loader, ttl_seconds, name="background-refresh"):
+        self._loader = loader
+        self._ttl_seconds = ttl_seconds
+        self._name = name
+        self._snapshot = None
+        self._version = 0
+        # Serializes reloads (first synchronous load vs. background thread)
+        self._reload_lock = threading.Lock()
+        # Protects starting the worker thread
+        self._thread_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.last_error = None
+        self.refreshing = False
+        # True while the published snapshot came from a DegradedLoadError
+        self.degraded = False
+
+    def get(self):
+        """Returns the current Snapshot, loading it synchronously only the first time."""
+        if self._snapshot is None:
+            self._reload(only_if_missing=True)
+        self._ensure_worker()
+        return self._snapshot
+
+    def request_refresh(self):
+        """Asks the worker thread to reload now; returns immediately."""
+        self._ensure_worker()
+        self._wakeup.set()
+
+    def seconds_until_next_refresh(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return 0
+        age = (datetime.now(timezone.utc) - snapshot.loaded_at).total_seconds()
+        return max(0, self._ttl_seconds - age)
+
+    def _reload(self, only_if_missing=False):
+        """Runs the loader and swaps the snapshot in; returns False if it failed."""
+        with self._reload_lock:
+            if only_if_missing and self._snapshot is not None:
+                # Another thread finished the first load while we were waiting
+                return True
+            self.refreshing = True
+            started = time.monotonic()
+            degraded_error = None
+            try:
+                value = self._loader()
+            except DegradedLoadError as e:
+                if self._snapshot is not None and not self.degraded:
+                    # Never replace complete data with a partial or sample dataset
+                    self.last_error = e
+                    logging.warning(f"[{self._name}] Degraded reload ({e}); keeping the previous snapshot")
+                    return False
+                degraded_error = e
+                value = e.value
+            except Exception as e:
+                self.last_error = e
+                logging.exception(f"[{self._name}] Reload failed; keeping the previous snapshot")
+                if self._snapshot is None:
+                    raise
+                return False
+            finally:
+                self.refreshing = False
+
+            self._version += 1
+            # Single reference assignment: readers see either the old or the new snapshot
+            self._snapshot = Snapshot(value, datetime.now(timezone.utc), self._version)
+            self.last_error = degraded_error
+            self.degraded = degraded_error is not None
+            if self.degraded:
+                logging.warning(f"[{self._name}] Snapshot v{self._version} is degraded ({degraded_error}); "
+                                f"retrying in {min(self.RETRY_SECONDS, self._ttl_seconds)}s")
+            else:
+                logging.info(f"[{self._name}] Snapshot v{self._version} loaded in {time.monotonic() - started:.1f}s")
+            return True
+
+    def _ensure_worker(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        retry_in = None
+        while True:
+            if retry_in is None and self.degraded:
+                # The published snapshot is only a fallback: retry soon instead of waiting the full TTL
+                retry_in = min(self.RETRY_SECONDS, self._ttl_seconds)
+            # Sleep until the snapshot expires (or the retry delay passes) or a refresh is requested
+            timeout = self.seconds_until_next_refresh() if retry_in is None else retry_in
+            self._wakeup.wait(timeout=timeout)
+            self._wakeup.clear()
+            try:
+                ok = self._reload()
+            except Exception:
+                ok = False
+            retry_in = None if ok else min(self.RETRY_SECONDS, self._ttl_seconds)
+
+
+class VersionedCache:
+    """
+    Memo for values derived from a Snapshot, keyed by (snapshot version, key).
+
+    Entries only live for the newest version seen: the first lookup with a
+    higher version evicts everything computed from older snapshots, so a
+    refresh drops just the stale derived values instead of clearing every
+    cache in the process. Lookups for an older version (a rerun that started
+    before the swap) are computed but not stored. Values are shared between
+    callers and must not be mutated.
+    """
+
+    def __init__(self, max_entries=256):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = OrderedDict()
+
+    def get_or_compute(self, version, key, compute):
+        with self._lock:
+            if self._version is None or version > self._version:
+                self._entries.clear()
+                self._version = version
+            if version == self._version and key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        # Computed outside the lock; two callers may race on the same key, which is harmless
+        value = compute()
+
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = value
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return value
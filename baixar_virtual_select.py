@@ -0,0 +1,51 @@
+"""
+Baixa os arquivos do virtual-select usados nos filtros do Gantt para vendor/virtual-select/<versão>/,
+permitindo que o navegador não dependa do CDN (ver NEO_VIRTUAL_SELECT_ORIGEM em app.py).
+
+Os arquivos baixados devem ser versionados junto com o app: o app só os lê do disco, nunca baixa.
+A versão fica só aqui: app.py importa VIRTUAL_SELECT_VERSAO/URL_BASE deste módulo.
+
+Uso:
+    python baixar_virtual_select.py
+"""
+import os
+import sys
+import tempfile
+import urllib.request
+
+VIRTUAL_SELECT_VERSAO = "1.0.39"
+URL_BASE = f"https://cdn.jsdelivr.net/npm/virtual-select-plugin@{VIRTUAL_SELECT_VERSAO}/dist"
+ARQUIVOS = ["virtual-select.min.css", "virtual-select.min.js"]
+# Uma pasta por versão: trocar VIRTUAL_SELECT_VERSAO nunca reaproveita arquivos de outra versão
+DESTINO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vendor", "virtual-select", VIRTUAL_SELECT_VERSAO)
+
+def baixar_virtual_select(destino=None, timeout=60):
+    if destino is None:
+        destino = DESTINO_PADRAO
+    os.makedirs(destino, exist_ok=True)
+
+    for nome in ARQUIVOS:
+        url = f"{URL_BASE}/{nome}"
+        caminho = os.path.join(destino, nome)
+        print(f"Baixando {url} ...")
+        with urllib.request.urlopen(url, timeout=timeout) as resposta:
+            conteudo = resposta.read()
+        # Grava em arquivo temporário de nome único (execuções simultâneas não colidem) para não
+        # deixar um asset pela metade em caso de falha
+        arquivo = tempfile.NamedTemporaryFile(dir=destino, prefix=nome + ".", suffix=".tmp", delete=False)
+        try:
+            with arquivo:
+                arquivo.write(conteudo)
+            os.replace(arquivo.name, caminho)
+        except BaseException:
+            if os.path.exists(arquivo.name):
+                os.remove(arquivo.name)
+            raise
+        print(f"  -> {caminho} ({len(conteudo)} bytes)")
+
+if __name__ == "__main__":
+    try:
+        baixar_virtual_select()
+    except Exception as e:
+        print(f"Erro ao baixar o virtual-select: {e}")
+        sys.exit(1)
@@ -1,22 +1,158 @@
+import os
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
 import pandas as pd
 
+# Fixed-date national holidays as (month, day)
+NATIONAL_HOLIDAYS = [
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (12, 25),  # Natal
+]
+# Dia Nacional de Zumbi e da Consciência Negra became a national holiday in 2024 (Lei 14.759/2023)
+BLACK_CONSCIOUSNESS_DAY = (11, 20)
+BLACK_CONSCIOUSNESS_DAY_SINCE = 2024
+
+# Fixed-date Pernambuco state holidays as (month, day, first year)
+PERNAMBUCO_HOLIDAYS = [
+    (3, 6, 2018),  # Data Magna de Pernambuco (Revolução Pernambucana), state holiday since Lei 16.241/2017
+]
+
+# Movable holidays as offsets in days from Easter Sunday
+MOVABLE_HOLIDAY_OFFSETS = [
+    -2,   # Sexta-feira Santa
+    60,   # Corpus Christi
+]
+# Carnaval Monday and Tuesday are "ponto facultativo", not legal holidays, so they are
+# business days unless NEO_CARNAVAL_NAO_UTIL is set (1/true/sim)
+CARNIVAL_OFFSETS = [-48, -47]
+CARNIVAL_ENV = "NEO_CARNAVAL_NAO_UTIL"
+
+# Years covered by the calendar; dates outside this range only skip weekends
+HOLIDAY_YEARS = range(2015, 2041)
+
+# Extra holidays (e.g. municipal ones) as comma-separated ISO dates: "2025-06-24,2025-07-16"
+EXTRA_HOLIDAYS_ENV = "NEO_FERIADOS_EXTRAS"
+
+def easter_sunday(year):
+    # Anonymous Gregorian algorithm (Meeus/Jones/Butcher)
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def brazilian_holidays(years=HOLIDAY_YEARS, extra_holidays=(), include_carnival=False):
+    """
+    Returns the sorted national + Pernambuco holidays for the given years,
+    plus any extra dates, as a datetime64[D] array. Carnaval Monday and
+    Tuesday are only included when `include_carnival` is true.
+    """
+    offsets = MOVABLE_HOLIDAY_OFFSETS + (CARNIVAL_OFFSETS if include_carnival else [])
+    holidays = set()
+    for year in years:
+        fixed = NATIONAL_HOLIDAYS + [(month, day) for month, day, since in PERNAMBUCO_HOLIDAYS if year >= since]
+        if year >= BLACK_CONSCIOUSNESS_DAY_SINCE:
+            fixed = fixed + [BLACK_CONSCIOUSNESS_DAY]
+        holidays.update(date(year, month, day) for month, day in fixed)
+
+        easter = easter_sunday(year)
+        holidays.update(easter + timedelta(days=offset) for offset in offsets)
+
+    holidays.update(_parse_extra_holidays(extra_holidays))
+    return np.array(sorted(holidays), dtype='datetime64[D]')
+
+def _parse_extra_holidays(extra_holidays):
+    # Invalid entries are skipped with a warning: the calendar is built at import
+    # time, so a single typo must not break every caller of this module
+    parsed = []
+    for extra in extra_holidays:
+        try:
+            timestamp = pd.Timestamp(extra)
+        except (TypeError, ValueError) as e:
+            warnings.warn(f"Ignoring invalid extra holiday {extra!r}: {e}")
+            continue
+        if pd.isna(timestamp):
+            warnings.warn(f"Ignoring invalid extra holiday {extra!r}")
+            continue
+        parsed.append(timestamp.date())
+    return parsed
+
+def _extra_holidays_from_env():
+    value = os.getenv(EXTRA_HOLIDAYS_ENV, "")
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def _carnival_from_env():
+    return os.getenv(CARNIVAL_ENV, "").strip().lower() in ("1", "true", "sim")
+
+def build_business_calendar(years=HOLIDAY_YEARS, extra_holidays=None, include_carnival=None):
+    """
+    Builds the Monday-Friday business calendar without Brazilian holidays.
+    Extra holidays default to the ones configured in NEO_FERIADOS_EXTRAS and
+    the Carnaval choice to NEO_CARNAVAL_NAO_UTIL.
+    """
+    if extra_holidays is None:
+        extra_holidays = _extra_holidays_from_env()
+    if include_carnival is None:
+        include_carnival = _carnival_from_env()
+    return np.busdaycalendar(weekmask='1111100', holidays=brazilian_holidays(years, extra_holidays, include_carnival))
+
+# Built once per process and shared by every duration calculation
+BUSINESS_CALENDAR = build_business_calendar()
+
+def _to_day_array(dates):
+    # Normalize any array-like of dates (Series, Index, list, ndarray) to datetime64[D];
+    # invalid or missing values become NaT
+    return np.asarray(pd.to_datetime(dates, errors='coerce'), dtype='datetime64[D]')
+
+def calculate_business_days_batch(start_dates, end_dates, calendar=None):
+    """
+    Vectorized version of calculate_business_days for whole columns.
+
+    Counts business days between each (start, end) pair in a single
+    np.busday_count pass, with the same semantics as the scalar function:
+    both ends are inclusive and the result is negative when end < start.
+    Weekends and the holidays of `calendar` (BUSINESS_CALENDAR by default)
+    are not counted. Pairs with a missing date yield NaN. The result is a
+    float Series aligned with start_dates when it is a Series.
+    """
+    if calendar is None:
+        calendar = BUSINESS_CALENDAR
+    index = start_dates.index if isinstance(start_dates, pd.Series) else None
+    start = _to_day_array(start_dates)
+    end = _to_day_array(end_dates)
+
+    result = np.full(len(start), np.nan)
+    valid = ~(np.isnat(start) | np.isnat(end))
+    if valid.any():
+        start, end = start[valid], end[valid]
+        # Count on the ordered interval and restore the direction afterwards
+        lower = np.minimum(start, end)
+        upper = np.maximum(start, end)
+        # busday_count excludes the end date, so shift it by one day to make it inclusive
+        counts = np.busday_count(lower, upper + np.timedelta64(1, 'D'), busdaycal=calendar)
+        result[valid] = np.where(start > end, -counts, counts)
+
+    return pd.Series(result, index=index)
+
 def calculate_business_days(start_date, end_date):
     if pd.isna(start_date) or pd.isna(end_date):
         return pd.NA
-    # Ensure start_date is always earlier than or equal to end_date for bdate_range
-    if start_date > end_date:
-        start_date, end_date = end_date, start_date
-        sign = -1 # Indicate that the original end date was earlier than the start date
-    else:
-        sign = 1
-    
-    # Generate a business day range and count the number of days
-    # The bdate_range includes both start and end dates if they are business days
-    # So, if start_date == end_date and it's a business day, count is 1
-    # If start_date == end_date and it's a weekend, count is 0
-    business_days = len(pd.bdate_range(start=start_date, end=end_date))
-    
-    # Adjust for the direction of the original date difference
-    return business_days * sign
-
-
+    # Scalar entry point kept for row-wise callers; it shares the busday_count
+    # implementation instead of building a full bdate_range for every pair.
+    # If start_date == end_date and it's a business day, count is 1
+    # If start_date == end_date and it's a weekend or holiday, count is 0
+    return int(calculate_business_days_batch([start_date], [end_date]).iloc[0])
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+class IndexedDataset:
+    """
+    Read-only DataFrame plus per-value row bitmaps for the columns used as filters.
+
+    Built once per load (outside the Streamlit script thread) and shared by every
+    session, so a rerun never hashes or copies the whole frame. Each indexed
+    column is factorized into integer codes and every distinct value gets a
+    packed bitmap of the rows holding it; select() resolves any filter
+    combination by OR-ing the bitmaps of the accepted values and AND-ing the
+    columns, then materializes only the matching rows. The wrapped frame must
+    not be mutated.
+    """
+
+    def __init__(self, df, index_columns):
+        self._df = df
+        self._length = len(df)
+        # {column: sorted distinct values}; missing values get no code and are not indexed
+        self._categories = {}
+        # {column: {value: code}}
+        self._codes = {}
+        # {column: uint8 array (n_values, ceil(rows / 8))}; row i of value j is bit i of bitmaps[j]
+        self._bitmaps = {}
+        for column in index_columns:
+            codes, categories = pd.factorize(df[column], sort=True)
+            self._categories[column] = categories.tolist()
+            self._codes[column] = {value: code for code, value in enumerate(self._categories[column])}
+            one_hot = codes[np.newaxis, :] == np.arange(len(categories))[:, np.newaxis]
+            self._bitmaps[column] = np.packbits(one_hot, axis=1)
+
+    @property
+    def frame(self):
+        return self._df
+
+    @property
+    def index_columns(self):
+        return tuple(self._bitmaps)
+
+    def __len__(self):
+        return self._length
+
+    def mask(self, filters=None):
+        """
+        Packed bitmap of the rows matching every filter, or None when nothing is filtered.
+
+        `filters` maps an indexed column to the accepted values; an empty or None
+        entry leaves that column unconstrained.
+        """
+        result = None
+        for column, values in (filters or {}).items():
+            if not values:
+                continue
+            codes_by_value = self._codes[column]
+            codes = [codes_by_value[value] for value in set(values) if value in codes_by_value]
+            if codes:
+                column_mask = np.bitwise_or.reduce(self._bitmaps[column][codes], axis=0)
+            else:
+                column_mask = np.zeros(self._bitmaps[column].shape[1], dtype=np.uint8)
+            result = column_mask if result is None else result & column_mask
+        return result
+
+    def positions(self, filters=None):
+        """Sorted row positions matching `filters`, or None when nothing is filtered."""
+        mask = self.mask(filters)
+        if mask is None:
+            return None
+        return np.flatnonzero(np.unpackbits(mask, count=self._length))
+
+    def select(self, filters=None):
+        """
+        Rows matching `filters`, in the original row order.
+
+        With no effective filter this is the shared frame itself (no copy), so the
+        result must be treated as read-only; callers that mutate it must copy first.
+        """
+        positions = self.positions(filters)
+        if positions is None:
+            return self._df
+        return self._df.take(positions)
+
+    def unique(self, column, filters=None):
+        """Sorted non-missing values of `column` among the rows matching `filters`."""
+        mask = self.mask(filters)
+        if column in self._bitmaps:
+            categories = self._categories[column]
+            if mask is None:
+                return list(categories)
+            # A value is present if its bitmap shares at least one row with the filter
+            present = (self._bitmaps[column] & mask).any(axis=1)
+            return [value for value, keep in zip(categories, present) if keep]
+        values = self._df[column]
+        if mask is not None:
+            values = values.take(np.flatnonzero(np.unpackbits(mask, count=self._length)))
+        return sorted(values.dropna().unique().tolist())
@@ -4,7 +4,7 @@ from app import sigla_para_nome_completo
 from app import filter_dataframe
 from app import simple_multiselect_dropdown as nome_completo_para_sigla
 from app import get_unique_values
-from app import df_data
+from app import conjunto_dados, versao_dados
 from dropdown_component import simple_multiselect_dropdown
 
 # PATCH: Filtro de Etapas Não Concluídas
@@ -48,7 +48,7 @@ def implementar_secao_filtros_completa():
         st.header("🔍 Filtros")
         
         # 1️⃣ Filtro UGB
-        ugb_options = get_unique_values(df_data, "UGB")
+        ugb_options = get_unique_values(versao_dados, conjunto_dados, "UGB")
         selected_ugb = simple_multiselect_dropdown(
             label="Filtrar por UGB",
             options=ugb_options,
@@ -59,8 +59,8 @@ def implementar_secao_filtros_completa():
         # 2️⃣ Filtro Empreendimento
         if selected_ugb:
             emp_options = get_unique_values(
-                df_data[df_data["UGB"].isin(selected_ugb)], 
-                "Empreendimento"
+                versao_dados, conjunto_dados, "Empreendimento",
+                filtros=(selected_ugb, None, None, None)
             )
         else:
             emp_options = []
@@ -73,10 +73,12 @@ def implementar_secao_filtros_completa():
         )
         
         # 3️⃣ Filtro Etapa
-        df_filtered = filter_dataframe(df_data, selected_ugb, selected_emp)
+        df_filtered = filter_dataframe(conjunto_dados, selected_ugb, selected_emp, None, None)
         
         if not df_filtered.empty:
-            etapas_disponiveis = get_unique_values(df_filtered, "Etapa")
+            etapas_disponiveis = get_unique_values(
+                versao_dados, conjunto_dados, "Etapa", filtros=(selected_ugb, selected_emp, None, None)
+            )
             
             try:
                 etapas_disponiveis = sorted(
@@ -97,14 +99,10 @@ def implementar_secao_filtros_completa():
         # 3️⃣ Filtro FASE (NOVO FILTRO - mesmo estilo dos anteriores)
         # Otimização: só calcular opções de fase se UGB e Empreendimento foram selecionados
         if selected_ugb:
-            # Primeiro filtra por UGB
-            df_temp = df_data[df_data["UGB"].isin(selected_ugb)]
-            
-            # Depois filtra por Empreendimento se houver seleção
-            if selected_emp:
-                df_temp = df_temp[df_temp["Empreendimento"].isin(selected_emp)]
-            
-            fase_options = get_unique_values(df_temp, "FASE")
+            # Filtra por UGB e, se houver seleção, por Empreendimento
+            fase_options = get_unique_values(
+                versao_dados, conjunto_dados, "FASE", filtros=(selected_ugb, selected_emp, None, None)
+            )
         else:
             fase_options = []
             
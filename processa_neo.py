@@ -1,29 +1,155 @@
 import pandas as pd
 import os
+import json
+import hashlib
+import tempfile
+import argparse
+import openpyxl
 
-def tratar_e_retornar_dados_previstos():
-    """Carrega e trata os dados, retornando apenas os dados PREV com a nova ordem de etapas."""
+DIRETORIO_ATUAL = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_PLANILHA = os.path.join(DIRETORIO_ATUAL, "PROGRAMAÇÃO NEOENERGIA.xlsx")
+
+# Colunas de identificação e colunas de datas previstas lidas da aba PROGRAMAÇÃO
+COLUNAS_ID = ["UGB", "EMP", "MÓDULO", "Nº LOTES"]
+COLUNAS_PREVISTAS = [
+    "PL-ER-E-IP.PREV.INÍCIO", "PL-ER-E-IP.PREV.TÉRMINO",
+    "APROV-ER-(NEO).PREV.INÍCIO", "APROV-ER-(NEO).PREV.TÉRMINO",
+    "APROV-IP-(NEO).PREV.INÍCIO", "APROV-IP-(NEO).PREV.TÉRMINO",
+    "PIQ.PREV.INÍCIO", "PIQ.PREV.TÉRMINO",
+    "SOLIC-CONEXÃO.PREV.INÍCIO", "SOLIC-CONEXÃO.PREV.TÉRMINO",
+    "CONEXÃO.PREV.INÍCIO", "CONEXÃO.PREV.TÉRMINO",
+    "PROJ-EXEC.PREV.INÍCIO", "PROJ-EXEC.PREV.TÉRMINO",
+    "ORÇ.PREV.INÍCIO", "ORÇ.PREV.TÉRMINO",
+    "SUP.PREV.INÍCIO", "SUP.PREV.TÉRMINO",
+    "EXECUÇÃO-TER.PREV.INÍCIO", "EXECUÇÃO-TER.PREV.TÉRMINO",
+    "EXECUÇÃO-ER.PREV.INÍCIO", "EXECUÇÃO-ER.PREV.TÉRMINO",
+    "EXECUÇÃO-IP.PREV.INÍCIO", "EXECUÇÃO-IP.PREV.TÉRMINO",
+    "INCORPORAÇÃO.PREV.INÍCIO", "INCORPORAÇÃO.PREV.TÉRMINO",
+    "PINT-BAR.PREV.INÍCIO", "PINT-BAR.PREV.TÉRMINO",  
+    "COMISSIONAMENTO.PREV.INÍCIO", "COMISSIONAMENTO.PREV.TÉRMINO",
+    "LIG-IP.PREV.INÍCIO", "LIG-IP.PREV.TÉRMINO",
+    "CARTA.PREV.INÍCIO", "CARTA.PREV.TÉRMINO",
+    "ENTREGA.PREV.INÍCIO", "ENTREGA.PREV.TÉRMINO"
+]
+
+# Snapshot colunar do resultado tratado, reaproveitado enquanto a planilha não mudar
+CAMINHO_SNAPSHOT = os.path.join(DIRETORIO_ATUAL, "dados_previstos_snapshot.parquet")
+CAMINHO_SNAPSHOT_META = CAMINHO_SNAPSHOT + ".json"
+# Incrementar sempre que o tratamento abaixo mudar, para invalidar snapshots antigos
+VERSAO_SNAPSHOT = 3
+
+def hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def identificar_planilha(caminho):
+    """Chave do snapshot: mtime + tamanho (verificação rápida) e sha256 (conteúdo)"""
+    stat = os.stat(caminho)
+    return {"versao": VERSAO_SNAPSHOT, "mtime": stat.st_mtime, "tamanho": stat.st_size}
+
+def carregar_snapshot(caminho_arquivo):
+    """Retorna o snapshot se ele corresponder à planilha atual; caso contrário, None"""
+    if not (os.path.exists(CAMINHO_SNAPSHOT) and os.path.exists(CAMINHO_SNAPSHOT_META)):
+        return None
     try:
-        # 1. CARREGAR OS DADOS
-        diretorio_atual = os.path.dirname(os.path.abspath(__file__))
-        caminho_arquivo = os.path.join(diretorio_atual, "PROGRAMAÇÃO NEOENERGIA.xlsx")
-        
-        if not os.path.exists(caminho_arquivo):
-            print(f"Erro: Arquivo não encontrado no caminho: {caminho_arquivo}")
+        with open(CAMINHO_SNAPSHOT_META, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        atual = identificar_planilha(caminho_arquivo)
+        if meta.get("versao") != VERSAO_SNAPSHOT:
             return None
 
-        df = pd.read_excel(caminho_arquivo, sheet_name="PROGRAMAÇÃO", header=None)
+        if meta.get("mtime") != atual["mtime"] or meta.get("tamanho") != atual["tamanho"]:
+            # Arquivo tocado (ex.: salvo de novo sem mudanças): compara o conteúdo antes de descartar
+            if meta.get("sha256") != hash_arquivo(caminho_arquivo):
+                return None
+            meta.update(atual)
+            with open(CAMINHO_SNAPSHOT_META, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
 
-        # 2. REMOVER COLUNAS ESPECÍFICAS
-        colunas_para_remover = [0, 7, 10, 13, 16, 19, 22, 25, 28, 31, 34, 37, 40, 43, 46, 49, 52, 55, 58]
-        df = df.drop(columns=colunas_para_remover)
+        return pd.read_parquet(CAMINHO_SNAPSHOT)
+    except Exception as e:
+        print(f"Aviso: Snapshot dos dados previstos ignorado: {str(e)}")
+        return None
 
-        # 3. FILTRAR LINHAS
-        df = df[df[1].notna() & df[4].notna()].copy()
+def salvar_snapshot(df, caminho_arquivo):
+    """Grava o resultado tratado em Parquet junto com a identificação da planilha de origem"""
+    try:
+        # Temporário com nome único: uma carga que estourou o tempo no app pode gravar ao mesmo tempo
+        with tempfile.NamedTemporaryFile(dir=DIRETORIO_ATUAL, prefix="dados_previstos_snapshot.",
+                                         suffix=".tmp", delete=False) as temporario:
+            caminho_temporario = temporario.name
+        try:
+            df.to_parquet(caminho_temporario, index=False)
+            os.replace(caminho_temporario, CAMINHO_SNAPSHOT)
+        finally:
+            if os.path.exists(caminho_temporario):
+                os.remove(caminho_temporario)
+        meta = identificar_planilha(caminho_arquivo)
+        meta["sha256"] = hash_arquivo(caminho_arquivo)
+        with open(CAMINHO_SNAPSHOT_META, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    except Exception as e:
+        print(f"Aviso: Não foi possível salvar o snapshot dos dados previstos: {str(e)}")
+
+def tratar_e_retornar_dados_previstos(usar_snapshot=True):
+    """
+    Retorna os dados PREV tratados: [UGB, Empreendimento, Etapa, Inicio_Prevista, Termino_Prevista].
+    Usa o snapshot Parquet quando ele corresponde à planilha atual; senão, trata a planilha e o regrava.
+    """
+    if not os.path.exists(CAMINHO_PLANILHA):
+        print(f"Erro: Arquivo não encontrado no caminho: {CAMINHO_PLANILHA}")
+        return None
+
+    if usar_snapshot:
+        df_snapshot = carregar_snapshot(CAMINHO_PLANILHA)
+        if df_snapshot is not None:
+            return df_snapshot
 
-        # 4. PROMOVER CABEÇALHOS
-        df.columns = df.iloc[0]
-        df = df.drop(df.index[0]).reset_index(drop=True)
+    df_final = tratar_planilha(CAMINHO_PLANILHA)
+    if df_final is not None:
+        salvar_snapshot(df_final, CAMINHO_PLANILHA)
+    return df_final
+
+def ler_colunas_necessarias(caminho_arquivo, linhas_busca_cabecalho=50):
+    """
+    Lê a aba PROGRAMAÇÃO em uma única passada (openpyxl read-only), localizando a linha de
+    cabeçalho pelos nomes e mantendo só COLUNAS_ID + COLUNAS_PREVISTAS. Colunas novas ou
+    mudanças de posição na planilha não afetam a leitura.
+    """
+    wb = openpyxl.load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        linhas = wb["PROGRAMAÇÃO"].iter_rows(values_only=True)
+
+        cabecalho = None
+        for _, linha in zip(range(linhas_busca_cabecalho), linhas):
+            if "UGB" in linha and "Nº LOTES" in linha:
+                cabecalho = linha
+                break
+        if cabecalho is None:
+            print("Erro: Linha de cabeçalho (UGB / Nº LOTES) não encontrada na aba PROGRAMAÇÃO.")
+            return None
+
+        colunas_desejadas = set(COLUNAS_ID) | set(COLUNAS_PREVISTAS)
+        indices = [i for i, nome in enumerate(cabecalho) if nome in colunas_desejadas]
+        dados = [[linha[i] if i < len(linha) else None for i in indices] for linha in linhas]
+    finally:
+        wb.close()
+
+    df = pd.DataFrame(dados, columns=[cabecalho[i] for i in indices])
+    # Células vazias como NaN (e não None), igual ao pd.read_excel
+    return df.mask(df.isna())
+
+def tratar_planilha(caminho_arquivo):
+    """Carrega e trata os dados PREV, retornando uma linha por (UGB, Empreendimento, Etapa) com início e término previstos."""
+    try:
+        # 1. CARREGAR OS DADOS
+        # (apenas as colunas usadas, já com o cabeçalho localizado)
+        df = ler_colunas_necessarias(caminho_arquivo)
+        if df is None:
+            return None
 
         print(f"Colunas encontradas no DataFrame: {list(df.columns)}")  # DEBUG
         
@@ -31,97 +157,46 @@ def tratar_e_retornar_dados_previstos():
             print("Erro: Estrutura de colunas diferente do esperado.")
             return None
 
-        # 5. UNPIVOT (transformar colunas em linhas)
-        # CORRIGIDO: 'PINT-BAR.PREV.INÍCIO' → 'PINT-BAR.PREV.INÍCIO' (com acento)
-        colunas_unpivot = [
-            "PL-ER-E-IP.PREV.INÍCIO", "PL-ER-E-IP.PREV.TÉRMINO",
-            "APROV-ER-(NEO).PREV.INÍCIO", "APROV-ER-(NEO).PREV.TÉRMINO",
-            "APROV-IP-(NEO).PREV.INÍCIO", "APROV-IP-(NEO).PREV.TÉRMINO",
-            "PIQ.PREV.INÍCIO", "PIQ.PREV.TÉRMINO",
-            "SOLIC-CONEXÃO.PREV.INÍCIO", "SOLIC-CONEXÃO.PREV.TÉRMINO",
-            "CONEXÃO.PREV.INÍCIO", "CONEXÃO.PREV.TÉRMINO",
-            "PROJ-EXEC.PREV.INÍCIO", "PROJ-EXEC.PREV.TÉRMINO",
-            "ORÇ.PREV.INÍCIO", "ORÇ.PREV.TÉRMINO",
-            "SUP.PREV.INÍCIO", "SUP.PREV.TÉRMINO",
-            "EXECUÇÃO-TER.PREV.INÍCIO", "EXECUÇÃO-TER.PREV.TÉRMINO",
-            "EXECUÇÃO-ER.PREV.INÍCIO", "EXECUÇÃO-ER.PREV.TÉRMINO",
-            "EXECUÇÃO-IP.PREV.INÍCIO", "EXECUÇÃO-IP.PREV.TÉRMINO",
-            "INCORPORAÇÃO.PREV.INÍCIO", "INCORPORAÇÃO.PREV.TÉRMINO",
-            "PINT-BAR.PREV.INÍCIO", "PINT-BAR.PREV.TÉRMINO",  
-            "COMISSIONAMENTO.PREV.INÍCIO", "COMISSIONAMENTO.PREV.TÉRMINO",
-            "LIG-IP.PREV.INÍCIO", "LIG-IP.PREV.TÉRMINO",
-            "CARTA.PREV.INÍCIO", "CARTA.PREV.TÉRMINO",
-            "ENTREGA.PREV.INÍCIO", "ENTREGA.PREV.TÉRMINO"
-        ]
-        
-        # Verificar se todas as colunas de unpivot existem no DataFrame
-        colunas_inexistentes = [col for col in colunas_unpivot if col not in df.columns]
+        # 2. FILTRAR LINHAS (apenas linhas de dados: UGB e Nº LOTES preenchidos)
+        df = df[df['UGB'].notna() & df['Nº LOTES'].notna()].reset_index(drop=True)
+
+        # 3. REESTRUTURAR DIRETO PARA [UGB, Empreendimento, Etapa, Inicio_Prevista, Termino_Prevista]
+        colunas_previstas = [col for col in COLUNAS_PREVISTAS if col in df.columns]
+        colunas_inexistentes = [col for col in COLUNAS_PREVISTAS if col not in df.columns]
         if colunas_inexistentes:
             print(f"Aviso: Algumas colunas não existem no DataFrame: {colunas_inexistentes}")
-            # Remover colunas inexistentes da lista
-            colunas_unpivot = [col for col in colunas_unpivot if col in df.columns]
-        
-        colunas_fixas = [col for col in df.columns if col not in colunas_unpivot]
-        df_unpivoted = pd.melt(
-            df,
-            id_vars=colunas_fixas,
-            value_vars=colunas_unpivot,
-            var_name="Atributo",
-            value_name="Valor"
+
+        # Chaves como texto e linhas na ordem UGB/MÓDULO (estável): define qual módulo
+        # fornece a data quando um empreendimento tem mais de um
+        chaves = df[['UGB', 'EMP', 'MÓDULO']].astype(str)
+        ordem = chaves.sort_values(['UGB', 'MÓDULO'], kind='mergesort').index
+        chaves = chaves.loc[ordem]
+
+        # "ETAPA.PREV.INÍCIO" -> colunas (ETAPA, INÍCIO); o stack leva a etapa para as linhas
+        datas = df.loc[ordem, colunas_previstas].apply(lambda col: pd.to_datetime(col, errors='coerce').dt.normalize())
+        datas.columns = pd.MultiIndex.from_tuples(
+            [(etapa, inicio_fim) for etapa, _, inicio_fim in (col.split('.') for col in colunas_previstas)],
+            names=['Etapa', None]
         )
+        datas = datas.stack(level='Etapa', future_stack=True).reindex(columns=['INÍCIO', 'TÉRMINO'])
 
-        # 6. DIVIDIR COLUNA "Atributo"
-        split_cols = df_unpivoted['Atributo'].str.split('.', expand=True)
-        split_cols.columns = ['Etapa', 'Tipo', 'Inicio_Fim']
-        df_final = pd.concat([df_unpivoted, split_cols], axis=1)
-        df_final = df_final.drop(columns=['Atributo'])
-
-        # 7. CONVERTER TIPOS DE COLUNAS - CORRIGIDO: Removida coluna 'Avaliação' que não existe
-        # Primeiro verificar quais colunas realmente existem
-        colunas_para_converter = {}
-        if 'UGB' in df_final.columns:
-            colunas_para_converter['UGB'] = 'str'
-        if 'EMP' in df_final.columns:
-            colunas_para_converter['EMP'] = 'str'
-        if 'MÓDULO' in df_final.columns:
-            colunas_para_converter['MÓDULO'] = 'str'
-        if 'Nº LOTES' in df_final.columns:
-            colunas_para_converter['Nº LOTES'] = 'int64'
-        
-        if colunas_para_converter:
-            df_final = df_final.astype(colunas_para_converter)
-        
-        df_final['Valor'] = pd.to_datetime(df_final['Valor'], errors='coerce').dt.date
+        linhas = datas.index.get_level_values(0)
+        df_final = pd.DataFrame({
+            'UGB': chaves['UGB'].reindex(linhas).to_numpy(),
+            'Empreendimento': chaves['EMP'].reindex(linhas).to_numpy(),
+            'Etapa': datas.index.get_level_values('Etapa'),
+            'Inicio_Prevista': datas['INÍCIO'].to_numpy(),
+            'Termino_Prevista': datas['TÉRMINO'].to_numpy(),
+        })
 
-        # 8. FILTRAR APENAS "PREV"
-        df_final = df_final[df_final['Tipo'] == 'PREV'].copy()
-        
-        # 9. CRIAR ORDEM DAS ETAPAS E ORDENAR
-        mapa_ordem = {
-            'PL-ER-E-IP': 1,
-            'APROV-ER-(NEO)': 2,
-            'APROV-IP-(NEO)': 3,
-            'PIQ': 4,
-            'SOLIC-CONEXÃO': 5,
-            'CONEXÃO': 6,
-            'PROJ-EXEC': 7,
-            'ORÇ': 8,
-            'SUP': 9,
-            'EXECUÇÃO-TER': 10,
-            'EXECUÇÃO-ER': 11,
-            'EXECUÇÃO-IP': 12,
-            'INCORPORAÇÃO': 13,
-            'PINT-BAR': 14,
-            'COMISSIONAMENTO': 15,
-            'LIG-IP': 16,
-            'CARTA': 17,
-            'ENTREGA': 18
-        }
-        
-        df_final['Ordem_Etapa'] = df_final['Etapa'].map(mapa_ordem)
-        
-        # Ordena o DataFrame final pela ordem definida
-        df_final = df_final.sort_values(by=['UGB', 'MÓDULO', 'Ordem_Etapa']).reset_index(drop=True)
+        # 4. UMA LINHA POR (UGB, Empreendimento, Etapa): primeira data preenchida de cada coluna;
+        #    etapas sem nenhuma data prevista são descartadas
+        df_final = (
+            df_final.groupby(['UGB', 'Empreendimento', 'Etapa'])
+            .first()
+            .dropna(how='all')
+            .reset_index()
+        )
 
         return df_final
 
@@ -133,15 +208,19 @@ def tratar_e_retornar_dados_previstos():
 
 # Executa a função e mostra o resultado
 if __name__ == "__main__":
-    dados_previstos = tratar_e_retornar_dados_previstos()
+    parser = argparse.ArgumentParser(description="Trata os dados previstos da planilha PROGRAMAÇÃO NEOENERGIA.")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="ignora o snapshot Parquet existente e o reconstrói a partir da planilha")
+    args = parser.parse_args()
+
+    dados_previstos = tratar_e_retornar_dados_previstos(usar_snapshot=not args.rebuild_cache)
     if dados_previstos is not None:
-        print("\nDados Previstos Tratados e Ordenados:")
+        print("\nDados Previstos Tratados:")
         print(f"Total de registros: {len(dados_previstos)}")
         print(f"Etapas únicas: {dados_previstos['Etapa'].unique()}")
-        print(f"Ordem das etapas: {sorted(dados_previstos['Ordem_Etapa'].unique())}")
         
         print("\nPrimeiras 20 linhas:")
-        print(dados_previstos[['UGB', 'MÓDULO', 'Etapa', 'Ordem_Etapa', 'Inicio_Fim', 'Valor']].head(20))
+        print(dados_previstos.head(20))
         
         # Opcional: Salvar em CSV
         dados_previstos.to_csv('dados_previstos_tratados_ordenados.csv', index=False)
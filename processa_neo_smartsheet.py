@@ -7,14 +7,66 @@ try:
     import streamlit as st
 except ImportError:
     st = None
-from datetime import datetime 
+from datetime import datetime, timedelta, timezone
 import numpy as np
 import re
+import pickle
+import json
+import tempfile
+import threading
 
 # Configurações
 SHEET_NAME = "ACOMPANHAMENTOS NEOERNERGIA"
 OUTPUT_CSV = "Dados Reais Tratados e Ordenados.csv"
 
+# ID da planilha: SMARTSHEET_SHEET_ID (secrets/ambiente) ou o último ID encontrado pelo nome, salvo em arquivo
+SHEET_ID_CACHE_FILE = "smartsheet_sheet_id.json"
+# Chave do cache com {ID que deu "não encontrado": ID encontrado pelo nome}, para que um
+# SMARTSHEET_SHEET_ID desatualizado não obrigue a listar todas as planilhas a cada carga
+CHAVE_SUBSTITUICOES = "_substituicoes"
+
+# Sincronização incremental: snapshot local da planilha + linhas modificadas desde a última sincronização
+SNAPSHOT_FILE = "smartsheet_snapshot.pkl"
+SYNC_MODE_ENV = "SMARTSHEET_SYNC_MODE"  # "incremental" (padrão) ou "completo"
+# Margem ao pedir linhas modificadas, para cobrir diferenças de relógio com o servidor
+SYNC_MARGEM = timedelta(minutes=5)
+# Intervalo máximo entre downloads completos (horas). Alterações feitas por fórmulas/dependências
+# podem não mudar o modifiedAt da linha; o download completo periódico corrige essa deriva.
+SYNC_COMPLETO_HORAS_ENV = "SMARTSHEET_SYNC_COMPLETO_HORAS"
+SYNC_COMPLETO_HORAS_PADRAO = 24
+
+# Colunas da planilha usadas pelo dashboard (as demais nem são baixadas).
+# Pode ser sobrescrita com SMARTSHEET_COLUNAS="Coluna A,Coluna B,..."
+COLUNAS_NECESSARIAS = [
+    "Nome da tarefa", "EMP", "Empreendimento", "UGB", "FASE", "Etapa",
+    "Data de Início", "Data de Fim", "% concluído"
+]
+COLUNAS_ENV = "SMARTSHEET_COLUNAS"
+
+# IDs das colunas resolvidos uma vez por processo: {sheet_id: (ids_das_colunas, id_da_coluna_primaria)}
+_colunas_por_planilha = {}
+
+# Uma sincronização por vez no processo: uma carga que estourou o tempo no app continua rodando
+# em segundo plano, e duas simultâneas gravariam o mesmo snapshot e o mesmo CSV
+_lock_sincronizacao = threading.Lock()
+
+def substituir_arquivo(caminho, escrever):
+    """
+    Grava `caminho` de forma atômica: escrever(caminho_temporario) gera o conteúdo num arquivo
+    temporário de nome único na mesma pasta, que depois substitui o destino de uma vez.
+    """
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    with tempfile.NamedTemporaryFile(dir=diretorio, prefix=os.path.basename(caminho) + ".",
+                                     suffix=".tmp", delete=False) as temporario:
+        caminho_temporario = temporario.name
+    try:
+        escrever(caminho_temporario)
+        os.replace(caminho_temporario, caminho)
+    except BaseException:
+        if os.path.exists(caminho_temporario):
+            os.remove(caminho_temporario)
+        raise
+
 def carregar_configuracao():
     """
     Carrega as configurações seguindo a prioridade:
@@ -95,28 +147,249 @@ def get_sheet_id(client, sheet_name):
         print(f"\nErro inesperado ao buscar planilhas: {str(e)}")
         return None
 
+def colunas_configuradas():
+    """Lista de colunas a baixar: SMARTSHEET_COLUNAS, se definida, senão COLUNAS_NECESSARIAS"""
+    valor = os.getenv(COLUNAS_ENV, "")
+    colunas = [coluna.strip() for coluna in valor.split(",") if coluna.strip()]
+    return colunas or COLUNAS_NECESSARIAS
+
+def intervalo_sync_completo():
+    """Intervalo entre downloads completos: SMARTSHEET_SYNC_COMPLETO_HORAS, se válida, senão 24h"""
+    valor = os.getenv(SYNC_COMPLETO_HORAS_ENV, "").strip()
+    if valor:
+        try:
+            horas = float(valor.replace(',', '.'))
+            if horas > 0:
+                return timedelta(hours=horas)
+        except ValueError:
+            pass
+        print(f"⚠️ {SYNC_COMPLETO_HORAS_ENV} inválida ({valor!r}); usando {SYNC_COMPLETO_HORAS_PADRAO}h")
+    return timedelta(hours=SYNC_COMPLETO_HORAS_PADRAO)
+
+def resolver_colunas(client, sheet_id):
+    """Resolve (uma vez por processo) os IDs das colunas configuradas e o ID da coluna primária"""
+    if sheet_id not in _colunas_por_planilha:
+        colunas = client.Sheets.get_columns(sheet_id, include_all=True).data
+        desejadas = colunas_configuradas()
+        ids = [column.id for column in colunas if column.title in desejadas]
+
+        ausentes = set(desejadas) - {column.title for column in colunas}
+        if ausentes:
+            print(f"ℹ️ Colunas configuradas que não existem na planilha: {sorted(ausentes)}")
+        if not ids:
+            print("⚠️ Nenhuma coluna configurada encontrada; baixando todas as colunas")
+            ids = None
+
+        coluna_primaria = next(column.id for column in colunas if column.primary)
+        _colunas_por_planilha[sheet_id] = (ids, coluna_primaria)
+    return _colunas_por_planilha[sheet_id]
+
+def extrair_linhas(sheet):
+    """Converte as linhas da planilha em {row_id: {coluna: valor}}, na ordem da planilha"""
+    column_map = {column.id: column.title for column in sheet.columns}
+
+    linhas = {}
+    for row in sheet.rows:
+        row_data = {}
+        for cell in row.cells:
+            if cell.column_id in column_map:
+                column_name = column_map[cell.column_id]
+                row_data[column_name] = cell.value
+        linhas[row.id] = row_data
+    return linhas
+
+def carregar_snapshot(sheet_id):
+    """Lê o snapshot local da planilha; retorna None se não existir, estiver corrompido ou for de outra planilha"""
+    if not os.path.exists(SNAPSHOT_FILE):
+        return None
+    try:
+        with open(SNAPSHOT_FILE, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        print(f"⚠️ Snapshot local inválido, será refeito: {str(e)}")
+        return None
+    if snapshot.get("sheet_id") != sheet_id:
+        return None
+    return snapshot
+
+def salvar_snapshot(snapshot):
+    """Grava o snapshot em arquivo temporário e substitui o anterior de uma vez"""
+    def escrever(caminho):
+        with open(caminho, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        substituir_arquivo(SNAPSHOT_FILE, escrever)
+    except Exception as e:
+        print(f"⚠️ Não foi possível salvar o snapshot local: {str(e)}")
+
+def baixar_planilha_completa(client, sheet_id):
+    """Baixa a planilha inteira (apenas as colunas configuradas) e monta um novo snapshot"""
+    print("\nObtendo dados da planilha...")
+    inicio = datetime.now(timezone.utc)
+    ids_colunas, _ = resolver_colunas(client, sheet_id)
+    sheet = client.Sheets.get_sheet(sheet_id, column_ids=ids_colunas, page_size=5000)
+    return {
+        "sheet_id": sheet_id,
+        "version": sheet.version,
+        "synced_at": inicio,
+        # Quando foi o último download completo e com qual lista de colunas configurada
+        "full_synced_at": inicio,
+        "configured_columns": colunas_configuradas(),
+        "columns": [column.title for column in sheet.columns],
+        "rows": extrair_linhas(sheet),
+    }
+
+def sincronizar_incremental(client, sheet_id, snapshot):
+    """
+    Atualiza o snapshot baixando apenas as linhas modificadas desde a última sincronização.
+    Retorna None quando não é possível sincronizar de forma incremental (ex.: colunas alteradas,
+    lista de colunas configuradas diferente ou último download completo há mais de
+    intervalo_sync_completo()), para que o chamador faça o download completo.
+    """
+    inicio = datetime.now(timezone.utc)
+
+    # 0. Snapshot feito com outra lista de colunas ou antigo demais: recomeça do zero
+    if snapshot.get("configured_columns") != colunas_configuradas():
+        print("ℹ️ Lista de colunas configuradas mudou desde o último download completo")
+        return None
+    ultimo_completo = snapshot.get("full_synced_at")
+    if ultimo_completo is None or inicio - ultimo_completo >= intervalo_sync_completo():
+        print("ℹ️ Último download completo expirou; ressincronizando a planilha inteira")
+        return None
+
+    # 1. Versão da planilha: se não mudou, o snapshot já está atualizado
+    versao = client.Sheets.get_sheet_version(sheet_id).version
+    if versao == snapshot["version"]:
+        print(f"\n✅ Planilha sem alterações desde a última sincronização (versão {versao})")
+        snapshot["synced_at"] = inicio
+        return snapshot
+
+    # 2. Apenas as linhas modificadas desde a última sincronização
+    ids_colunas, coluna_primaria = resolver_colunas(client, sheet_id)
+    desde = (snapshot["synced_at"] - SYNC_MARGEM).isoformat(timespec='seconds')
+    print(f"\nObtendo linhas modificadas desde {desde}...")
+    modificadas = client.Sheets.get_sheet(
+        sheet_id, column_ids=ids_colunas, rows_modified_since=desde, page_size=5000
+    )
+
+    colunas = [column.title for column in modificadas.columns]
+    if colunas != snapshot["columns"]:
+        print("⚠️ Estrutura de colunas mudou desde a última sincronização")
+        return None
+    linhas_modificadas = extrair_linhas(modificadas)
+
+    # 3. IDs atuais, só com a coluna primária: detecta linhas excluídas e mantém a ordem da planilha
+    #    (process_data descarta as primeiras linhas por posição, então a ordem precisa ser a mesma)
+    atuais = client.Sheets.get_sheet(sheet_id, column_ids=[coluna_primaria], page_size=5000)
+
+    linhas = {}
+    for row in atuais.rows:
+        if row.id in linhas_modificadas:
+            linhas[row.id] = linhas_modificadas[row.id]
+        elif row.id in snapshot["rows"]:
+            linhas[row.id] = snapshot["rows"][row.id]
+        else:
+            print(f"⚠️ Linha {row.id} não encontrada no snapshot nem nas modificações")
+            return None
+
+    excluidas = len(set(snapshot["rows"]) - set(linhas))
+    print(f"✅ Sincronização incremental: {len(linhas_modificadas)} linhas modificadas, {excluidas} excluídas")
+    return {
+        "sheet_id": sheet_id,
+        "version": versao,
+        "synced_at": inicio,
+        "full_synced_at": ultimo_completo,
+        "configured_columns": snapshot["configured_columns"],
+        "columns": colunas,
+        "rows": linhas,
+    }
+
+def ler_cache_sheet_ids():
+    """Conteúdo do arquivo de cache de IDs ({} se não existir ou estiver corrompido)"""
+    if os.path.exists(SHEET_ID_CACHE_FILE):
+        try:
+            with open(SHEET_ID_CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Cache do ID da planilha inválido: {str(e)}")
+    return {}
+
+def carregar_sheet_id_salvo(sheet_name):
+    """
+    Retorna o ID da planilha sem consultar a API, seguindo a prioridade:
+    1. SMARTSHEET_SHEET_ID em Streamlit Secrets ou variáveis de ambiente (ou, se esse ID já
+       deu "não encontrado", o ID encontrado pelo nome no lugar dele)
+    2. Arquivo de cache com o último ID encontrado para o nome da planilha
+    """
+    sheet_id = None
+    if st is not None:
+        try:
+            sheet_id = st.secrets.get("SMARTSHEET_SHEET_ID")
+        except (FileNotFoundError, AttributeError):
+            pass
+    sheet_id = sheet_id or os.getenv("SMARTSHEET_SHEET_ID")
+    ids = ler_cache_sheet_ids()
+    if sheet_id:
+        substituto = ids.get(CHAVE_SUBSTITUICOES, {}).get(str(int(sheet_id)))
+        if substituto:
+            print(f"ℹ️ SMARTSHEET_SHEET_ID {sheet_id} desatualizado; usando {substituto} (atualize a configuração)")
+            return substituto
+        return int(sheet_id)
+    return ids.get(sheet_name)
+
+def salvar_sheet_id(sheet_name, sheet_id, id_desatualizado=None):
+    """
+    Grava o ID encontrado para o nome da planilha no arquivo de cache. Com `id_desatualizado`,
+    registra também o novo ID como substituto dele (usado quando o ID configurado deixou de existir).
+    """
+    try:
+        ids = ler_cache_sheet_ids()
+        ids[sheet_name] = sheet_id
+        if id_desatualizado is not None:
+            substituicoes = ids.setdefault(CHAVE_SUBSTITUICOES, {})
+            # Um substituto que também ficou desatualizado passa a apontar para o novo ID
+            for chave, valor in list(substituicoes.items()):
+                if valor == id_desatualizado:
+                    substituicoes[chave] = sheet_id
+            substituicoes[str(id_desatualizado)] = sheet_id
+        def escrever(caminho):
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(ids, f)
+        substituir_arquivo(SHEET_ID_CACHE_FILE, escrever)
+    except Exception as e:
+        print(f"⚠️ Não foi possível salvar o ID da planilha: {str(e)}")
+
+def buscar_e_salvar_sheet_id(client, sheet_name, id_desatualizado=None):
+    """Busca o ID pelo nome (listando as planilhas da conta) e guarda o resultado"""
+    sheet_id = get_sheet_id(client, sheet_name)
+    if sheet_id:
+        salvar_sheet_id(sheet_name, sheet_id, id_desatualizado)
+    return sheet_id
+
+def erro_nao_encontrado(erro):
+    """Indica se o erro da API é de recurso inexistente (ex.: ID de planilha desatualizado)"""
+    if not isinstance(erro, smartsheet.exceptions.ApiError):
+        return False
+    resultado = getattr(erro.error, 'result', None)
+    return getattr(resultado, 'status_code', None) == 404 or getattr(resultado, 'error_code', None) == 1006
+
 def get_sheet_data(client, sheet_id):
-    """Obtém os dados da planilha"""
+    """Obtém os dados da planilha (incrementalmente sobre o snapshot local, quando possível)"""
     try:
-        print("\nObtendo dados da planilha...")
-        sheet = client.Sheets.get_sheet(
-            sheet_id,
-            include=['format', 'discussions', 'attachments', 'columnType'],
-            page_size=5000
-        )
-        
-        column_map = {column.id: column.title for column in sheet.columns}
-        
-        rows = []
-        for row in sheet.rows:
-            row_data = {}
-            for cell in row.cells:
-                if cell.column_id in column_map:
-                    column_name = column_map[cell.column_id]
-                    row_data[column_name] = cell.value
-            rows.append(row_data)
-        
-        df = pd.DataFrame(rows)
+        snapshot = None
+        if os.getenv(SYNC_MODE_ENV, "incremental").strip().lower() != "completo":
+            snapshot_anterior = carregar_snapshot(sheet_id)
+            if snapshot_anterior is not None:
+                try:
+                    snapshot = sincronizar_incremental(client, sheet_id, snapshot_anterior)
+                except Exception as e:
+                    print(f"⚠️ Falha na sincronização incremental, baixando a planilha completa: {str(e)}")
+
+        if snapshot is None:
+            snapshot = baixar_planilha_completa(client, sheet_id)
+        salvar_snapshot(snapshot)
+
+        df = pd.DataFrame(list(snapshot["rows"].values()))
         print(f"✅ Dados obtidos ({len(df)} linhas, {len(df.columns)} colunas)")
         
         # Verificação inicial dos dados
@@ -131,7 +404,12 @@ def get_sheet_data(client, sheet_id):
         return df
     
     except Exception as e:
+        if erro_nao_encontrado(e):
+            # Deixa o chamador buscar o ID da planilha novamente
+            raise
         print(f"\n❌ Falha ao obter dados: {str(e)}")
+        # As colunas podem ter mudado; resolve os IDs novamente na próxima tentativa
+        _colunas_por_planilha.pop(sheet_id, None)
         return pd.DataFrame()
 
 def filtrar_linhas_invalidas(df):
@@ -260,10 +538,12 @@ def process_data(df):
                 df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
 
         if "% concluído" in df.columns:
+            # Mantém a escala do Smartsheet (fração 0-1); a conversão para 0-100 é feita
+            # uma única vez no app (normalizar_porcentagem)
             df["% concluído"] = pd.to_numeric(
                 df["% concluído"].astype(str).str.replace('%', '').str.replace(',', '.'), 
                 errors='coerce'
-            ) / 100
+            )
             df["% concluído"].fillna(0, inplace=True)
 
         # 6. VERIFICAÇÃO FINAL - Garantir que não há mais 'UNKNOWN'
@@ -319,7 +599,7 @@ def process_data(df):
 def salvar_resultados(df):
     """Salva os dados processados em CSV"""
     try:
-        df.to_csv(OUTPUT_CSV, index=False, encoding='utf-8-sig')
+        substituir_arquivo(OUTPUT_CSV, lambda caminho: df.to_csv(caminho, index=False, encoding='utf-8-sig'))
         print(f"\n💾 Arquivo salvo com sucesso: {OUTPUT_CSV}")
         print(f"📊 Total de linhas: {len(df)}")
         
@@ -346,7 +626,18 @@ def main():
     """
     Função principal que processa dados do Smartsheet
     RETORNA: DataFrame com dados processados ou DataFrame vazio em caso de erro
+    (inclusive quando outra sincronização ainda está em andamento no processo)
     """
+    if not _lock_sincronizacao.acquire(blocking=False):
+        print("⚠️ Sincronização anterior do Smartsheet ainda em andamento; carga ignorada")
+        return pd.DataFrame()
+    try:
+        return processar_smartsheet()
+    finally:
+        _lock_sincronizacao.release()
+
+def processar_smartsheet():
+    """Executa a sincronização completa (chamada por main(), que garante uma por vez)"""
     try:
         print("\n" + "="*60)
         print(" INÍCIO DO PROCESSAMENTO ".center(60, "="))
@@ -362,12 +653,23 @@ def main():
             print("❌ Falha ao configurar cliente Smartsheet")
             return pd.DataFrame()
 
-        sheet_id = get_sheet_id(client, SHEET_NAME)
+        # ID salvo/configurado evita listar todas as planilhas da conta a cada carga
+        sheet_id = carregar_sheet_id_salvo(SHEET_NAME) or buscar_e_salvar_sheet_id(client, SHEET_NAME)
         if not sheet_id:
             print("❌ Falha ao obter ID da planilha")
             return pd.DataFrame()
 
-        raw_data = get_sheet_data(client, sheet_id)
+        try:
+            raw_data = get_sheet_data(client, sheet_id)
+        except smartsheet.exceptions.ApiError as api_error:
+            if not erro_nao_encontrado(api_error):
+                raise
+            print(f"⚠️ Planilha {sheet_id} não encontrada; buscando o ID pelo nome...")
+            sheet_id = buscar_e_salvar_sheet_id(client, SHEET_NAME, id_desatualizado=sheet_id)
+            if not sheet_id:
+                print("❌ Falha ao obter ID da planilha")
+                return pd.DataFrame()
+            raw_data = get_sheet_data(client, sheet_id)
         if raw_data.empty:
             print("❌ Nenhum dado obtido da planilha")
             return pd.DataFrame()